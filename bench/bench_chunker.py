@@ -0,0 +1,87 @@
+"""Benchmark ``lib.chunker`` against LangChain's ``RecursiveCharacterTextSplitter``.
+
+Runs both splitters over the text of the bundled PDFs (``data/*.pdf``) with
+comparable sizes and reports time, chunk counts and peak Python memory.
+Page extraction is done (and cached) up front so only splitting is measured.
+
+Usage:
+    python -m bench.bench_chunker [--chunk-size 500] [--overlap 50] [--repeat 3] [files ...]
+"""
+from __future__ import annotations
+
+import argparse
+import statistics
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable, List, Optional, Tuple
+
+from lib.chunker import chunk_pages
+from lib.document_utils import extract_pdf_pages
+
+DATA = Path(__file__).resolve().parent.parent / "data"
+
+
+def _langchain_splitter(chunk_size: int, overlap: int) -> Optional[Callable[[List[str]], int]]:
+    try:
+        from langchain_text_splitters import RecursiveCharacterTextSplitter
+    except ImportError:
+        try:
+            from langchain.text_splitter import RecursiveCharacterTextSplitter
+        except ImportError:
+            return None
+    splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=overlap)
+    # The pipeline page loads the whole document and splits it in one go.
+    return lambda pages: len(splitter.split_text("\n".join(pages)))
+
+
+def _lib_chunker(chunk_size: int, overlap: int) -> Callable[[List[str]], int]:
+    # Same character budget, expressed in tokens at a fixed 4 characters per token.
+    return lambda pages: sum(
+        1 for _ in chunk_pages(iter(pages), chunk_size // 4, overlap // 4, chars_per_tok=4.0)
+    )
+
+
+def _measure(split: Callable[[List[str]], int], pages: List[str], repeat: int) -> Tuple[float, int, int]:
+    """Return (median seconds, chunk count, peak traced bytes)."""
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        count = split(pages)
+        times.append(time.perf_counter() - started)
+    tracemalloc.start()
+    split(pages)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return statistics.median(times), count, peak
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("files", nargs="*", type=Path, help="PDFs (default: data/*.pdf)")
+    parser.add_argument("--chunk-size", type=int, default=500, help="characters per chunk")
+    parser.add_argument("--overlap", type=int, default=50, help="overlap in characters")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    splitters = {"lib.chunker": _lib_chunker(args.chunk_size, args.overlap)}
+    langchain = _langchain_splitter(args.chunk_size, args.overlap)
+    if langchain is None:
+        print("LangChain splitter not installed; measuring lib.chunker only.\n")
+    else:
+        splitters["langchain"] = langchain
+
+    print(f"{'file':<28} {'pages':>5} {'chars':>9}  {'splitter':<12} {'time ms':>9} {'chunks':>7} {'peak KiB':>9}")
+    for path in args.files or sorted(DATA.glob("*.pdf")):
+        pages = extract_pdf_pages(path.read_bytes())
+        chars = sum(len(p) for p in pages)
+        for name, split in splitters.items():
+            seconds, count, peak = _measure(split, pages, args.repeat)
+            print(
+                f"{path.name[:28]:<28} {len(pages):>5} {chars:>9}  {name:<12} "
+                f"{seconds * 1000:>9.1f} {count:>7} {peak / 1024:>9.0f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
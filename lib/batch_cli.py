@@ -0,0 +1,258 @@
+"""Run the content generators headless over a JSONL file of inputs.
+
+Each input line is one job, in one of three shapes::
+
+    {"id": "b1", "kind": "blog", "params": {"topic": "Die Zukunft der KI", "length": 600}}
+    {"id": "q1", "prompt": "Fasse RAG in drei Sätzen zusammen."}
+    {"request_id": "user-001", "title": "...", "body": "..."}    # like requests.jsonl
+
+``kind`` is a key of ``lib.prompts.PROMPT_BUILDERS``; optional ``model`` and
+``options`` override the command-line model and Ollama options per job. Jobs
+run concurrently (at most ``--concurrency`` requests, default: Ollama's
+parallel slots), failed requests are retried with exponential backoff, and
+every result is appended to the output JSONL as soon as it is done::
+
+    {"id": ..., "kind": ..., "model": ..., "response": ..., "error": null,
+     "attempts": 1, "latency_s": ..., "load_s": ..., "prompt_eval_s": ...,
+     "eval_s": ..., "prompt_tokens": ..., "eval_tokens": ..., "ts": ...}
+
+The output file is the checkpoint: a rerun skips every id that already has
+a successful line, so an interrupted run continues where it stopped and
+failed jobs are tried again.
+
+Usage:
+    python -m lib.batch_cli jobs.jsonl -o results.jsonl -m llama3.2 [--concurrency 4] [--retries 3]
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional, Set
+
+import requests
+
+from lib.helper_ollama import client
+from lib.helper_ollama.client import PARALLEL_SLOTS
+from lib.prompts import build_prompt
+
+__all__ = ["read_jobs", "completed_ids", "job_prompt", "run_jobs", "main"]
+
+DEFAULT_TIMEOUT = 300.0
+DEFAULT_RETRIES = 3
+DEFAULT_BACKOFF = 2.0
+FSYNC_EVERY = 50
+
+
+def read_jobs(path: str | Path) -> Iterator[dict]:
+    """Yield the jobs of a JSONL file lazily; jobs without an id get ``line-<n>``."""
+    with Path(path).open("r", encoding="utf-8") as f:
+        for number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                job = json.loads(line)
+            except ValueError as e:
+                raise ValueError(f"{path}:{number}: invalid JSON: {e}")
+            job["id"] = str(job.get("id") or job.get("request_id") or f"line-{number}")
+            yield job
+
+
+def completed_ids(output: Path) -> Set[str]:
+    """Ids with a successful result in *output* (broken lines are ignored)."""
+    done: Set[str] = set()
+    try:
+        with output.open("r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # e.g. a line cut off by a crash
+                if not record.get("error") and record.get("id") is not None:
+                    done.add(record["id"])
+    except OSError:
+        pass
+    return done
+
+
+def job_prompt(job: dict) -> str:
+    """Build the prompt of *job* (``kind``/``params``, ``prompt`` or ``title``/``body``)."""
+    if job.get("kind"):
+        return build_prompt(job["kind"], job.get("params"))
+    if job.get("prompt"):
+        return job["prompt"]
+    if job.get("title") or job.get("body"):
+        return f"{job.get('title', '')}\n\n{job.get('body', '')}".strip()
+    raise ValueError("Job has neither 'kind', 'prompt' nor 'title'/'body'")
+
+
+def _retryable(error: Exception) -> bool:
+    # Connection problems, timeouts, overload (429) and server errors may pass on
+    # a second try; a 4xx such as an unknown model will not.
+    if isinstance(error, requests.HTTPError) and error.response is not None:
+        status = error.response.status_code
+        return status == 429 or status >= 500
+    return isinstance(error, (requests.ConnectionError, requests.Timeout))
+
+
+def _backoff_delay(attempt: int, backoff: float) -> float:
+    """Seconds to wait before retry number *attempt*: exponential with jitter."""
+    return backoff * 2 ** (attempt - 1) * random.uniform(0.5, 1.0)
+
+
+def _seconds(body: dict, key: str) -> Optional[float]:
+    value = body.get(key)
+    return round(value / 1e9, 3) if value is not None else None
+
+
+def _process(job: dict, model: str, options: dict, retries: int, timeout: float, backoff: float) -> dict:
+    started = time.perf_counter()
+    record = {
+        "id": job["id"], "kind": job.get("kind") or "prompt", "model": job.get("model") or model,
+        "response": "", "error": None, "attempts": 0,
+    }
+    try:
+        payload = {"model": record["model"], "prompt": job_prompt(job)}
+        if options or job.get("options"):
+            payload["options"] = {**options, **job.get("options", {})}
+        while True:
+            record["attempts"] += 1
+            try:
+                body = client.post_json("/api/generate", payload, timeout=(3.05, timeout))
+                break
+            except Exception as e:  # noqa: BLE001 - classified by _retryable
+                if record["attempts"] > retries or not _retryable(e):
+                    raise
+                time.sleep(_backoff_delay(record["attempts"], backoff))
+        record["response"] = body.get("response", "")
+        record.update(
+            load_s=_seconds(body, "load_duration"),
+            prompt_eval_s=_seconds(body, "prompt_eval_duration"),
+            eval_s=_seconds(body, "eval_duration"),
+            prompt_tokens=body.get("prompt_eval_count"),
+            eval_tokens=body.get("eval_count"),
+        )
+    except Exception as e:  # noqa: BLE001 - recorded per job, the batch goes on
+        record["error"] = f"{type(e).__name__}: {e}"
+    record["latency_s"] = round(time.perf_counter() - started, 3)
+    record["ts"] = datetime.now(timezone.utc).isoformat(timespec="seconds")
+    return record
+
+
+def _ends_with_newline(path: Path) -> bool:
+    with path.open("rb") as f:
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) == b"\n"
+
+
+def _pending(jobs: Iterable[dict], done: Set[str]) -> Iterator[dict]:
+    seen = set(done)
+    for job in jobs:
+        if job["id"] not in seen:
+            seen.add(job["id"])
+            yield job
+
+
+def run_jobs(
+    jobs: Iterable[dict],
+    model: str,
+    output: str | Path,
+    concurrency: int = PARALLEL_SLOTS,
+    retries: int = DEFAULT_RETRIES,
+    timeout: float = DEFAULT_TIMEOUT,
+    backoff: float = DEFAULT_BACKOFF,
+    options: Optional[dict] = None,
+) -> Iterator[dict]:
+    """Run *jobs* concurrently, appending each result to *output* as it completes.
+
+    Yields the new result records in completion order. Jobs whose id already
+    succeeded in *output* (or appeared earlier in *jobs*) are skipped. At most
+    ``2 * concurrency`` jobs are in flight, so the input is read lazily.
+    """
+    output = Path(output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    done = completed_ids(output)
+    options = dict(options or {})
+    pending_jobs = _pending(jobs, done)
+    workers = max(1, concurrency)
+    pool = ThreadPoolExecutor(max_workers=workers)
+    try:
+        with output.open("a", encoding="utf-8") as out:
+            if out.tell() and not _ends_with_newline(output):
+                out.write("\n")  # finish a line cut off by a crash
+            in_flight = set()
+            written = 0
+
+            def submit_next() -> bool:
+                job = next(pending_jobs, None)
+                if job is None:
+                    return False
+                in_flight.add(pool.submit(_process, job, model, options, retries, timeout, backoff))
+                return True
+
+            while len(in_flight) < 2 * workers and submit_next():
+                pass
+            while in_flight:
+                finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    in_flight.discard(future)
+                    submit_next()
+                    record = future.result()
+                    out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                    out.flush()
+                    written += 1
+                    if written % FSYNC_EVERY == 0:
+                        os.fsync(out.fileno())
+                    yield record
+            os.fsync(out.fileno())
+    finally:
+        # On Ctrl+C do not start queued jobs; the ones in flight are lost and rerun on resume.
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("input", help="JSONL file with one job per line")
+    parser.add_argument("-o", "--output", default="batch_results.jsonl", help="results JSONL (also the checkpoint)")
+    parser.add_argument("-m", "--model", default="llama3.2", help="default model for jobs without 'model'")
+    parser.add_argument("-c", "--concurrency", type=int, default=PARALLEL_SLOTS, help="parallel requests")
+    parser.add_argument("--retries", type=int, default=DEFAULT_RETRIES, help="retries per job")
+    parser.add_argument("--backoff", type=float, default=DEFAULT_BACKOFF, help="first retry delay in seconds")
+    parser.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT, help="seconds per request")
+    parser.add_argument("--temperature", type=float, help="Ollama temperature for all jobs")
+    parser.add_argument("-q", "--quiet", action="store_true", help="only print the summary")
+    args = parser.parse_args(argv)
+
+    options = {"temperature": args.temperature} if args.temperature is not None else {}
+    ok = failed = 0
+    started = time.perf_counter()
+    try:
+        for record in run_jobs(
+            read_jobs(args.input), args.model, args.output, args.concurrency,
+            args.retries, args.timeout, args.backoff, options,
+        ):
+            if record["error"]:
+                failed += 1
+            else:
+                ok += 1
+            if not args.quiet:
+                status = record["error"] or f"ok ({record['attempts']} attempt(s))"
+                print(f"{record['id']}\t{record['latency_s']:.1f}s\t{status}", file=sys.stderr)
+    except KeyboardInterrupt:
+        print("Interrupted; rerun the same command to resume.", file=sys.stderr)
+        return 130
+    finally:
+        elapsed = time.perf_counter() - started
+        print(f"{ok} ok, {failed} failed in {elapsed:.1f}s -> {args.output}", file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
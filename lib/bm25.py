@@ -0,0 +1,292 @@
+"""Compact in-process BM25 index for top-k passage selection.
+
+Postings are stored in CSR form as NumPy arrays (term offsets, document ids,
+term frequencies), so a query only touches the postings of its own terms and
+scoring is a handful of vectorised operations. The arrays are saved as
+``.npy`` files and memory-mapped on load.
+
+Tokenizing is the expensive part of building an index, so it can be done
+per group of passages (e.g. per file) into a ``BM25Segment``; segments are
+cached and ``BM25Index.merge`` assembles the index from them with NumPy
+only, so a changed file costs one segment instead of a full rebuild.
+
+Example:
+    >>> index = BM25Index.build(texts, ids)
+    >>> index.search("lineare funktionen", k=5)
+    [(0.93, 'a.md#3'), ...]
+    >>> index = BM25Index.merge([BM25Segment.build(chunks) for chunks in files], ids)
+"""
+from __future__ import annotations
+
+import os
+import re
+import shutil
+import tempfile
+import unicodedata
+from collections import Counter
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from lib.cache_utils import read_json, write_json_atomic
+
+__all__ = ["tokenize", "BM25Segment", "BM25Index"]
+
+_token_re = re.compile(r"\w+", re.UNICODE)
+
+_UMLAUTS = str.maketrans({"ä": "a", "ö": "o", "ü": "u", "ß": "ss"})
+
+STOPWORDS = frozenset(
+    """
+    a an and are as at be but by for from has have if in into is it its of on or that the
+    their then there these they this to was were what when where which who why will with
+    you your we our i me my not no do does did can could should would about than so
+    aber als am an auch auf aus bei bin bis bist da damit dann das dass dein der den des
+    dem die dies diese dieser dieses doch dort du durch ein eine einem einen einer eines
+    er es etwas euer fur hat hatte hatten hier ich ihr ihre im in ist ja jede jeder jedes
+    kann kein keine mit muss nach nicht noch nun nur ob oder ohne sehr sein seine sich
+    sie sind so soll sollen uber um und uns unser unter vom von vor war waren warum was
+    weil welche welcher wenn wer wie wir wird wo zu zum zur
+    """.split()
+)
+
+# Longest first; only stripped from tokens that stay at least 4 characters long.
+_SUFFIXES = (
+    "ungen", "ingly", "ation", "ungs", "heit", "keit", "lich", "isch", "ing", "ung",
+    "ern", "est", "ies", "en", "er", "es", "ed", "ly", "em", "e", "n", "s",
+)
+
+
+def _stem(token: str) -> str:
+    for suffix in _SUFFIXES:
+        if token.endswith(suffix) and len(token) - len(suffix) >= 4:
+            return token[: -len(suffix)]
+    return token
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase, fold umlauts/accents, drop stopwords and strip common DE/EN suffixes."""
+    text = unicodedata.normalize("NFKD", text.casefold().translate(_UMLAUTS))
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return [_stem(t) for t in _token_re.findall(text) if t not in STOPWORDS and len(t) > 1]
+
+
+def _concat(parts: List[np.ndarray], dtype) -> np.ndarray:
+    return np.concatenate(parts).astype(dtype, copy=False) if parts else np.zeros(0, dtype=dtype)
+
+
+@dataclass
+class BM25Segment:
+    """Tokenized postings of a few passages, with segment-local term and passage numbers.
+
+    Args:
+        terms: the segment's vocabulary
+        term_ids: int32 posting term numbers (into *terms*)
+        doc_ids: int32 posting passage numbers, ascending
+        tfs: uint16 posting term frequencies
+        doc_len: int32 passage lengths in tokens
+    """
+
+    terms: List[str]
+    term_ids: np.ndarray
+    doc_ids: np.ndarray
+    tfs: np.ndarray
+    doc_len: np.ndarray
+
+    @classmethod
+    def build(cls, texts: Iterable[str]) -> "BM25Segment":
+        vocabulary: Dict[str, int] = {}
+        term_ids: List[int] = []
+        doc_ids: List[int] = []
+        tfs: List[int] = []
+        doc_len: List[int] = []
+        for doc, text in enumerate(texts):
+            tokens = tokenize(text)
+            doc_len.append(len(tokens))
+            for term, tf in Counter(tokens).items():
+                term_ids.append(vocabulary.setdefault(term, len(vocabulary)))
+                doc_ids.append(doc)
+                tfs.append(min(tf, 65535))
+        return cls(
+            list(vocabulary),
+            np.asarray(term_ids, dtype=np.int32),
+            np.asarray(doc_ids, dtype=np.int32),
+            np.asarray(tfs, dtype=np.uint16),
+            np.asarray(doc_len, dtype=np.int32),
+        )
+
+    def save(self, path: Path) -> None:
+        """Write the segment as ``.npz`` so that readers never see a partial file."""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.savez(
+                    f, terms=np.asarray(self.terms, dtype=str), term_ids=self.term_ids,
+                    doc_ids=self.doc_ids, tfs=self.tfs, doc_len=self.doc_len,
+                )
+            os.replace(tmp, path)
+        except BaseException:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+            raise
+
+    @classmethod
+    def load(cls, path: Path) -> Optional["BM25Segment"]:
+        """Load a saved segment; ``None`` if it is missing or unreadable."""
+        try:
+            with np.load(path) as data:
+                return cls(
+                    data["terms"].tolist(), data["term_ids"], data["doc_ids"], data["tfs"], data["doc_len"]
+                )
+        except (OSError, ValueError, KeyError):
+            return None
+
+
+class BM25Index:
+    """Okapi BM25 over a fixed passage collection.
+
+    Args:
+        vocabulary: term -> term id
+        offsets: int64 array, postings of term ``t`` are ``[offsets[t], offsets[t + 1])``
+        doc_ids: int32 posting document ids (ascending per term)
+        tfs: uint16 posting term frequencies
+        doc_len: int32 passage lengths in tokens
+        ids: external identifier per passage (JSON-serialisable)
+    """
+
+    def __init__(
+        self,
+        vocabulary: Dict[str, int],
+        offsets: np.ndarray,
+        doc_ids: np.ndarray,
+        tfs: np.ndarray,
+        doc_len: np.ndarray,
+        ids: Sequence[Any],
+        k1: float = 1.2,
+        b: float = 0.75,
+    ):
+        self.vocabulary = vocabulary
+        self.offsets = offsets
+        self.doc_ids = doc_ids
+        self.tfs = tfs
+        self.doc_len = doc_len
+        self.ids = list(ids)
+        self.k1 = k1
+        self.b = b
+        self.meta: dict = {}
+        self.n_docs = len(doc_len)
+        avgdl = float(doc_len.mean()) if self.n_docs else 0.0
+        # Per-document length normalisation, precomputed once.
+        self._norm = (k1 * (1.0 - b + b * doc_len / max(avgdl, 1e-9))).astype(np.float32)
+
+    @classmethod
+    def build(cls, texts: Iterable[str], ids: Sequence[Any], **kwargs) -> "BM25Index":
+        return cls.merge([BM25Segment.build(texts)], ids, **kwargs)
+
+    @classmethod
+    def merge(cls, segments: Iterable[BM25Segment], ids: Sequence[Any], **kwargs) -> "BM25Index":
+        """Assemble an index from *segments*; their passages are numbered in order."""
+        vocabulary: Dict[str, int] = {}
+        term_parts, doc_parts, tf_parts, len_parts = [], [], [], []
+        base = 0
+        for segment in segments:
+            remap = np.fromiter(
+                (vocabulary.setdefault(term, len(vocabulary)) for term in segment.terms),
+                dtype=np.int32,
+                count=len(segment.terms),
+            )
+            term_parts.append(remap[segment.term_ids])
+            doc_parts.append(segment.doc_ids + base)
+            tf_parts.append(segment.tfs)
+            len_parts.append(segment.doc_len)
+            base += len(segment.doc_len)
+
+        term_arr = _concat(term_parts, np.int32)
+        order = np.argsort(term_arr, kind="stable")  # stable keeps doc ids ascending per term
+        counts = np.bincount(term_arr, minlength=len(vocabulary))
+        offsets = np.zeros(len(vocabulary) + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+        return cls(
+            vocabulary,
+            offsets,
+            _concat(doc_parts, np.int32)[order],
+            _concat(tf_parts, np.uint16)[order],
+            _concat(len_parts, np.int32),
+            ids,
+            **kwargs,
+        )
+
+    def search(self, query: str, k: int = 10) -> List[Tuple[float, Any]]:
+        """Return up to *k* ``(score, id)`` pairs, best first."""
+        terms = {self.vocabulary[t] for t in tokenize(query) if t in self.vocabulary}
+        if not terms or not self.n_docs:
+            return []
+        scores = np.zeros(self.n_docs, dtype=np.float32)
+        for term in terms:
+            start, end = self.offsets[term], self.offsets[term + 1]
+            docs = self.doc_ids[start:end]
+            tf = self.tfs[start:end].astype(np.float32)
+            df = end - start
+            idf = np.log1p((self.n_docs - df + 0.5) / (df + 0.5))
+            # Postings hold each document at most once per term, so plain fancy-index add is safe.
+            scores[docs] += idf * tf * (self.k1 + 1.0) / (tf + self._norm[docs])
+
+        k = min(k, int(np.count_nonzero(scores)))
+        if k <= 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(float(scores[i]), self.ids[i]) for i in top]
+
+    # -- persistence ------------------------------------------------------------------------------
+    def save(self, folder: Path, meta: Optional[dict] = None) -> None:
+        self.meta = meta or {}
+        folder.parent.mkdir(parents=True, exist_ok=True)
+        # Readers may have the arrays of a previous index memory-mapped, so the
+        # files are never rewritten in place: a complete copy is written to a
+        # temp folder and swapped in.
+        tmp = Path(tempfile.mkdtemp(dir=folder.parent, prefix=f".{folder.name}."))
+        old = None
+        try:
+            for name in ("offsets", "doc_ids", "tfs", "doc_len"):
+                np.save(tmp / f"{name}.npy", getattr(self, name))
+            write_json_atomic(
+                tmp / "index.json",
+                {
+                    "vocabulary": self.vocabulary,
+                    "ids": self.ids,
+                    "k1": self.k1,
+                    "b": self.b,
+                    "meta": self.meta,
+                },
+            )
+            if folder.exists():
+                old = Path(tempfile.mkdtemp(dir=folder.parent, prefix=f".{folder.name}.old."))
+                os.replace(folder, old)
+            os.replace(tmp, folder)
+        except OSError:
+            shutil.rmtree(tmp, ignore_errors=True)
+            if not (folder / "index.json").exists():  # not saved concurrently by someone else
+                raise
+        # Open maps keep the old files alive until they are released.
+        if old is not None:
+            shutil.rmtree(old, ignore_errors=True)
+
+    @classmethod
+    def load(cls, folder: Path) -> Optional["BM25Index"]:
+        """Load a saved index (arrays memory-mapped); ``None`` if there is none."""
+        header = read_json(folder / "index.json")
+        if header is None:
+            return None
+        arrays = {
+            name: np.load(folder / f"{name}.npy", mmap_mode="r")
+            for name in ("offsets", "doc_ids", "tfs", "doc_len")
+        }
+        index = cls(header["vocabulary"], ids=header["ids"], k1=header["k1"], b=header["b"], **arrays)
+        index.meta = header.get("meta", {})
+        return index
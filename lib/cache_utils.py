@@ -0,0 +1,82 @@
+"""Helpers for the local on-disk caches used by the mini apps."""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import tempfile
+from pathlib import Path
+from typing import IO, Any
+
+__all__ = [
+    "cache_dir",
+    "content_hash",
+    "file_hash",
+    "read_json",
+    "write_json_atomic",
+]
+
+CACHE_ROOT = Path(
+    os.environ.get("ENRICHMENT_CACHE_DIR", Path.home() / ".cache" / "enrichment-ai")
+)
+
+
+def cache_dir(*parts: str) -> Path:
+    """Return (and create) a cache sub directory below ``CACHE_ROOT``."""
+    path = CACHE_ROOT.joinpath(*parts)
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def content_hash(data: bytes | str) -> str:
+    """Return the hex SHA-256 of *data* (strings are hashed as UTF-8)."""
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    return hashlib.sha256(data).hexdigest()
+
+
+def file_hash(source: str | Path | IO[bytes], block_size: int = 1 << 20) -> str:
+    """Return the hex SHA-256 of a file or binary stream, read in blocks.
+
+    Seekable streams are hashed from the start, whatever their position, and
+    left at the position they had before.
+    """
+    digest = hashlib.sha256()
+    if isinstance(source, (str, Path)):
+        with open(source, "rb") as f:
+            for block in iter(lambda: f.read(block_size), b""):
+                digest.update(block)
+        return digest.hexdigest()
+    position = source.tell() if source.seekable() else None
+    if position is not None:
+        source.seek(0)
+    for block in iter(lambda: source.read(block_size), b""):
+        digest.update(block)
+    if position is not None:
+        source.seek(position)
+    return digest.hexdigest()
+
+
+def read_json(path: Path, default: Any = None) -> Any:
+    """Return the JSON document at *path*, or *default* if it is missing or broken."""
+    try:
+        with path.open("r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return default
+
+
+def write_json_atomic(path: Path, data: Any) -> None:
+    """Write *data* as JSON so that readers never see a partially written file."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
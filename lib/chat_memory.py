@@ -0,0 +1,131 @@
+"""Token-budgeted chat history with a rolling summary.
+
+Instead of resending the whole conversation every turn, ``ChatMemory`` keeps
+the most recent messages verbatim and folds older ones into a summary that
+is sent as a system message. Once the verbatim part grows beyond the token
+budget, the oldest turns (down to half the budget) are summarized in a
+background thread after the reply has been shown; the next request picks up
+the finished summary. The prompt therefore stays at roughly *budget* tokens
+(plus the summary) no matter how long the conversation gets.
+
+Example:
+    >>> memory = ChatMemory(budget_tokens=1024)
+    >>> memory.add("user", "Hallo!")
+    >>> reply = chat(model, memory.request_messages())
+    >>> memory.add("assistant", reply)
+    >>> memory.compact_async(model)
+"""
+from __future__ import annotations
+
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import List, Optional, Sequence, Tuple
+
+from lib.chunker import estimate_tokens
+from lib.helper_ollama import generate as ollama_generate
+
+__all__ = ["DEFAULT_BUDGET_TOKENS", "ChatMemory", "summarize_messages"]
+
+DEFAULT_BUDGET_TOKENS = 1024
+MIN_RECENT_MESSAGES = 4
+
+SUMMARY_PROMPT = (
+    "Fasse den bisherigen Gesprächsverlauf zwischen Nutzer und Assistent knapp zusammen. "
+    "Behalte Fakten, Namen, Zahlen, Entscheidungen, Vorlieben des Nutzers und offene Fragen. "
+    "Höchstens {words} Wörter, Stichpunkte, keine Einleitung.\n\n"
+    "Bisherige Zusammenfassung:\n{summary}\n\n"
+    "Neue Nachrichten:\n{messages}"
+)
+
+SUMMARY_SYSTEM = "Zusammenfassung des bisherigen Gesprächs (ältere Nachrichten):\n{summary}"
+
+# Summaries are small and rare; two workers keep sessions from queueing behind each other.
+_summarizer = ThreadPoolExecutor(max_workers=2, thread_name_prefix="chat-summary")
+
+
+def summarize_messages(model: str, summary: str, messages: Sequence[dict], max_tokens: int) -> str:
+    """Merge *messages* into the running *summary* with one non-streamed call."""
+    transcript = "\n".join(f"{m['role']}: {m['content']}" for m in messages)
+    prompt = SUMMARY_PROMPT.format(
+        words=max(50, int(max_tokens * 0.75)), summary=summary or "—", messages=transcript
+    )
+    options = {"temperature": 0, "num_predict": max_tokens * 2}
+    return ollama_generate(model, prompt, options=options)["response"].strip()
+
+
+class ChatMemory:
+    """Conversation state of one chat session (keep it in ``st.session_state``)."""
+
+    def __init__(self, budget_tokens: int = DEFAULT_BUDGET_TOKENS, min_recent: int = MIN_RECENT_MESSAGES):
+        self.budget_tokens = budget_tokens
+        self.min_recent = min_recent
+        self.messages: List[dict] = []  # the full conversation, for display
+        self.summary = ""
+        self.summarized = 0  # messages[:summarized] are folded into the summary
+        self._job: Optional[Future] = None
+
+    def add(self, role: str, content: str) -> None:
+        self.messages.append({"role": role, "content": content})
+
+    def clear(self) -> None:
+        self.messages, self.summary, self.summarized, self._job = [], "", 0, None
+
+    @property
+    def compacting(self) -> bool:
+        return self._job is not None and not self._job.done()
+
+    def _adopt(self) -> None:
+        """Take over a finished background summary (a failed one is simply retried later)."""
+        if self._job is None or not self._job.done():
+            return
+        job, self._job = self._job, None
+        try:
+            self.summary, self.summarized = job.result()
+        except Exception:  # noqa: BLE001 - keep the old summary, the turns stay verbatim
+            pass
+
+    def request_messages(self) -> List[dict]:
+        """Messages for ``/api/chat``: the summary as system message plus the recent turns."""
+        self._adopt()
+        messages = [{"role": "system", "content": SUMMARY_SYSTEM.format(summary=self.summary)}] if self.summary else []
+        return messages + self.messages[self.summarized:]
+
+    def tokens(self, model: Optional[str] = None) -> Tuple[int, int]:
+        """Estimated ``(summary tokens, verbatim tokens)`` of the next request."""
+        self._adopt()
+        recent = sum(estimate_tokens(m["content"], model) for m in self.messages[self.summarized:])
+        return estimate_tokens(self.summary, model), recent
+
+    def _split(self, model: str) -> int:
+        """Index from which messages stay verbatim after compaction (half the budget)."""
+        keep_tokens, split = 0, len(self.messages)
+        for index in range(len(self.messages) - 1, self.summarized - 1, -1):
+            tokens = estimate_tokens(self.messages[index]["content"], model)
+            if len(self.messages) - index > self.min_recent and keep_tokens + tokens > self.budget_tokens // 2:
+                break
+            keep_tokens += tokens
+            split = index
+        # The verbatim part starts with a user turn, never with a lone answer.
+        while split > self.summarized and self.messages[split]["role"] != "user":
+            split -= 1
+        return split
+
+    def compact_async(self, model: str) -> bool:
+        """Start summarizing old turns in the background if the budget is exceeded.
+
+        Returns whether a summary job was started. Call it after the reply has
+        been rendered so the summary never delays an answer.
+        """
+        self._adopt()
+        if self.compacting or self.tokens(model)[1] <= self.budget_tokens:
+            return False
+        split = self._split(model)
+        if split <= self.summarized:
+            return False
+        summary, folded = self.summary, list(self.messages[self.summarized:split])
+        max_tokens = max(64, self.budget_tokens // 3)
+
+        def run() -> Tuple[str, int]:
+            return summarize_messages(model, summary, folded, max_tokens), split
+
+        self._job = _summarizer.submit(run)
+        return True
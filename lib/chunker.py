@@ -0,0 +1,198 @@
+"""Token-aware streaming text chunker.
+
+Works as a generator over a stream of pages: text is split into sentences,
+sentences are packed into chunks of at most ``max_tokens`` (estimated from
+the character count for the model family), and chunks close at paragraph
+breaks when they are already reasonably full. Only the text of the chunk
+being built is buffered, never the whole document. Every chunk carries its
+character offsets in the page stream (pages joined by ``"\\n"``) and the
+page it starts on, for citations.
+
+Example:
+    >>> for chunk in chunk_pages(iter_pdf_pages(data), max_tokens=256, model="llama3.2"):
+    ...     print(chunk.page, chunk.start, chunk.tokens)
+"""
+from __future__ import annotations
+
+import math
+import re
+from bisect import bisect_right
+from dataclasses import dataclass
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+__all__ = ["CHUNKER_VERSION", "Chunk", "chars_per_token", "estimate_tokens", "chunk_pages", "chunk_text"]
+
+DEFAULT_CHARS_PER_TOKEN = 4.0
+# Bump whenever the same input and settings can produce different chunks, so
+# persisted chunks (e.g. ``FolderIndex``) are rebuilt.
+CHUNKER_VERSION = 2
+
+# Rough characters per token by model family (larger vocabularies -> more characters per token).
+_CHARS_PER_TOKEN = (
+    ("llama3", 4.2),
+    ("qwen", 4.0),
+    ("gemma", 4.0),
+    ("gpt-oss", 4.2),
+    ("deepseek", 3.8),
+    ("phi", 3.6),
+    ("mistral", 3.5),
+    ("mixtral", 3.5),
+    ("llama2", 3.4),
+    ("nomic-embed", 3.6),
+)
+
+# End of a sentence (followed by whitespace) or a paragraph break. Closing quotes
+# and brackets after the punctuation stay with the sentence: the split happens
+# after them (lookbehinds need a fixed width, hence up to two closers).
+_closer = "[\"'»«“”)\\]]"
+_boundary = re.compile(
+    rf"(?:(?<=[.!?…])|(?<=[.!?…]{_closer})|(?<=[.!?…]{_closer}{_closer}))\s+|\n[ \t]*\n\s*"
+)
+_space = re.compile(r"\s")
+
+
+@dataclass
+class Chunk:
+    text: str
+    start: int  # offset of the first character in the page stream
+    end: int  # offset after the last character
+    page: int  # index of the page the chunk starts on
+    tokens: int  # estimated token count
+
+
+def chars_per_token(model: Optional[str] = None) -> float:
+    """Return the approximate characters per token for *model*'s family."""
+    name = (model or "").lower()
+    for prefix, value in _CHARS_PER_TOKEN:
+        if prefix in name:
+            return value
+    return DEFAULT_CHARS_PER_TOKEN
+
+
+def estimate_tokens(text: str, model: Optional[str] = None) -> int:
+    return math.ceil(len(text) / chars_per_token(model))
+
+
+def _units(buffer: str, offset: int, final: bool) -> Tuple[List[Tuple[int, int, bool]], int]:
+    """Split ``buffer`` (starting at stream *offset*) into sentence units.
+
+    Returns ``(units, consumed)`` with units as ``(start, end, starts_paragraph)``
+    in stream offsets. Without *final* the trailing, possibly unfinished
+    sentence is left unconsumed.
+    """
+    units: List[Tuple[int, int, bool]] = []
+
+    def add(start: int, end: int, paragraph: bool) -> None:
+        piece = buffer[start:end]
+        stripped = piece.strip()
+        if stripped:
+            start += len(piece) - len(piece.lstrip())
+            units.append((offset + start, offset + start + len(stripped), paragraph))
+
+    position, paragraph = 0, True
+    for match in _boundary.finditer(buffer):
+        add(position, match.start(), paragraph)
+        position = match.end()
+        paragraph = buffer.count("\n", match.start(), match.end()) >= 2
+    if final and position < len(buffer):
+        add(position, len(buffer), paragraph)
+        position = len(buffer)
+    return units, position
+
+
+def chunk_pages(
+    pages: Iterable[str],
+    max_tokens: int = 256,
+    overlap_tokens: int = 0,
+    model: Optional[str] = None,
+    chars_per_tok: Optional[float] = None,
+) -> Iterator[Chunk]:
+    """Yield chunks of at most *max_tokens* from a stream of page texts.
+
+    Chunks prefer paragraph and sentence boundaries; a single sentence longer
+    than the budget is split at whitespace. With *overlap_tokens* the last
+    sentences of a chunk (up to that many tokens) are repeated at the start of
+    the next one.
+    """
+    cpt = chars_per_tok or chars_per_token(model)
+    max_chars = max(1, int(max_tokens * cpt))
+    overlap_chars = int(overlap_tokens * cpt)
+    # Close a chunk at a paragraph break once it is this full.
+    paragraph_chars = int(max_chars * 0.6)
+
+    page_starts: List[int] = []
+    text = ""  # buffered stream text, starting at stream offset `base`
+    base = 0
+    scanned = 0  # stream offset up to which sentences have been split off
+    pending: List[Tuple[int, int, bool]] = []  # sentence units of the chunk being built
+
+    def make(units: List[Tuple[int, int, bool]]) -> Chunk:
+        start, end = units[0][0], units[-1][1]
+        body = text[start - base : end - base]
+        page = max(0, bisect_right(page_starts, start) - 1)
+        return Chunk(body, start, end, page, math.ceil(len(body) / cpt))
+
+    def hard_split(start: int, end: int, paragraph: bool) -> Iterator[Tuple[int, int, bool]]:
+        """Cut an oversized sentence at the last whitespace before each limit."""
+        while end - start > max_chars:
+            window = text[start - base : start - base + max_chars]
+            cut = max((m.start() for m in _space.finditer(window)), default=0) or max_chars
+            yield start, start + cut, paragraph
+            paragraph = False
+            start += cut
+            while start < end and text[start - base].isspace():
+                start += 1
+        if end > start:
+            yield start, end, False
+
+    def pack(units: List[Tuple[int, int, bool]]) -> Iterator[Chunk]:
+        nonlocal pending
+        for unit in units:
+            parts = list(hard_split(*unit)) if unit[1] - unit[0] > max_chars else [unit]
+            for start, end, paragraph in parts:
+                size = end - pending[0][0] if pending else 0
+                full = pending and (
+                    end - pending[0][0] > max_chars or (paragraph and size >= paragraph_chars)
+                )
+                if full:
+                    yield make(pending)
+                    # Carry trailing sentences as overlap, if they leave room for the new one.
+                    carry: List[Tuple[int, int, bool]] = []
+                    for previous in reversed(pending):
+                        if pending[-1][1] - previous[0] > overlap_chars or end - previous[0] > max_chars:
+                            break
+                        carry.insert(0, previous)
+                    pending = carry
+                pending.append((start, end, paragraph))
+
+    def trim() -> None:
+        """Drop buffered text that no pending or future chunk can reference."""
+        nonlocal text, base
+        keep = pending[0][0] if pending else scanned
+        if keep > base:
+            text = text[keep - base :]
+            base = keep
+
+    stream_end = 0
+    for index, page in enumerate(pages):
+        if index:
+            text += "\n"
+            stream_end += 1
+        page_starts.append(stream_end)
+        text += page
+        stream_end += len(page)
+        units, consumed = _units(text[scanned - base :], scanned, final=False)
+        scanned += consumed
+        yield from pack(units)
+        trim()
+
+    units, consumed = _units(text[scanned - base :], scanned, final=True)
+    scanned += consumed
+    yield from pack(units)
+    if pending:
+        yield make(pending)
+
+
+def chunk_text(text: str, max_tokens: int = 256, overlap_tokens: int = 0, **kwargs) -> Iterator[Chunk]:
+    """Chunk a single string; see ``chunk_pages``."""
+    return chunk_pages([text], max_tokens, overlap_tokens, **kwargs)
@@ -0,0 +1,363 @@
+"""Answer table questions by running a model-written query locally.
+
+Instead of pasting rows into the prompt, the model only sees the schema and
+the sketch profile (``lib.csv_profile``) and answers with one query, which is
+executed over the full table here:
+
+* DuckDB SQL (preferred): a single ``SELECT``/``WITH`` statement over the
+  table ``data``, run with file access disabled and the configuration
+  locked, interrupted after a timeout and capped at a row limit.
+* pandas fallback when DuckDB is not installed: one expression on ``df``,
+  checked against an AST whitelist before evaluation.
+
+Only the small result goes back to the model for the written answer.
+
+Example:
+    >>> query, result, truncated = answer_with_query(model, profile, upload, question)
+"""
+from __future__ import annotations
+
+import ast
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+from typing import Any, List, Sequence, Tuple
+
+import pandas as pd
+
+from lib.csv_profile import CSVProfile
+from lib.table_cache import Source, open_table, read_frame
+from lib.helper_ollama import generate as ollama_generate
+
+__all__ = [
+    "QueryError",
+    "query_engine",
+    "load_table",
+    "query_prompt",
+    "extract_query",
+    "validate_sql",
+    "validate_pandas",
+    "run_query",
+    "answer_with_query",
+    "result_prompt",
+]
+
+TABLE = "data"
+MAX_ROWS = 1000
+TIMEOUT_S = 15.0
+
+
+class QueryError(ValueError):
+    """The query was rejected, failed or timed out."""
+
+
+def query_engine() -> str:
+    """Return ``"sql"`` if DuckDB is available, otherwise ``"pandas"``."""
+    try:
+        import duckdb  # noqa: F401
+    except ImportError:
+        return "pandas"
+    return "sql"
+
+
+# -- loading --------------------------------------------------------------------------------------
+def load_table(source: Source):
+    """Return the table memory-mapped from the Arrow cache (see ``lib.table_cache``)."""
+    return open_table(source)
+
+
+# -- prompting ------------------------------------------------------------------------------------
+SQL_PROMPT = (
+    "Du schreibst genau eine DuckDB-SQL-Abfrage (nur SELECT oder WITH … SELECT) über die Tabelle "
+    f"`{TABLE}`, die die Frage beantwortet. Das Ergebnis soll klein sein (aggregieren, sortieren, "
+    "LIMIT). Spaltennamen mit Leer- oder Sonderzeichen in doppelte Anführungszeichen setzen.\n"
+    "Antworte nur mit der Abfrage in einem ```sql```-Block.\n\n"
+    "Schema und Profil:\n{profile}\n\nFrage: {question}"
+)
+
+PANDAS_PROMPT = (
+    "Du schreibst genau einen pandas-Ausdruck über den DataFrame `df`, der die Frage beantwortet "
+    "(z. B. df.groupby(\"A\")[\"B\"].mean().nlargest(5)). Keine Zuweisungen, keine Importe, "
+    "keine Lambdas. Das Ergebnis soll klein sein.\n"
+    "Antworte nur mit dem Ausdruck in einem ```python```-Block.\n\n"
+    "Schema und Profil:\n{profile}\n\nFrage: {question}"
+)
+
+RETRY_PROMPT = "\n\nDein vorheriger Versuch\n{query}\nist fehlgeschlagen: {error}\nKorrigiere ihn."
+
+RESULT_PROMPT = (
+    "Beantworte die Frage auf Deutsch anhand des Abfrageergebnisses über die vollständige Tabelle "
+    "({rows} Zeilen). Nenne die wichtigsten Zahlen.\n\n"
+    "Frage: {question}\n\nAbfrage:\n{query}\n\nErgebnis{truncated}:\n{result}"
+)
+
+_code_block = re.compile(r"```[a-zA-Z]*\s*\n?(.*?)```", re.S)
+
+
+def query_prompt(profile: CSVProfile, question: str, engine: str = "sql") -> str:
+    template = SQL_PROMPT if engine == "sql" else PANDAS_PROMPT
+    return template.format(profile=profile.to_text(), question=question)
+
+
+def extract_query(text: str) -> str:
+    """Return the first fenced code block of a model answer (or the whole answer)."""
+    match = _code_block.search(text)
+    return (match.group(1) if match else text).strip().rstrip(";").strip()
+
+
+def result_prompt(
+    profile: CSVProfile, question: str, query: str, result: pd.DataFrame, truncated: bool, max_rows: int = 50
+) -> str:
+    return RESULT_PROMPT.format(
+        rows=profile.rows,
+        question=question,
+        query=query,
+        truncated=f" (erste {max_rows} Zeilen)" if truncated or len(result) > max_rows else "",
+        result=result.head(max_rows).to_csv(index=False),
+    )
+
+
+# -- validation -----------------------------------------------------------------------------------
+_FORBIDDEN_SQL = re.compile(
+    r"\b(attach|detach|copy|export|import|install|load|pragma|set|reset|call|create|insert|update|"
+    r"delete|drop|alter|truncate|vacuum|checkpoint|use|begin|commit|rollback|"
+    r"read_\w+|glob|sniff_csv|parquet_\w+|query_table|getenv)\b",
+    re.I,
+)
+_sql_literals = re.compile(r"'(?:[^']|'')*'|\"(?:[^\"]|\"\")*\"")
+_sql_comments = re.compile(r"--[^\n]*|/\*.*?\*/", re.S)
+
+
+def validate_sql(sql: str) -> str:
+    """Accept a single read-only ``SELECT``/``WITH`` statement; raise ``QueryError`` otherwise."""
+    sql = _sql_comments.sub(" ", sql).strip().rstrip(";").strip()
+    # Keywords inside string literals and quoted identifiers do not count.
+    code = _sql_literals.sub("''", sql)
+    if ";" in code:
+        raise QueryError("Nur eine einzelne Abfrage ist erlaubt.")
+    if not re.match(r"(select|with)\b", code, re.I):
+        raise QueryError("Nur SELECT-Abfragen sind erlaubt.")
+    forbidden = _FORBIDDEN_SQL.search(code)
+    if forbidden:
+        raise QueryError(f"Nicht erlaubt: {forbidden.group(0)}")
+    return sql
+
+
+ALLOWED_METHODS = frozenset(
+    """
+    abs agg aggregate all any astype between contains corr count cumsum describe day dropna
+    drop_duplicates dt endswith fillna groupby head idxmax idxmin iloc isin isna len loc lower
+    max mean median min month nlargest notna nsmallest nunique pivot_table quantile rank rename
+    reset_index round size sort_index sort_values startswith std str strip sum tail to_frame
+    unique upper value_counts var year
+    """.split()
+)
+
+# agg/aggregate/pivot_table look up string arguments as DataFrame methods
+# (df.agg("to_csv", ...) would write a file): only these reducers may be named.
+AGG_METHODS = frozenset({"agg", "aggregate", "pivot_table"})
+ALLOWED_REDUCERS = frozenset({"sum", "mean", "min", "max", "count", "median", "std", "var", "nunique"})
+
+# pandas resolves methods before columns: df.to_csv stays the method even if a
+# column is called "to_csv". Such columns are only reachable as df["to_csv"].
+_PANDAS_ATTRIBUTES = frozenset().union(
+    *(
+        dir(cls)
+        for cls in (
+            pd.DataFrame, pd.Series, pd.Series.str, pd.Series.dt,
+            pd.core.groupby.DataFrameGroupBy, pd.core.groupby.SeriesGroupBy,
+        )
+    )
+)
+
+_ALLOWED_NODES = (
+    ast.Expression, ast.Name, ast.Attribute, ast.Call, ast.Subscript, ast.Slice, ast.Compare,
+    ast.BoolOp, ast.BinOp, ast.UnaryOp, ast.Constant, ast.List, ast.Tuple, ast.Dict, ast.keyword,
+    ast.Load, ast.cmpop, ast.operator, ast.unaryop, ast.boolop,
+)
+
+
+def _check_reducers(spec: ast.AST) -> None:
+    """Accept a reducer name, a list of them, or a ``{column: reducer(s)}`` dict."""
+    if isinstance(spec, ast.Constant) and isinstance(spec.value, str):
+        if spec.value not in ALLOWED_REDUCERS:
+            raise QueryError(f"Nicht erlaubte Aggregation: {spec.value!r}")
+    elif isinstance(spec, (ast.List, ast.Tuple)) and spec.elts:
+        for element in spec.elts:
+            _check_reducers(element)
+    elif isinstance(spec, ast.Dict) and spec.values:
+        for key, value in zip(spec.keys, spec.values):
+            if not (isinstance(key, ast.Constant) and isinstance(key.value, str)) or isinstance(value, ast.Dict):
+                raise QueryError("Ungültige Aggregation.")
+            _check_reducers(value)
+    else:
+        raise QueryError(f"Aggregationen nur als Name aus: {', '.join(sorted(ALLOWED_REDUCERS))}")
+
+
+def _check_aggregation(call: ast.Call) -> None:
+    """Restrict the arguments of agg/aggregate/pivot_table to whitelisted reducers."""
+    method = call.func.attr
+    if method == "pivot_table":
+        if call.args:
+            raise QueryError("pivot_table nur mit Schlüsselwort-Argumenten.")
+        for keyword in call.keywords:
+            if keyword.arg is None:
+                raise QueryError("Nicht erlaubt: **-Argumente")
+            if keyword.arg == "aggfunc":
+                _check_reducers(keyword.value)
+        return
+    if len(call.args) > 1:
+        raise QueryError(f"{method} erlaubt nur ein Argument.")
+    for spec in call.args:
+        _check_reducers(spec)
+    for keyword in call.keywords:
+        if keyword.arg == "func":
+            _check_reducers(keyword.value)
+        elif (
+            # named aggregation: .agg(total=("Spalte", "sum"))
+            keyword.arg is not None
+            and isinstance(keyword.value, ast.Tuple)
+            and len(keyword.value.elts) == 2
+            and isinstance(keyword.value.elts[0], ast.Constant)
+        ):
+            _check_reducers(keyword.value.elts[1])
+        else:
+            raise QueryError(f"Nicht erlaubtes Argument für {method}: {keyword.arg}")
+
+
+def validate_pandas(expression: str, columns: Sequence[str]) -> ast.Expression:
+    """Parse *expression* and check it against the whitelist; raise ``QueryError`` otherwise."""
+    try:
+        tree = ast.parse(expression, mode="eval")
+    except SyntaxError as e:
+        raise QueryError(f"Ungültiger Ausdruck: {e.msg}")
+    for node in ast.walk(tree):
+        if not isinstance(node, _ALLOWED_NODES):
+            raise QueryError(f"Nicht erlaubt: {type(node).__name__}")
+        if isinstance(node, ast.Name) and node.id != "df":
+            raise QueryError(f"Unbekannter Name: {node.id}")
+        if isinstance(node, ast.Attribute) and node.attr not in ALLOWED_METHODS:
+            if node.attr.startswith("_") or node.attr not in columns:
+                raise QueryError(f"Nicht erlaubt: .{node.attr}")
+            if node.attr in _PANDAS_ATTRIBUTES:
+                raise QueryError(f"Spalte {node.attr!r} nur als df[{node.attr!r}] ansprechen.")
+        if isinstance(node, ast.Call) and not isinstance(node.func, ast.Attribute):
+            raise QueryError("Nur Methodenaufrufe sind erlaubt.")
+        if isinstance(node, ast.Call) and node.func.attr in AGG_METHODS:
+            _check_aggregation(node)
+    return tree
+
+
+def _referenced_columns(tree: ast.Expression, columns: Sequence[str]) -> List[str]:
+    names = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Constant) and isinstance(node.value, str):
+            names.add(node.value)
+        elif isinstance(node, ast.Attribute):
+            names.add(node.attr)
+    return [c for c in columns if c in names]
+
+
+# -- execution ------------------------------------------------------------------------------------
+def _as_frame(value: Any) -> pd.DataFrame:
+    if isinstance(value, pd.DataFrame):
+        return value.reset_index() if not isinstance(value.index, pd.RangeIndex) else value
+    if isinstance(value, pd.Series):
+        return value.reset_index() if not isinstance(value.index, pd.RangeIndex) else value.to_frame()
+    return pd.DataFrame({"ergebnis": [value]})
+
+
+def _run_sql(table, sql: str, max_rows: int, timeout: float) -> Tuple[pd.DataFrame, bool]:
+    import duckdb
+
+    con = duckdb.connect()
+    try:
+        con.register(TABLE, table)
+        # From here on the query can read `data` only: no files, no extensions, no settings.
+        con.execute("SET enable_external_access = false")
+        con.execute("SET lock_configuration = true")
+        timer = threading.Timer(timeout, con.interrupt)
+        timer.start()
+        try:
+            result = con.execute(f"SELECT * FROM ({sql}) AS q LIMIT {max_rows + 1}").fetch_df()
+        except duckdb.InterruptException:
+            raise QueryError(f"Abfrage nach {timeout:g} s abgebrochen.")
+        except duckdb.Error as e:
+            raise QueryError(str(e).splitlines()[0])
+        finally:
+            timer.cancel()
+    finally:
+        con.close()
+    return result.head(max_rows), len(result) > max_rows
+
+
+def _run_pandas(source: Source, expression: str, columns: Sequence[str], max_rows: int, timeout: float):
+    tree = validate_pandas(expression, columns)
+    usecols = _referenced_columns(tree, columns) or None
+    code = compile(tree, "<query>", "eval")
+
+    def evaluate():
+        df = read_frame(source, usecols)
+        return _as_frame(eval(code, {"__builtins__": {}}, {"df": df}))  # noqa: S307 - whitelisted AST
+
+    # pandas cannot be interrupted; on timeout the worker is abandoned and finishes in the background.
+    pool = ThreadPoolExecutor(max_workers=1)
+    try:
+        result = pool.submit(evaluate).result(timeout=timeout)
+    except FutureTimeout:
+        raise QueryError(f"Abfrage nach {timeout:g} s abgebrochen.")
+    except QueryError:
+        raise
+    except Exception as e:
+        raise QueryError(f"{type(e).__name__}: {e}")
+    finally:
+        pool.shutdown(wait=False)
+    return result.head(max_rows), len(result) > max_rows
+
+
+def run_query(
+    source: Source,
+    query: str,
+    engine: str,
+    columns: Sequence[str] = (),
+    table=None,
+    max_rows: int = MAX_ROWS,
+    timeout: float = TIMEOUT_S,
+) -> Tuple[pd.DataFrame, bool]:
+    """Run a validated query over the full table; returns ``(result, truncated)``."""
+    if engine == "sql":
+        return _run_sql(table if table is not None else load_table(source), validate_sql(query), max_rows, timeout)
+    return _run_pandas(source, query, columns, max_rows, timeout)
+
+
+def answer_with_query(
+    model: str,
+    profile: CSVProfile,
+    source: Source,
+    question: str,
+    attempts: int = 2,
+    max_rows: int = MAX_ROWS,
+    timeout: float = TIMEOUT_S,
+) -> Tuple[str, pd.DataFrame, bool]:
+    """Let *model* write a query for *question* and run it locally.
+
+    A failing query is sent back once with the error message for a fix.
+    Returns ``(query, result, truncated)``; raises ``QueryError`` if no attempt succeeds.
+    """
+    engine = query_engine()
+    table = load_table(source) if engine == "sql" else None
+    prompt = query_prompt(profile, question, engine)
+    query, error = "", None
+    for _ in range(max(1, attempts)):
+        retry = RETRY_PROMPT.format(query=query, error=error) if error else ""
+        answer = ollama_generate(model, prompt + retry, options={"temperature": 0})["response"]
+        query = extract_query(answer)
+        try:
+            result, truncated = run_query(
+                source, query, engine, profile.column_names, table, max_rows, timeout
+            )
+            return query, result, truncated
+        except QueryError as e:
+            error = str(e)
+    raise QueryError(f"{error}\n\n{query}")
@@ -0,0 +1,92 @@
+"""Stable document prefixes for repeated questions over the same document.
+
+Ollama keeps the evaluated prompt of each parallel slot in its KV cache and
+reuses the longest common prefix for the next request. Prompts built here
+therefore put the instructions and the document first and the question last,
+so a follow-up question over the same document only evaluates the new
+question tokens. Two things would defeat that reuse:
+
+* a different ``num_ctx`` reloads the model, so the session fixes one value
+  (rounded up to a power of two) per document;
+* a prompt longer than the context is truncated *at the start*, which shifts
+  the prefix, so ``num_ctx`` always covers the prefix plus a reserve.
+
+A ``DocumentSession`` per (model, prefix hash) also records the prompt
+tokens Ollama actually evaluated, to show the effect.
+
+Example:
+    >>> prefix = document_prefix("Analysiere das Dokument.", text[:12000], name="bericht.pdf")
+    >>> session = session_for(st.session_state.setdefault("_document_sessions", {}), model, prefix)
+    >>> generate(model, document_prompt(prefix, question), options=session.options())
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Dict, List, MutableMapping, Optional, Tuple
+
+from lib.cache_utils import content_hash
+from lib.chunker import estimate_tokens
+
+__all__ = ["document_prefix", "document_prompt", "context_size", "DocumentSession", "session_for"]
+
+MIN_CTX = 4096
+RESERVE_TOKENS = 1536  # question and answer on top of the prefix
+
+
+def document_prefix(instructions: str, document: str, name: Optional[str] = None) -> str:
+    """Instructions and document, identical for every question about it."""
+    title = f"Dokument: {name}" if name else "Dokument"
+    return f"{instructions}\n\n### {title}\n{document}\n\n"
+
+
+def document_prompt(prefix: str, question: str) -> str:
+    """Append *question* to the stable *prefix*; nothing question-specific comes before it."""
+    return f"{prefix}### Frage\n{question}"
+
+
+def context_size(prefix: str, model: Optional[str] = None, reserve: int = RESERVE_TOKENS) -> int:
+    """Smallest power of two ≥ ``MIN_CTX`` that fits *prefix* plus *reserve* tokens."""
+    needed = estimate_tokens(prefix, model) + reserve
+    size = MIN_CTX
+    while size < needed:
+        size *= 2
+    return size
+
+
+@dataclass
+class DocumentSession:
+    """Questions asked about one document with one model."""
+
+    model: str
+    prefix_hash: str
+    prefix_tokens: int  # estimated
+    num_ctx: int
+    prompt_tokens: List[int] = field(default_factory=list)  # evaluated per question (Ollama)
+
+    def options(self) -> Dict[str, int]:
+        return {"num_ctx": self.num_ctx}
+
+    def record(self, prompt_tokens: int) -> None:
+        self.prompt_tokens.append(prompt_tokens)
+
+    def caption(self) -> str:
+        if not self.prompt_tokens:
+            return ""
+        text = f"🧠 Frage {len(self.prompt_tokens)} zu diesem Dokument • Präfix ~{self.prefix_tokens} Tokens"
+        if len(self.prompt_tokens) > 1:
+            text += f" • ausgewertet: {self.prompt_tokens[0]} → {self.prompt_tokens[-1]} Prompt-Tokens"
+        return text
+
+
+def session_for(store: MutableMapping[Tuple[str, str], DocumentSession], model: str, prefix: str) -> DocumentSession:
+    """Return the session for (*model*, *prefix*) from *store*, creating it on first use."""
+    key = (model, content_hash(prefix))
+    session = store.get(key)
+    if session is None:
+        session = store[key] = DocumentSession(
+            model=model,
+            prefix_hash=key[1],
+            prefix_tokens=estimate_tokens(prefix, model),
+            num_ctx=context_size(prefix, model),
+        )
+    return session
@@ -0,0 +1,150 @@
+"""Shared document ingestion: lazy, page-parallel PDF text extraction with caching.
+
+Pages are extracted with ``pypdf``; a page that fails is retried with
+``pdfminer`` on its own instead of re-parsing the whole document. Fully
+extracted documents are cached by content hash, so a PDF is parsed once.
+"""
+from __future__ import annotations
+
+import io
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, List, Optional
+
+from lib.cache_utils import cache_dir, content_hash, read_json, write_json_atomic
+
+__all__ = [
+    "pdf_page_count",
+    "iter_pdf_pages",
+    "extract_pdf_pages",
+    "read_pdf_text",
+    "preview_pdf",
+]
+
+# Below this many pages the process pool costs more than it saves.
+PARALLEL_MIN_PAGES = 24
+MAX_WORKERS = max(1, min(8, (os.cpu_count() or 2) - 1))
+
+
+def _cache_path(digest: str):
+    return cache_dir("documents") / f"{digest}.pages.json"
+
+
+def _cached_pages(data: bytes, digest: Optional[str] = None) -> Optional[List[str]]:
+    return read_json(_cache_path(digest or content_hash(data)))
+
+
+def _reader(data: bytes):
+    from pypdf import PdfReader
+
+    return PdfReader(io.BytesIO(data))
+
+
+def _pdfminer_page(data: bytes, index: int) -> str:
+    try:
+        from pdfminer.high_level import extract_text
+
+        return extract_text(io.BytesIO(data), page_numbers=[index])
+    except Exception:
+        return ""
+
+
+def _extract_page(reader, data: bytes, index: int) -> str:
+    """Extract one page with pypdf, falling back to pdfminer for just that page."""
+    try:
+        return reader.pages[index].extract_text() or ""
+    except Exception:
+        return _pdfminer_page(data, index)
+
+
+def _extract_range(data: bytes, start: int, stop: int) -> List[str]:
+    """Worker: extract pages ``start`` to ``stop`` (exclusive)."""
+    try:
+        reader = _reader(data)
+    except Exception:
+        return [_pdfminer_page(data, i) for i in range(start, stop)]
+    return [_extract_page(reader, data, i) for i in range(start, stop)]
+
+
+def pdf_page_count(data: bytes) -> int:
+    cached = _cached_pages(data)
+    if cached is not None:
+        return len(cached)
+    return len(_reader(data).pages)
+
+
+def iter_pdf_pages(data: bytes, start: int = 0, stop: Optional[int] = None) -> Iterator[str]:
+    """Yield the text of each page lazily, in order.
+
+    Served from the cache if the document was extracted before; otherwise
+    pages are parsed one at a time as the caller consumes them.
+    """
+    cached = _cached_pages(data)
+    if cached is not None:
+        yield from cached[start:stop]
+        return
+
+    try:
+        reader = _reader(data)
+        count = len(reader.pages)
+    except Exception:
+        # pypdf cannot even open the file: let pdfminer handle it page by page
+        reader, count = None, None
+    if reader is None:
+        from pdfminer.pdfpage import PDFPage
+
+        count = sum(1 for _ in PDFPage.get_pages(io.BytesIO(data)))
+    for index in range(start, count if stop is None else min(stop, count)):
+        if reader is None:
+            yield _pdfminer_page(data, index)
+        else:
+            yield _extract_page(reader, data, index)
+
+
+def extract_pdf_pages(data: bytes, max_workers: int = MAX_WORKERS) -> List[str]:
+    """Return the text of all pages, extracting page ranges in a process pool.
+
+    The result is cached by content hash.
+    """
+    digest = content_hash(data)
+    cached = _cached_pages(data, digest)
+    if cached is not None:
+        return cached
+
+    count = None
+    try:
+        count = len(_reader(data).pages)
+    except Exception:
+        pass
+
+    if count is None or count < PARALLEL_MIN_PAGES or max_workers < 2:
+        pages = list(iter_pdf_pages(data))
+    else:
+        step = -(-count // max_workers)  # ceil: one contiguous range per worker
+        ranges = [(i, min(i + step, count)) for i in range(0, count, step)]
+        # "spawn" keeps worker start-up safe inside multi-threaded servers like Streamlit.
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=len(ranges), mp_context=context) as pool:
+            futures = [pool.submit(_extract_range, data, a, b) for a, b in ranges]
+            pages = [page for future in futures for page in future.result()]
+
+    write_json_atomic(_cache_path(digest), pages)
+    return pages
+
+
+def read_pdf_text(data: bytes) -> str:
+    """Return the full document text (pages joined by newlines)."""
+    return "\n".join(extract_pdf_pages(data))
+
+
+def preview_pdf(data: bytes, max_chars: int = 1200) -> str:
+    """Return the first *max_chars* characters, parsing only as many pages as needed."""
+    parts: List[str] = []
+    size = 0
+    for page in iter_pdf_pages(data):
+        parts.append(page)
+        size += len(page) + 1
+        if size >= max_chars:
+            break
+    return "\n".join(parts)[:max_chars]
@@ -0,0 +1,313 @@
+"""Incremental, manifest-backed index of the text files in a folder.
+
+The manifest records path, size, mtime and content hash for every file.
+A re-scan only stats files; just the added or changed ones are read and
+re-chunked, deleted ones are dropped. Chunks are stored per content hash (and
+chunk size and chunker version), so renamed or touched-but-unchanged files
+are not chunked again. The BM25 index is merged from per-file segments
+that are cached the same way, so only changed files are tokenized again. An
+optional ``watchdog`` observer keeps the index hot without re-scanning at all.
+
+Example:
+    >>> index = FolderIndex("./docs")
+    >>> index.refresh()
+    ScanResult(added=12, changed=0, deleted=0, unchanged=0)
+"""
+from __future__ import annotations
+
+import json
+import os
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+from lib.bm25 import BM25Index, BM25Segment
+from lib.cache_utils import cache_dir, content_hash, read_json, write_json_atomic
+from lib.chunker import CHUNKER_VERSION
+from lib.map_reduce import split_text
+
+__all__ = ["FolderIndex", "ScanResult"]
+
+DEFAULT_EXTENSIONS = (".txt", ".md")
+DEFAULT_CHUNK_CHARS = 1000
+
+
+@dataclass
+class ScanResult:
+    added: int = 0
+    changed: int = 0
+    deleted: int = 0
+    unchanged: int = 0
+
+    @property
+    def modified(self) -> bool:
+        return bool(self.added or self.changed or self.deleted)
+
+
+class FolderIndex:
+    """Chunked text of all matching files below *root*, updated incrementally."""
+
+    def __init__(
+        self,
+        root: str,
+        extensions: Tuple[str, ...] = DEFAULT_EXTENSIONS,
+        chunk_chars: int = DEFAULT_CHUNK_CHARS,
+        index_dir: Optional[Path] = None,
+    ):
+        self.root = Path(root).expanduser().resolve()
+        self.extensions = tuple(e.lower() for e in extensions)
+        self.chunk_chars = chunk_chars
+        self.index_dir = index_dir or cache_dir("folders", content_hash(str(self.root))[:16])
+        self._chunk_dir = self.index_dir / "chunks"
+        self._chunk_dir.mkdir(parents=True, exist_ok=True)
+        self._segment_dir = self.index_dir / "bm25_segments"
+        self._manifest_path = self.index_dir / "manifest.json"
+
+        manifest = read_json(self._manifest_path, {}) or {}
+        if manifest.get("chunk_chars") != chunk_chars or manifest.get("chunker") != CHUNKER_VERSION:
+            manifest = {}  # chunking changed: rebuild
+        # relative path -> {"size", "mtime_ns", "sha256", "chunks"}
+        self.manifest: Dict[str, dict] = manifest.get("files", {})
+        self._chunks: Dict[str, List[str]] = {}  # sha256 -> chunks (loaded lazily)
+        self._segments: Dict[str, BM25Segment] = {}  # sha256 -> BM25 postings (loaded lazily)
+        self._lock = threading.RLock()
+        self._dirty: Set[str] = set()
+        self._full_scan = True  # the next refresh walks the tree (first use, directory moves)
+        self._observer = None
+        self.version = 0  # bumped on every modification, e.g. to invalidate derived indexes
+        self._fingerprint: Tuple[int, str] = (-1, "")
+        self._bm25: Optional[BM25Index] = None
+
+    # -- scanning ---------------------------------------------------------------------------------
+    def _walk(self, folder: Path) -> Iterator[os.DirEntry]:
+        try:
+            entries = list(os.scandir(folder))
+        except OSError:
+            return
+        for entry in entries:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    yield from self._walk(Path(entry.path))
+                elif entry.name.lower().endswith(self.extensions) and entry.is_file():
+                    yield entry
+            except OSError:
+                continue
+
+    def _stem(self, digest: str) -> str:
+        return f"{digest}-{self.chunk_chars}-v{CHUNKER_VERSION}"
+
+    def _chunk_file(self, digest: str) -> Path:
+        return self._chunk_dir / f"{self._stem(digest)}.json"
+
+    def _segment_file(self, digest: str) -> Path:
+        return self._segment_dir / f"{self._stem(digest)}.npz"
+
+    def _read_and_chunk(self, path: Path, stat: os.stat_result, previous: Optional[dict]) -> Tuple[dict, bool]:
+        """Return the new manifest entry for *path* and whether its content changed."""
+        data = path.read_bytes()
+        digest = content_hash(data)
+        entry = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": digest}
+        if previous is not None and previous.get("sha256") == digest:
+            entry["chunks"] = previous.get("chunks", 0)
+            return entry, False
+
+        chunk_file = self._chunk_file(digest)
+        chunks = read_json(chunk_file)
+        if chunks is None:
+            chunks = split_text(data.decode("utf-8", errors="ignore"), self.chunk_chars)
+            write_json_atomic(chunk_file, chunks)
+        self._chunks[digest] = chunks
+        entry["chunks"] = len(chunks)
+        return entry, True
+
+    def _update_path(self, rel: str, result: ScanResult) -> None:
+        path = self.root / rel
+        previous = self.manifest.get(rel)
+        try:
+            stat = path.stat()
+        except OSError:
+            if previous is not None:
+                del self.manifest[rel]
+                result.deleted += 1
+            return
+        if previous and previous["size"] == stat.st_size and previous["mtime_ns"] == stat.st_mtime_ns:
+            result.unchanged += 1
+            return
+        try:
+            entry, content_changed = self._read_and_chunk(path, stat, previous)
+        except OSError:
+            return
+        self.manifest[rel] = entry
+        if previous is None:
+            result.added += 1
+        elif content_changed:
+            result.changed += 1
+        else:
+            result.unchanged += 1
+
+    def scan(self) -> ScanResult:
+        """Walk the folder and apply all additions, changes and deletions."""
+        result = ScanResult()
+        with self._lock:
+            self._full_scan = False
+            seen = set()
+            for entry in self._walk(self.root):
+                rel = os.path.relpath(entry.path, self.root)
+                seen.add(rel)
+                previous = self.manifest.get(rel)
+                stat = entry.stat()
+                if previous and previous["size"] == stat.st_size and previous["mtime_ns"] == stat.st_mtime_ns:
+                    result.unchanged += 1
+                    continue
+                self._update_path(rel, result)
+            for rel in [r for r in self.manifest if r not in seen]:
+                del self.manifest[rel]
+                result.deleted += 1
+            self._dirty.clear()
+            self._commit(result)
+        return result
+
+    def refresh(self) -> ScanResult:
+        """Bring the index up to date: full scan, or only the watcher's dirty paths."""
+        if self._observer is None or self._full_scan or not self.manifest:
+            return self.scan()
+        result = ScanResult()
+        with self._lock:
+            dirty, self._dirty = self._dirty, set()
+            for rel in dirty:
+                self._update_path(rel, result)
+            self._commit(result)
+        return result
+
+    def _commit(self, result: ScanResult) -> None:
+        if not result.modified and self._manifest_path.exists():
+            return
+        self.version += 1
+        write_json_atomic(
+            self._manifest_path,
+            {"chunk_chars": self.chunk_chars, "chunker": CHUNKER_VERSION, "files": self.manifest},
+        )
+        self._collect_garbage()
+
+    def _collect_garbage(self) -> None:
+        # Also removes the chunks of other chunk sizes or chunker versions.
+        live = {self._stem(entry["sha256"]) for entry in self.manifest.values()}
+        for folder, pattern, loaded in (
+            (self._chunk_dir, "*.json", self._chunks),
+            (self._segment_dir, "*.npz", self._segments),
+        ):
+            for path in folder.glob(pattern):
+                if path.stem not in live:
+                    path.unlink(missing_ok=True)
+                    loaded.pop(path.stem.split("-", 1)[0], None)
+
+    # -- access -----------------------------------------------------------------------------------
+    def chunks(self, rel: str) -> List[str]:
+        """Return the chunks of one indexed file."""
+        with self._lock:
+            digest = self.manifest[rel]["sha256"]
+            chunks = self._chunks.get(digest)
+            if chunks is None:
+                chunks = self._chunks[digest] = read_json(self._chunk_file(digest), [])
+            return chunks
+
+    def passages(self) -> Iterator[Tuple[str, int, str]]:
+        """Yield ``(relative path, chunk number, text)`` for the whole folder."""
+        with self._lock:
+            paths = sorted(self.manifest)
+        for rel in paths:
+            for number, text in enumerate(self.chunks(rel)):
+                yield rel, number, text
+
+    def __len__(self) -> int:
+        return len(self.manifest)
+
+    def fingerprint(self) -> str:
+        """Hash over all (path, content hash) pairs; changes whenever the corpus does."""
+        with self._lock:
+            if self._fingerprint[0] != self.version:
+                pairs = sorted((rel, entry["sha256"]) for rel, entry in self.manifest.items())
+                self._fingerprint = (self.version, content_hash(json.dumps([self.chunk_chars, CHUNKER_VERSION, pairs])))
+            return self._fingerprint[1]
+
+    # -- search -----------------------------------------------------------------------------------
+    def _segment(self, rel: str) -> BM25Segment:
+        """BM25 postings of one file's chunks, tokenized once per content."""
+        digest = self.manifest[rel]["sha256"]
+        segment = self._segments.get(digest)
+        if segment is None:
+            path = self._segment_file(digest)
+            segment = BM25Segment.load(path)
+            if segment is None:
+                segment = BM25Segment.build(self.chunks(rel))
+                segment.save(path)
+            self._segments[digest] = segment
+        return segment
+
+    def bm25(self) -> BM25Index:
+        """Return the BM25 index over all passages, re-merged only when files changed."""
+        with self._lock:
+            fingerprint = self.fingerprint()
+            if self._bm25 is not None and self._bm25.meta.get("fingerprint") == fingerprint:
+                return self._bm25
+            folder = self.index_dir / "bm25"
+            index = BM25Index.load(folder)
+            if index is None or index.meta.get("fingerprint") != fingerprint:
+                refs, segments = [], []
+                for rel in sorted(self.manifest):
+                    segment = self._segment(rel)
+                    refs.extend([rel, number] for number in range(len(segment.doc_len)))
+                    segments.append(segment)
+                index = BM25Index.merge(segments, refs)
+                index.save(folder, {"fingerprint": fingerprint})
+            self._bm25 = index
+            return index
+
+    def search(self, query: str, k: int = 8) -> List[Tuple[float, str, int, str]]:
+        """Return the top-*k* passages as ``(score, relative path, chunk number, text)``."""
+        hits = []
+        for score, (rel, number) in self.bm25().search(query, k):
+            chunks = self.chunks(rel) if rel in self.manifest else []
+            if number < len(chunks):
+                hits.append((score, rel, number, chunks[number]))
+        return hits
+
+    # -- watching ---------------------------------------------------------------------------------
+    def start_watching(self) -> bool:
+        """Track changes with ``watchdog``; returns ``False`` if it is not installed."""
+        if self._observer is not None:
+            return True
+        try:
+            from watchdog.events import FileSystemEventHandler
+            from watchdog.observers import Observer
+        except ImportError:
+            return False
+
+        index = self
+
+        class _Handler(FileSystemEventHandler):
+            def on_any_event(self, event):
+                if event.is_directory:
+                    # A created, moved or deleted folder brings or takes files without
+                    # events of their own; "modified" only accompanies file events.
+                    if event.event_type in ("created", "moved", "deleted"):
+                        with index._lock:
+                            index._full_scan = True
+                    return
+                for path in (event.src_path, getattr(event, "dest_path", "")):
+                    if path and str(path).lower().endswith(index.extensions):
+                        with index._lock:
+                            index._dirty.add(os.path.relpath(path, index.root))
+
+        observer = Observer()
+        observer.schedule(_Handler(), str(self.root), recursive=True)
+        observer.daemon = True
+        observer.start()
+        self._observer = observer
+        return True
+
+    def stop_watching(self) -> None:
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer = None
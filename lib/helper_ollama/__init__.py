@@ -5,10 +5,52 @@ This module provides functions to discover and filter locally installed Ollama m
 by function type: embedding, tools, vision, thinking, and chat.
 """
 
-import ollama as ollama_sdk
+import os
 
+from lib.helper_ollama import client
+from lib.helper_ollama.capabilities import capabilities_from_show, detect_capabilities
+from lib.helper_ollama.catalog import CAPABILITY_NAMES, Capability, ModelCatalog
+from lib.helper_ollama.client import OLLAMA, get_sdk_client
+from lib.helper_ollama.response_cache import (
+    get_response_cache,
+    make_key,
+    response_cache_enabled,
+)
 
-OLLAMA = "http://localhost:11434"
+
+def _fetch_local_models():
+    """Fetch the installed models from ``/api/tags`` and detect their capabilities."""
+    models = []
+    for model in client.get_json("/api/tags").get("models", []):
+        models.append({
+            "name": model.get("model") or model.get("name", ""),
+            "size": model.get("size", 0),
+            "modified_at": model.get("modified_at", ""),
+            "digest": model.get("digest", ""),
+            "details": model.get("details", {}),
+        })
+
+    # Metadata-based detection, cached on disk by digest
+    capabilities = detect_capabilities(models, fallback=_detect_model_capabilities)
+    for model in models:
+        model["capabilities"] = capabilities[model["name"]]
+    return models
+
+
+_catalog = ModelCatalog(
+    _fetch_local_models,
+    ttl=float(os.environ.get("OLLAMA_CATALOG_TTL", "60")),
+)
+
+
+def get_catalog():
+    """Return the process-wide model catalog (see ``lib.helper_ollama.catalog``)."""
+    return _catalog
+
+
+def invalidate_models(block=False):
+    """Drop the cached model list, e.g. after a model was pulled or deleted."""
+    _catalog.invalidate(block=block)
 
 
 def get_local_llms(func=None):
@@ -25,7 +67,8 @@ def get_local_llms(func=None):
               - None: Returns all models with detected capabilities
     
     Returns:
-        List of dictionaries containing model information including name, size, and capabilities
+        List of dictionaries containing model information including name, size, and capabilities.
+        The dictionaries are shared with the model catalog and must not be modified.
     
     Example:
         >>> # Get all vision models
@@ -39,43 +82,13 @@ def get_local_llms(func=None):
     """
     
     # Validate input
-    valid_functions = ["embedding", "tools", "vision", "thinking", "chat"]
+    valid_functions = list(CAPABILITY_NAMES)
     if func and func not in valid_functions:
         raise ValueError(f"Invalid func: {func}. Must be one of {valid_functions} or None")
     
     try:
-        # Get all installed models from Ollama using direct function
-        response = ollama_sdk.list()
-        all_models = response.get("models", [])
-        
-        # Filter models based on function
-        filtered_models = []
-        
-        for model in all_models:
-            model_name = getattr(model, 'model', '')
-            model_name_lower = model_name.lower()
-            
-            # Detect capabilities
-            capabilities = _detect_model_capabilities(model_name_lower)
-            
-            model_info = {
-                "name": model_name,
-                "size": getattr(model, 'size', 0),
-                "modified_at": getattr(model, 'modified_at', ''),
-                "digest": getattr(model, 'digest', ''),
-                "details": getattr(model, 'details', {}),
-                "capabilities": capabilities
-            }
-            
-            # Filter by function if specified
-            if func is None:
-                # Return all models with their capabilities
-                filtered_models.append(model_info)
-            elif func in capabilities:
-                # Return only models that support the specified function
-                filtered_models.append(model_info)
-        
-        return filtered_models
+        # Served from the cached catalog; the filter is an index lookup
+        return _catalog.models(CAPABILITY_NAMES[func] if func else Capability.NONE)
         
     except Exception as e:
         raise Exception(f"Failed to connect to Ollama or process models: {e}")
@@ -83,7 +96,10 @@ def get_local_llms(func=None):
 
 def _detect_model_capabilities(model_name_lower):
     """
-    Detect the capabilities of a model based on its name.
+    Guess the capabilities of a model based on its name.
+
+    Only used as a fallback when ``/api/show`` metadata is unavailable
+    (see ``lib.helper_ollama.capabilities``).
     
     Args:
         model_name_lower: Lowercase model name
@@ -194,20 +210,21 @@ def _supports_chat(model_name_lower):
 def get_model_info(model_name):
     """Get detailed information about a specific model."""
     try:
-        response = ollama_sdk.show(model_name)
+        response = client.post_json("/api/show", {"model": model_name})
         
-        # Add capability detection
-        capabilities = _detect_model_capabilities(model_name.lower())
+        # Add capability detection from the model metadata
+        capabilities = capabilities_from_show(response)
         
         # Create enhanced response
         enhanced_response = {
             "name": model_name,
             "capabilities": capabilities,
-            "details": getattr(response, 'details', {}),
-            "modelfile": getattr(response, 'modelfile', ''),
-            "parameters": getattr(response, 'parameters', ''),
-            "template": getattr(response, 'template', ''),
-            "system": getattr(response, 'system', ''),
+            "details": response.get('details', {}),
+            "model_info": response.get('model_info', {}),
+            "modelfile": response.get('modelfile', ''),
+            "parameters": response.get('parameters', ''),
+            "template": response.get('template', ''),
+            "system": response.get('system', ''),
         }
         
         return enhanced_response
@@ -258,53 +275,144 @@ def list_models_by_capability():
         }
 
 
-def generate(model_name, prompt, stream=False, **kwargs):
-    """Generate text using a specific model."""
+def model_digest(model_name):
+    """Return the digest of an installed model (falls back to the name)."""
     try:
-        response = ollama_sdk.generate(
+        model = _catalog.get(model_name)
+    except Exception:
+        model = None
+    return (model or {}).get("digest") or model_name
+
+
+def _cache_lookup(cache, model_name, endpoint, payload):
+    """Return ``(key, cached text)``; the key is ``None`` if caching is off."""
+    if not response_cache_enabled(cache):
+        return None, None
+    key = make_key(model_digest(model_name), endpoint, payload)
+    return key, get_response_cache().get(key)
+
+
+def _store_stream(parts, key, model_name, text_of):
+    """Pass streamed parts through and cache the full text once the stream is done."""
+    chunks = []
+    for part in parts:
+        chunks.append(text_of(part))
+        if part["done"]:
+            get_response_cache().put(key, model_name, "".join(chunks))
+        yield part
+
+
+def generate(model_name, prompt, stream=False, cache=None, **kwargs):
+    """Generate text using a specific model.
+
+    With ``cache=True`` identical requests are answered from the local response
+    cache (see ``lib.helper_ollama.response_cache``).
+    """
+    key, text = _cache_lookup(cache, model_name, "/api/generate", {"prompt": prompt, **kwargs})
+    if text is not None:
+        part = {"model": model_name, "response": text, "done": True, "cached": True}
+        return iter([part]) if stream else part
+
+    try:
+        response = get_sdk_client().generate(
             model=model_name,
             prompt=prompt,
             stream=stream,
             **kwargs
         )
-        return response
     except Exception as e:
         raise Exception(f"Failed to generate with {model_name}: {e}")
 
+    if key is None:
+        return response
+    if stream:
+        return _store_stream(response, key, model_name, lambda part: part["response"])
+    get_response_cache().put(key, model_name, response["response"])
+    return response
+
+
+def chat(model_name, messages, stream=False, cache=None, **kwargs):
+    """Chat with a model (``cache`` as in ``generate``)."""
+    key, text = _cache_lookup(cache, model_name, "/api/chat", {"messages": messages, **kwargs})
+    if text is not None:
+        part = {
+            "model": model_name,
+            "message": {"role": "assistant", "content": text},
+            "done": True,
+            "cached": True,
+        }
+        return iter([part]) if stream else part
 
-def chat(model_name, messages, stream=False, **kwargs):
-    """Chat with a model."""
     try:
-        response = ollama_sdk.chat(
+        response = get_sdk_client().chat(
             model=model_name,
             messages=messages,
             stream=stream,
             **kwargs
         )
-        return response
     except Exception as e:
         raise Exception(f"Failed to chat with {model_name}: {e}")
 
+    if key is None:
+        return response
+    if stream:
+        return _store_stream(response, key, model_name, lambda part: part["message"]["content"])
+    get_response_cache().put(key, model_name, response["message"]["content"])
+    return response
+
+
+def embeddings(model_name, text, cache=True, **kwargs):
+    """Generate embeddings using an embedding model.
+
+    Vectors are served from the persistent embedding cache when the same model
+    (digest) has embedded the same normalized text before.
+    """
+    def _embed(texts):
+        return [
+            get_sdk_client().embeddings(model=model_name, prompt=t, **kwargs)["embedding"]
+            for t in texts
+        ]
 
-def embeddings(model_name, text, **kwargs):
-    """Generate embeddings using an embedding model."""
     try:
-        response = ollama_sdk.embeddings(
-            model=model_name,
-            prompt=text,
-            **kwargs
-        )
-        return response
+        if cache and not kwargs:
+            from lib.helper_ollama.embedding_cache import cached_embed
+
+            vector = cached_embed(model_digest(model_name), [text], _embed)[0]
+            return {"embedding": vector.tolist()}
+        return {"embedding": _embed([text])[0]}
     except Exception as e:
         raise Exception(f"Failed to generate embeddings with {model_name}: {e}")
 
 
+# Async counterparts (imported last: the module builds on the client above)
+from lib.helper_ollama.aio import (  # noqa: E402
+    achat,
+    aembed,
+    agenerate,
+    gather_limited,
+    iter_limited,
+    run_async,
+)
+
+
 # Export main functions
 __all__ = [
+    "OLLAMA",
+    "Capability",
+    "get_catalog",
+    "invalidate_models",
     "get_local_llms",
     "get_model_info",
     "list_models_by_capability",
+    "model_digest",
+    "get_response_cache",
     "generate",
     "chat",
-    "embeddings"
+    "embeddings",
+    "agenerate",
+    "achat",
+    "aembed",
+    "gather_limited",
+    "iter_limited",
+    "run_async",
 ]
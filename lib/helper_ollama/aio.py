@@ -0,0 +1,212 @@
+"""Asyncio counterparts of the Ollama helpers with bounded concurrent fan-out.
+
+Example:
+    >>> async def main():
+    ...     prompts = ["Was ist RAG?", "Was ist ein Embedding?"]
+    ...     return await gather_limited(
+    ...         [lambda p=p: agenerate("llama3.2", p) for p in prompts],
+    ...         limit=2,
+    ...         timeout=120,
+    ...     )
+    >>> results = run_async(main())
+"""
+from __future__ import annotations
+
+import asyncio
+import threading
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Iterable,
+    List,
+    Optional,
+    Tuple,
+    TypeVar,
+    Union,
+)
+
+from lib.helper_ollama.client import (
+    PARALLEL_SLOTS,
+    aclose_async_sdk_client,
+    get_async_sdk_client,
+)
+
+T = TypeVar("T")
+TaskLike = Union[Awaitable[T], Callable[[], Awaitable[T]]]
+
+__all__ = [
+    "agenerate",
+    "achat",
+    "aembed",
+    "gather_limited",
+    "iter_limited",
+    "run_async",
+]
+
+
+async def _iter_with_deadline(stream: AsyncIterator[Any], timeout: Optional[float]) -> AsyncIterator[Any]:
+    """Yield from *stream*, raising ``TimeoutError`` once *timeout* seconds are spent."""
+    if timeout is None:
+        async for part in stream:
+            yield part
+        return
+
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    iterator = stream.__aiter__()
+    while True:
+        remaining = deadline - loop.time()
+        if remaining <= 0:
+            raise TimeoutError(f"Stream exceeded {timeout:.1f}s")
+        try:
+            part = await asyncio.wait_for(iterator.__anext__(), remaining)
+        except StopAsyncIteration:
+            return
+        yield part
+
+
+async def _call(coro: Awaitable[Any], stream: bool, timeout: Optional[float]):
+    """Await an SDK call and apply *timeout* to the request or the whole stream."""
+    if not stream:
+        return await asyncio.wait_for(coro, timeout)
+
+    # The SDK returns the async iterator only once the request is accepted;
+    # the time spent until then counts against the stream's budget.
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    iterator = await asyncio.wait_for(coro, timeout)
+    if timeout is not None:
+        timeout = max(0.0, timeout - (loop.time() - started))
+    return _iter_with_deadline(iterator, timeout)
+
+
+async def agenerate(model_name, prompt, stream=False, timeout=None, **kwargs):
+    """Generate text asynchronously; with ``stream=True`` return an async iterator."""
+    try:
+        return await _call(
+            get_async_sdk_client().generate(
+                model=model_name, prompt=prompt, stream=stream, **kwargs
+            ),
+            stream,
+            timeout,
+        )
+    except asyncio.TimeoutError:
+        raise
+    except Exception as e:
+        raise Exception(f"Failed to generate with {model_name}: {e}")
+
+
+async def achat(model_name, messages, stream=False, timeout=None, **kwargs):
+    """Chat asynchronously; with ``stream=True`` return an async iterator."""
+    try:
+        return await _call(
+            get_async_sdk_client().chat(
+                model=model_name, messages=messages, stream=stream, **kwargs
+            ),
+            stream,
+            timeout,
+        )
+    except asyncio.TimeoutError:
+        raise
+    except Exception as e:
+        raise Exception(f"Failed to chat with {model_name}: {e}")
+
+
+async def aembed(model_name, text, timeout=None, **kwargs):
+    """Embed one text or a list of texts asynchronously via ``/api/embed``."""
+    try:
+        return await asyncio.wait_for(
+            get_async_sdk_client().embed(model=model_name, input=text, **kwargs),
+            timeout,
+        )
+    except asyncio.TimeoutError:
+        raise
+    except Exception as e:
+        raise Exception(f"Failed to generate embeddings with {model_name}: {e}")
+
+
+def _as_awaitable(task: TaskLike[T]) -> Awaitable[T]:
+    return task() if callable(task) else task
+
+
+async def iter_limited(
+    tasks: Iterable[TaskLike[T]],
+    limit: int = PARALLEL_SLOTS,
+    timeout: Optional[float] = None,
+    return_exceptions: bool = True,
+) -> AsyncIterator[Tuple[int, Union[T, BaseException]]]:
+    """Run *tasks* with at most *limit* in flight and yield ``(index, result)`` as they finish.
+
+    Tasks may be coroutine factories (preferred: nothing starts before a slot is
+    free) or awaitables. *timeout* applies to each task individually. With
+    ``return_exceptions`` failures are yielded as exception objects instead of
+    cancelling the remaining tasks.
+    """
+    semaphore = asyncio.Semaphore(max(1, limit))
+
+    async def _run(index: int, task: TaskLike[T]):
+        async with semaphore:
+            try:
+                return index, await asyncio.wait_for(_as_awaitable(task), timeout)
+            except Exception as e:
+                if not return_exceptions:
+                    raise
+                return index, e
+
+    pending = [asyncio.ensure_future(_run(i, task)) for i, task in enumerate(tasks)]
+    try:
+        for finished in asyncio.as_completed(pending):
+            yield await finished
+    finally:
+        for future in pending:
+            future.cancel()
+
+
+async def gather_limited(
+    tasks: Iterable[TaskLike[T]],
+    limit: int = PARALLEL_SLOTS,
+    timeout: Optional[float] = None,
+    return_exceptions: bool = True,
+) -> List[Union[T, BaseException]]:
+    """Like ``asyncio.gather`` but with a concurrency limit and per-task timeouts."""
+    tasks = list(tasks)
+    results: List[Any] = [None] * len(tasks)
+    async for index, result in iter_limited(tasks, limit, timeout, return_exceptions):
+        results[index] = result
+    return results
+
+
+def run_async(coro: Awaitable[T]) -> T:
+    """Run *coro* to completion from synchronous code such as a Streamlit script.
+
+    Uses a private event loop (in a helper thread if the caller already runs
+    one) and closes the loop's pooled Ollama client afterwards.
+    """
+
+    async def _main():
+        try:
+            return await coro
+        finally:
+            await aclose_async_sdk_client()
+
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(_main())
+
+    box: dict = {}
+
+    def _worker():
+        try:
+            box["result"] = asyncio.run(_main())
+        except BaseException as e:  # re-raised in the calling thread
+            box["error"] = e
+
+    thread = threading.Thread(target=_worker, daemon=True)
+    thread.start()
+    thread.join()
+    if "error" in box:
+        raise box["error"]
+    return box["result"]
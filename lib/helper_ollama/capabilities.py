@@ -0,0 +1,157 @@
+"""Capability detection from Ollama model metadata (``/api/show``).
+
+The show call is comparatively expensive, so results are persisted on disk
+keyed by the model ``digest``: a model is only inspected again after it was
+re-pulled or replaced.
+"""
+from __future__ import annotations
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List, Mapping, Optional
+
+from lib.cache_utils import cache_dir, read_json, write_json_atomic
+from lib.helper_ollama import client
+
+__all__ = [
+    "capabilities_from_show",
+    "CapabilityStore",
+    "detect_capabilities",
+]
+
+# Ollama >= 0.6.4 reports capabilities directly; map them to our names.
+_REPORTED = {
+    "completion": "chat",
+    "embedding": "embedding",
+    "vision": "vision",
+    "tools": "tools",
+    "thinking": "thinking",
+}
+
+# GGUF architectures that only produce embeddings.
+EMBEDDING_ARCHITECTURES = {
+    "bert",
+    "nomic-bert",
+    "nomic-bert-moe",
+    "jina-bert-v2",
+    "xlm-roberta",
+    "gte",
+    "t5encoder",
+}
+
+_ORDER = ("embedding", "vision", "tools", "thinking", "chat")
+
+
+def capabilities_from_show(show: Mapping) -> List[str]:
+    """Derive capability names from an ``/api/show`` response."""
+    found = set()
+    for name in show.get("capabilities") or []:
+        if name in _REPORTED:
+            found.add(_REPORTED[name])
+    if found:
+        return [c for c in _ORDER if c in found]
+
+    # Older servers: inspect the metadata ourselves.
+    model_info = show.get("model_info") or {}
+    template = show.get("template") or ""
+    architecture = str(model_info.get("general.architecture", "")).lower()
+
+    if architecture in EMBEDDING_ARCHITECTURES or f"{architecture}.pooling_type" in model_info:
+        return ["embedding"]
+
+    found.add("chat")
+    if show.get("projector_info") or any(".vision." in key for key in model_info):
+        found.add("vision")
+    if ".Tools" in template or "<tool_call>" in template:
+        found.add("tools")
+    if ".Think" in template or "<think>" in template:
+        found.add("thinking")
+    return [c for c in _ORDER if c in found]
+
+
+def _show(model_name: str) -> dict:
+    return client.post_json("/api/show", {"model": model_name})
+
+
+class CapabilityStore:
+    """Digest -> capability list, persisted as one JSON file."""
+
+    def __init__(self, path=None):
+        self.path = path or cache_dir("ollama") / "capabilities.json"
+        self._lock = threading.Lock()
+        self._data: Dict[str, List[str]] = read_json(self.path, {}) or {}
+
+    def get(self, digest: str) -> Optional[List[str]]:
+        with self._lock:
+            return self._data.get(digest)
+
+    def update(self, entries: Mapping[str, List[str]]) -> None:
+        if not entries:
+            return
+        with self._lock:
+            self._data.update(entries)
+            write_json_atomic(self.path, self._data)
+
+    def prune(self, keep: Iterable[str]) -> None:
+        """Forget digests of models that are no longer installed."""
+        keep = set(keep)
+        with self._lock:
+            stale = [d for d in self._data if d not in keep]
+            if not stale:
+                return
+            for digest in stale:
+                del self._data[digest]
+            write_json_atomic(self.path, self._data)
+
+
+_store: Optional[CapabilityStore] = None
+_store_lock = threading.Lock()
+
+
+def _get_store() -> CapabilityStore:
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = CapabilityStore()
+    return _store
+
+
+def detect_capabilities(
+    models: Iterable[Mapping],
+    fallback: Callable[[str], List[str]],
+    max_workers: int = 8,
+    store: Optional[CapabilityStore] = None,
+) -> Dict[str, List[str]]:
+    """Return ``{model name: capabilities}`` for the given ``/api/tags`` entries.
+
+    Cached digests are answered from *store*; the others are inspected with
+    parallel ``/api/show`` calls. If a show call fails, *fallback* (name-based
+    guessing) is used for that model and nothing is persisted for it.
+    """
+    store = store or _get_store()
+    models = list(models)
+    result: Dict[str, List[str]] = {}
+    missing = []
+    for model in models:
+        cached = store.get(model.get("digest", ""))
+        if cached is not None:
+            result[model["name"]] = cached
+        else:
+            missing.append(model)
+
+    def _inspect(model):
+        try:
+            return model, capabilities_from_show(_show(model["name"])), True
+        except Exception:
+            return model, fallback(model["name"].lower()), False
+
+    learned = {}
+    if missing:
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(missing))) as pool:
+            for model, capabilities, from_metadata in pool.map(_inspect, missing):
+                result[model["name"]] = capabilities
+                if from_metadata and model.get("digest"):
+                    learned[model["digest"]] = capabilities
+    store.update(learned)
+    store.prune(m.get("digest", "") for m in models)
+    return result
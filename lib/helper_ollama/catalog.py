@@ -0,0 +1,170 @@
+"""Process-wide, TTL-cached catalog of the locally installed Ollama models.
+
+The catalog fetches the model list once, indexes it by capability bitmask and
+serves every filter as a dictionary lookup. Expired data is served while a
+background thread refreshes it, so UI code never waits on Ollama except for
+the very first fetch.
+"""
+from __future__ import annotations
+
+import enum
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+__all__ = [
+    "Capability",
+    "CAPABILITY_NAMES",
+    "ModelCatalog",
+    "capability_mask",
+]
+
+
+class Capability(enum.IntFlag):
+    """Bit flags for the capabilities a model can have."""
+
+    NONE = 0
+    EMBEDDING = 1
+    VISION = 2
+    TOOLS = 4
+    THINKING = 8
+    CHAT = 16
+
+
+CAPABILITY_NAMES: Dict[str, Capability] = {
+    "embedding": Capability.EMBEDDING,
+    "vision": Capability.VISION,
+    "tools": Capability.TOOLS,
+    "thinking": Capability.THINKING,
+    "chat": Capability.CHAT,
+}
+
+_ALL_MASKS = range(1 << len(CAPABILITY_NAMES))
+
+
+def capability_mask(capabilities: Sequence[str]) -> Capability:
+    """Return the bitmask for a list of capability names."""
+    mask = Capability.NONE
+    for name in capabilities:
+        mask |= CAPABILITY_NAMES.get(name, Capability.NONE)
+    return mask
+
+
+@dataclass(frozen=True)
+class _Snapshot:
+    models: Tuple[dict, ...]
+    fetched_at: float
+    by_name: Dict[str, dict] = field(default_factory=dict)
+    # mask -> indices of the models having *all* bits of mask
+    index: Dict[int, Tuple[int, ...]] = field(default_factory=dict)
+
+    @classmethod
+    def build(cls, models: Sequence[dict], fetched_at: float) -> "_Snapshot":
+        masks = [int(capability_mask(m.get("capabilities", []))) for m in models]
+        index = {
+            wanted: tuple(i for i, mask in enumerate(masks) if mask & wanted == wanted)
+            for wanted in _ALL_MASKS
+        }
+        return cls(
+            models=tuple(models),
+            fetched_at=fetched_at,
+            by_name={m["name"]: m for m in models},
+            index=index,
+        )
+
+
+class ModelCatalog:
+    """Thread-safe model list with TTL expiry and stale-while-revalidate refresh.
+
+    Args:
+        fetch: Callable returning a list of model dicts, each with at least
+            ``name`` and ``capabilities`` (list of capability names).
+        ttl: Seconds after which the data is refreshed in the background.
+    """
+
+    def __init__(self, fetch: Callable[[], List[dict]], ttl: float = 60.0):
+        self._fetch = fetch
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._snapshot: Optional[_Snapshot] = None
+        self._expires_at = 0.0
+        self._refreshing = False
+        self.last_error: Optional[Exception] = None
+
+    # -- lookups ----------------------------------------------------------------------------------
+    def models(self, capability: Capability = Capability.NONE) -> List[dict]:
+        """Return the models that have every capability in *capability*."""
+        snapshot = self._current()
+        return [snapshot.models[i] for i in snapshot.index[int(capability)]]
+
+    def names(self, capability: Capability = Capability.NONE) -> List[str]:
+        """Return the names of the models that have every capability in *capability*."""
+        snapshot = self._current()
+        return [snapshot.models[i]["name"] for i in snapshot.index[int(capability)]]
+
+    def get(self, name: str) -> Optional[dict]:
+        """Return the model dict for *name*, or ``None`` if it is not installed."""
+        return self._current().by_name.get(name)
+
+    # -- lifecycle --------------------------------------------------------------------------------
+    def refresh(self) -> None:
+        """Fetch the model list now, blocking the caller."""
+        try:
+            models = self._fetch()
+        except Exception as e:
+            with self._lock:
+                self.last_error = e
+                # Back off before the next background attempt.
+                self._expires_at = time.monotonic() + min(self.ttl, 5.0)
+            raise
+        snapshot = _Snapshot.build(models, time.time())
+        with self._lock:
+            self._snapshot = snapshot
+            self._expires_at = time.monotonic() + self.ttl
+            self.last_error = None
+
+    def invalidate(self, block: bool = False) -> None:
+        """Expire the cached list, e.g. after a model was pulled or deleted.
+
+        With ``block=True`` the list is re-fetched immediately, otherwise the
+        refresh runs in the background and lookups serve the old data meanwhile.
+        """
+        with self._lock:
+            self._expires_at = 0.0
+        if block:
+            self.refresh()
+        else:
+            self._refresh_in_background()
+
+    def _current(self) -> _Snapshot:
+        snapshot = self._snapshot
+        if snapshot is None:
+            with self._lock:
+                error = self.last_error
+                backing_off = time.monotonic() < self._expires_at
+            if error is not None and backing_off:
+                # Ollama was unreachable a moment ago; fail fast instead of waiting again.
+                raise error
+            self.refresh()
+            return self._snapshot
+        if time.monotonic() >= self._expires_at:
+            self._refresh_in_background()
+        return snapshot
+
+    def _refresh_in_background(self) -> None:
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+
+        def _worker():
+            try:
+                self.refresh()
+            except Exception:
+                pass  # keep serving stale data; the error is kept in last_error
+            finally:
+                with self._lock:
+                    self._refreshing = False
+
+        threading.Thread(target=_worker, name="ollama-catalog-refresh", daemon=True).start()
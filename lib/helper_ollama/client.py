@@ -0,0 +1,210 @@
+"""Process-wide, pooled HTTP clients for all Ollama traffic.
+
+Every page and helper talks to Ollama through the clients in this module, so
+connections are kept alive and reused across Streamlit reruns and sessions
+instead of opening a new TCP connection per request.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import threading
+import weakref
+from typing import Any, Dict, Iterator, Mapping, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+__all__ = [
+    "OLLAMA",
+    "DEFAULT_TIMEOUT",
+    "ENDPOINT_TIMEOUTS",
+    "PARALLEL_SLOTS",
+    "get_session",
+    "get_sdk_client",
+    "get_async_sdk_client",
+    "aclose_async_sdk_client",
+    "timeout_for",
+    "request",
+    "get_json",
+    "post_json",
+    "stream_ndjson",
+    "close",
+]
+
+
+def _normalize_host(host: str) -> str:
+    """Return *host* as a base URL with scheme and without trailing slash."""
+    host = host.strip().rstrip("/")
+    if not host.startswith(("http://", "https://")):
+        host = f"http://{host}"
+    return host
+
+
+OLLAMA = _normalize_host(os.environ.get("OLLAMA_HOST", "http://localhost:11434"))
+
+# Pool limits: one pool per host, with enough connections for concurrent sessions.
+POOL_CONNECTIONS = int(os.environ.get("OLLAMA_POOL_CONNECTIONS", "4"))
+POOL_MAXSIZE = int(os.environ.get("OLLAMA_POOL_MAXSIZE", "32"))
+
+# Number of requests the Ollama server processes in parallel (OLLAMA_NUM_PARALLEL
+# on the server side); used as the default fan-out limit by concurrent helpers.
+PARALLEL_SLOTS = int(os.environ.get("OLLAMA_NUM_PARALLEL", "4"))
+
+# (connect, read) timeouts in seconds. For streaming endpoints the read timeout
+# is the maximum gap between two chunks, not the duration of the whole stream.
+DEFAULT_TIMEOUT: Tuple[float, float] = (3.05, 60.0)
+ENDPOINT_TIMEOUTS: Dict[str, Tuple[float, float]] = {
+    "/api/tags": (3.05, 5.0),
+    "/api/ps": (3.05, 5.0),
+    "/api/show": (3.05, 15.0),
+    "/api/version": (3.05, 5.0),
+    "/api/generate": (3.05, 300.0),
+    "/api/chat": (3.05, 300.0),
+    "/api/embed": (3.05, 120.0),
+    "/api/embeddings": (3.05, 120.0),
+    "/api/pull": (3.05, 600.0),
+}
+
+_lock = threading.Lock()
+_session: Optional[requests.Session] = None
+_sdk_client: Any = None
+# httpx async clients are bound to the event loop that created them.
+_async_sdk_clients: "weakref.WeakKeyDictionary[Any, Any]" = weakref.WeakKeyDictionary()
+
+
+def timeout_for(path: str) -> Tuple[float, float]:
+    """Return the (connect, read) timeout configured for an API *path*."""
+    return ENDPOINT_TIMEOUTS.get(path, DEFAULT_TIMEOUT)
+
+
+def get_session() -> requests.Session:
+    """Return the shared keep-alive session, creating it on first use."""
+    global _session
+    if _session is None:
+        with _lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(
+                    pool_connections=POOL_CONNECTIONS,
+                    pool_maxsize=POOL_MAXSIZE,
+                    pool_block=False,
+                )
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                _session = session
+    return _session
+
+
+def _sdk_timeout():
+    """httpx timeout for the SDK clients, which mostly run (non-streamed) generate/chat calls."""
+    import httpx
+
+    connect, read = timeout_for("/api/generate")
+    return httpx.Timeout(read, connect=connect)
+
+
+def get_sdk_client():
+    """Return a shared ``ollama.Client`` backed by a pooled httpx client."""
+    global _sdk_client
+    if _sdk_client is None:
+        with _lock:
+            if _sdk_client is None:
+                import httpx
+                import ollama as ollama_sdk
+
+                _sdk_client = ollama_sdk.Client(
+                    host=OLLAMA,
+                    timeout=_sdk_timeout(),
+                    limits=httpx.Limits(
+                        max_connections=POOL_MAXSIZE,
+                        max_keepalive_connections=POOL_MAXSIZE,
+                    ),
+                )
+    return _sdk_client
+
+
+def get_async_sdk_client():
+    """Return the ``ollama.AsyncClient`` shared by all tasks of the running loop."""
+    loop = asyncio.get_running_loop()
+    with _lock:
+        sdk_client = _async_sdk_clients.get(loop)
+        if sdk_client is None:
+            import httpx
+            import ollama as ollama_sdk
+
+            sdk_client = ollama_sdk.AsyncClient(
+                host=OLLAMA,
+                timeout=_sdk_timeout(),
+                limits=httpx.Limits(
+                    max_connections=POOL_MAXSIZE,
+                    max_keepalive_connections=POOL_MAXSIZE,
+                ),
+            )
+            _async_sdk_clients[loop] = sdk_client
+    return sdk_client
+
+
+async def aclose_async_sdk_client() -> None:
+    """Close the async client of the running loop, if one was created."""
+    with _lock:
+        sdk_client = _async_sdk_clients.pop(asyncio.get_running_loop(), None)
+    inner = getattr(sdk_client, "_client", None)
+    if inner is not None:
+        await inner.aclose()
+
+
+def request(method: str, path: str, **kwargs: Any) -> requests.Response:
+    """Send a request to ``OLLAMA + path`` through the shared session."""
+    kwargs.setdefault("timeout", timeout_for(path))
+    return get_session().request(method, f"{OLLAMA}{path}", **kwargs)
+
+
+def get_json(path: str, **kwargs: Any) -> Any:
+    """GET *path* and return the decoded JSON body."""
+    response = request("GET", path, **kwargs)
+    response.raise_for_status()
+    return response.json()
+
+
+def post_json(path: str, payload: Mapping[str, Any], **kwargs: Any) -> Any:
+    """POST *payload* to *path* without streaming and return the JSON body."""
+    body = dict(payload)
+    body.setdefault("stream", False)
+    response = request("POST", path, json=body, **kwargs)
+    response.raise_for_status()
+    return response.json()
+
+
+def stream_ndjson(path: str, payload: Mapping[str, Any], **kwargs: Any) -> Iterator[dict]:
+    """POST *payload* with ``stream: true`` and yield each decoded NDJSON line.
+
+    The connection is returned to the pool once the iterator is exhausted or
+    closed. Errors reported inside the stream are raised as ``RuntimeError``.
+    """
+    body = dict(payload)
+    body["stream"] = True
+    with request("POST", path, json=body, stream=True, **kwargs) as response:
+        response.raise_for_status()
+        for line in response.iter_lines():
+            if not line:
+                continue
+            part = json.loads(line.decode("utf-8"))
+            if "error" in part:
+                raise RuntimeError(part["error"])
+            yield part
+
+
+def close() -> None:
+    """Close the shared clients (they are recreated lazily on next use)."""
+    global _session, _sdk_client
+    with _lock:
+        if _session is not None:
+            _session.close()
+            _session = None
+        if _sdk_client is not None:
+            inner = getattr(_sdk_client, "_client", None)
+            if inner is not None:
+                inner.close()
+            _sdk_client = None
@@ -0,0 +1,100 @@
+"""Batched embeddings via Ollama's ``/api/embed`` returning NumPy matrices.
+
+Example:
+    >>> matrix = embed_many("nomic-embed-text", chunks, batch_size=64, normalize=True)
+    >>> matrix.shape
+    (2000, 768)
+"""
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, List, Sequence
+
+import numpy as np
+
+from lib.helper_ollama import client, model_digest
+from lib.helper_ollama.embedding_cache import _EmbeddingsBase, cached_embed
+
+__all__ = ["embed_many", "embed_model_id", "l2_normalize", "OllamaBatchEmbeddings"]
+
+DEFAULT_BATCH_SIZE = 64
+DEFAULT_WORKERS = 4
+
+
+def l2_normalize(matrix: np.ndarray) -> np.ndarray:
+    """Return *matrix* with unit-length rows (zero rows stay zero)."""
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    np.maximum(norms, 1e-12, out=norms)
+    return matrix / norms
+
+
+def embed_model_id(model_name: str, truncate: bool = True) -> str:
+    """Embedding-cache identity of *model_name* via ``/api/embed``.
+
+    ``/api/embed`` returns normalized vectors, the legacy ``/api/embeddings``
+    (cached under the bare model digest) does not, so the two must not share
+    cache entries; *truncate* changes the vectors of over-long texts.
+    """
+    return f"{model_digest(model_name)}#/api/embed?truncate={str(truncate).lower()}"
+
+
+def _embed_batch(model_name: str, batch: Sequence[str], truncate: bool) -> np.ndarray:
+    response = client.post_json(
+        "/api/embed", {"model": model_name, "input": list(batch), "truncate": truncate}
+    )
+    return np.asarray(response["embeddings"], dtype=np.float32)
+
+
+def embed_many(
+    model_name: str,
+    texts: Iterable[str],
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    max_workers: int = DEFAULT_WORKERS,
+    normalize: bool = False,
+    cache: bool = True,
+    truncate: bool = True,
+) -> np.ndarray:
+    """Embed *texts* and return a contiguous ``(len(texts), dim)`` float32 matrix.
+
+    Texts are sent in batches of *batch_size* on a pool of *max_workers*
+    threads; rows keep the input order. With ``cache=True`` texts already in
+    the persistent embedding cache are not sent at all.
+    """
+    texts = list(texts)
+
+    def _embed(pending: List[str]) -> np.ndarray:
+        batches = [pending[i : i + batch_size] for i in range(0, len(pending), batch_size)]
+        if len(batches) == 1:
+            return _embed_batch(model_name, batches[0], truncate)
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(batches)))) as pool:
+            parts = list(pool.map(lambda b: _embed_batch(model_name, b, truncate), batches))
+        return np.vstack(parts)
+
+    try:
+        if not texts:
+            matrix = np.zeros((0, 0), dtype=np.float32)
+        elif cache:
+            matrix = cached_embed(embed_model_id(model_name, truncate), texts, _embed)
+        else:
+            matrix = _embed(texts)
+    except Exception as e:
+        raise Exception(f"Failed to generate embeddings with {model_name}: {e}")
+
+    if normalize and len(matrix):
+        matrix = l2_normalize(matrix)
+    return np.ascontiguousarray(matrix, dtype=np.float32)
+
+
+class OllamaBatchEmbeddings(_EmbeddingsBase):
+    """LangChain ``Embeddings`` backed by ``embed_many`` (batched and cached)."""
+
+    def __init__(self, model: str, batch_size: int = DEFAULT_BATCH_SIZE, max_workers: int = DEFAULT_WORKERS):
+        self.model = model
+        self.batch_size = batch_size
+        self.max_workers = max_workers
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return embed_many(self.model, texts, self.batch_size, self.max_workers).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return embed_many(self.model, [text], cache=False)[0].tolist()
@@ -0,0 +1,177 @@
+"""Persistent embedding cache keyed by model identity and normalized text hash.
+
+Each embedding model gets its own directory with an append-only float32
+matrix (``vectors.f32``) and a small SQLite index mapping text hashes to rows.
+Reads go through ``np.memmap``, so looking up cached vectors does not load the
+whole matrix into memory.
+
+Example:
+    >>> vectors = cached_embed(model_digest("nomic-embed-text"), chunks, embed_fn)
+"""
+from __future__ import annotations
+
+import re
+import sqlite3
+import threading
+import unicodedata
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from lib.cache_utils import cache_dir, content_hash
+from lib.media_utils import slugify
+
+try:  # LangChain is optional; the adapter still works by duck typing without it
+    from langchain_core.embeddings import Embeddings as _EmbeddingsBase
+except ImportError:  # pragma: no cover
+    _EmbeddingsBase = object
+
+__all__ = [
+    "normalize_text",
+    "text_key",
+    "EmbeddingStore",
+    "get_embedding_store",
+    "cached_embed",
+    "CachedEmbeddings",
+]
+
+_whitespace = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    """Return *text* in the form used for hashing (NFC, collapsed whitespace)."""
+    return _whitespace.sub(" ", unicodedata.normalize("NFC", text)).strip()
+
+
+def text_key(text: str) -> str:
+    return content_hash(normalize_text(text))
+
+
+class EmbeddingStore:
+    """Append-only float32 vector file plus hash -> row index for one model."""
+
+    def __init__(self, model_id: str, root: Optional[Path] = None):
+        self.model_id = model_id
+        folder = slugify(model_id)[:80] + "-" + content_hash(model_id)[:12]
+        self.path = (root or cache_dir("embeddings")) / folder
+        self.path.mkdir(parents=True, exist_ok=True)
+        self._vectors = self.path / "vectors.f32"
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self.path / "index.sqlite3"), check_same_thread=False)
+        self._db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        self._db.execute("CREATE TABLE IF NOT EXISTS rows (hash TEXT PRIMARY KEY, row INTEGER)")
+        self._db.execute("INSERT OR IGNORE INTO meta VALUES ('model_id', ?)", (model_id,))
+        self._db.commit()
+        row = self._db.execute("SELECT value FROM meta WHERE key = 'dim'").fetchone()
+        self.dim: Optional[int] = int(row[0]) if row else None
+        self._mm: Optional[np.memmap] = None
+
+    def __len__(self) -> int:
+        if not self.dim or not self._vectors.exists():
+            return 0
+        return self._vectors.stat().st_size // (4 * self.dim)
+
+    def _matrix(self, min_rows: int) -> np.memmap:
+        """Return a read-only memmap covering at least *min_rows* rows."""
+        if self._mm is None or self._mm.shape[0] < min_rows:
+            self._mm = np.memmap(self._vectors, dtype=np.float32, mode="r", shape=(len(self), self.dim))
+        return self._mm
+
+    def get(self, hashes: Sequence[str]) -> Dict[str, np.ndarray]:
+        """Return the cached vectors for the given text hashes (missing ones are omitted)."""
+        if not hashes or self.dim is None:
+            return {}
+        found: Dict[str, int] = {}
+        with self._lock:
+            unique = list(dict.fromkeys(hashes))
+            for start in range(0, len(unique), 900):  # SQLite parameter limit
+                batch = unique[start : start + 900]
+                marks = ",".join("?" * len(batch))
+                found.update(
+                    self._db.execute(f"SELECT hash, row FROM rows WHERE hash IN ({marks})", batch)
+                )
+            if not found:
+                return {}
+            matrix = self._matrix(max(found.values()) + 1)
+            return {h: np.array(matrix[row]) for h, row in found.items()}
+
+    def add(self, hashes: Sequence[str], vectors: np.ndarray) -> None:
+        """Append *vectors* (one row per hash) to the store."""
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        if vectors.ndim != 2 or len(hashes) != vectors.shape[0]:
+            raise ValueError("Expected one vector row per hash")
+        if not len(hashes):
+            return
+        with self._lock:
+            if self.dim is None:
+                self.dim = int(vectors.shape[1])
+                self._db.execute("INSERT OR REPLACE INTO meta VALUES ('dim', ?)", (str(self.dim),))
+            elif vectors.shape[1] != self.dim:
+                raise ValueError(f"Dimension mismatch: store has {self.dim}, got {vectors.shape[1]}")
+            first = len(self)
+            with self._vectors.open("ab") as f:
+                f.write(vectors.tobytes())
+            self._db.executemany(
+                "INSERT OR REPLACE INTO rows VALUES (?, ?)",
+                ((h, first + i) for i, h in enumerate(hashes)),
+            )
+            self._db.commit()
+
+
+_stores: Dict[str, EmbeddingStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_embedding_store(model_id: str) -> EmbeddingStore:
+    """Return the shared store for *model_id* (model digest or other stable identity)."""
+    with _stores_lock:
+        store = _stores.get(model_id)
+        if store is None:
+            store = _stores[model_id] = EmbeddingStore(model_id)
+    return store
+
+
+def cached_embed(
+    model_id: str,
+    texts: Sequence[str],
+    embed_fn: Callable[[List[str]], Sequence[Sequence[float]]],
+) -> np.ndarray:
+    """Return a float32 matrix of embeddings for *texts*, in input order.
+
+    Only texts missing from the store (deduplicated) are passed to *embed_fn*;
+    their vectors are persisted before returning.
+    """
+    store = get_embedding_store(model_id)
+    keys = [text_key(t) for t in texts]
+    known = store.get(keys)
+
+    missing: Dict[str, str] = {}
+    for key, text in zip(keys, texts):
+        if key not in known and key not in missing:
+            missing[key] = text
+    if missing:
+        fresh = np.asarray(embed_fn(list(missing.values())), dtype=np.float32)
+        store.add(list(missing), fresh)
+        known.update(zip(missing, fresh))
+
+    if not keys:
+        return np.zeros((0, store.dim or 0), dtype=np.float32)
+    return np.stack([known[k] for k in keys]).astype(np.float32, copy=False)
+
+
+class CachedEmbeddings(_EmbeddingsBase):
+    """LangChain ``Embeddings`` wrapper that serves repeated texts from the store."""
+
+    def __init__(self, underlying, model_id: str):
+        self.underlying = underlying
+        self.model_id = model_id
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return cached_embed(self.model_id, texts, self.underlying.embed_documents).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        # Queries are short-lived and may use a different instruction prefix; cache separately.
+        return cached_embed(
+            f"{self.model_id}#query", [text], lambda t: [self.underlying.embed_query(t[0])]
+        )[0].tolist()
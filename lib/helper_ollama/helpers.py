@@ -1,14 +1,13 @@
 # Add lib directory to path
 # sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'ollama_utils'))
 
-from lib.helper_ollama import get_local_llms
+from lib.helper_ollama import Capability, get_catalog, get_local_llms
 
 
 def get_chat_models() -> list[str]:
     """Get list of chat model names for Streamlit selectbox."""
     try:
-        models = get_local_llms("chat")
-        return [model["name"] for model in models]
+        return get_catalog().names(Capability.CHAT)
     except Exception:
         return ["llama3.2", "mistral:7b"]
 
@@ -16,8 +15,7 @@ def get_chat_models() -> list[str]:
 def get_vision_models() -> list[str]:
     """Get list of vision-capable model names for Streamlit selectbox."""
     try:
-        models = get_local_llms("vision")
-        return [model["name"] for model in models]
+        return get_catalog().names(Capability.VISION)
     except Exception:
         return ["llama3.2-vision", "llava"]
 
@@ -25,8 +23,7 @@ def get_vision_models() -> list[str]:
 def get_embedding_models() -> list[str]:
     """Get list of embedding model names for Streamlit selectbox."""
     try:
-        models = get_local_llms("embedding")
-        return [model["name"] for model in models]
+        return get_catalog().names(Capability.EMBEDDING)
     except Exception:
         return ["nomic-embed-text"]
 
@@ -34,8 +31,7 @@ def get_embedding_models() -> list[str]:
 def get_tool_models() -> list[str]:
     """Get list of tool/function calling model names for Streamlit selectbox."""
     try:
-        models = get_local_llms("tools")
-        return [model["name"] for model in models]
+        return get_catalog().names(Capability.TOOLS)
     except Exception:
         return ["llama3.1", "mistral"]
 
@@ -43,8 +39,7 @@ def get_tool_models() -> list[str]:
 def get_thinking_models() -> list[str]:
     """Get list of thinking/reasoning model names for Streamlit selectbox."""
     try:
-        models = get_local_llms("thinking")
-        return [model["name"] for model in models]
+        return get_catalog().names(Capability.THINKING)
     except Exception:
         return ["deepseek-r1", "llama3.2"]
 
@@ -52,8 +47,7 @@ def get_thinking_models() -> list[str]:
 def get_all_models() -> list[str]:
     """Get list of all model names for Streamlit selectbox."""
     try:
-        models = get_local_llms()
-        return [model["name"] for model in models]
+        return get_catalog().names()
     except Exception:
         return ["llama3.2", "mistral:7b"]
 
@@ -82,10 +76,9 @@ def get_best_model_for_function(func: str) -> str:
 def get_model_capabilities(model_name: str) -> list[str]:
     """Get capabilities of a specific model by name."""
     try:
-        all_models = get_local_llms()
-        for model in all_models:
-            if model["name"] == model_name:
-                return model["capabilities"]
+        model = get_catalog().get(model_name)
+        if model is not None:
+            return model["capabilities"]
     except Exception:
         pass
     return []
@@ -0,0 +1,132 @@
+"""Model warm-up and ``keep_alive`` residency management for a local Ollama.
+
+``warm_up`` loads a model with a zero-token request as soon as it is
+selected, so the first real prompt does not pay the load latency. The
+manager applies per-model ``keep_alive`` policies, tracks loaded models via
+``/api/ps`` and unloads the least recently used ones when a RAM budget would
+be exceeded.
+
+Configuration (environment):
+    OLLAMA_RAM_BUDGET_GB    Budget for resident models (0 = unlimited).
+    OLLAMA_KEEP_ALIVE       Default keep_alive for warmed models (e.g. "30m").
+"""
+from __future__ import annotations
+
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Union
+
+from lib.helper_ollama import client, get_catalog
+
+__all__ = ["ResidencyManager", "get_residency_manager"]
+
+KeepAlive = Union[str, int, float]
+
+
+class ResidencyManager:
+    """Keep frequently used models resident within a memory budget."""
+
+    def __init__(
+        self,
+        ram_budget: int = 0,
+        default_keep_alive: KeepAlive = "30m",
+        policies: Optional[Dict[str, KeepAlive]] = None,
+    ):
+        self.ram_budget = ram_budget  # bytes, 0 = unlimited
+        self.default_keep_alive = default_keep_alive
+        self.policies: Dict[str, KeepAlive] = dict(policies or {})
+        self._last_used: Dict[str, float] = {}
+        self._warming: set = set()
+        self._lock = threading.Lock()
+
+    # -- state ------------------------------------------------------------------------------------
+    def keep_alive_for(self, model: str) -> KeepAlive:
+        return self.policies.get(model, self.default_keep_alive)
+
+    def set_policy(self, model: str, keep_alive: KeepAlive) -> None:
+        """Set the keep_alive for *model* (e.g. ``"2h"``, ``-1`` = forever, ``0`` = unload)."""
+        self.policies[model] = keep_alive
+
+    def touch(self, model: str) -> None:
+        """Record that *model* was just used (drives LRU eviction)."""
+        with self._lock:
+            self._last_used[model] = time.monotonic()
+
+    def loaded(self) -> List[dict]:
+        """Return the models currently loaded by Ollama (``/api/ps``)."""
+        return client.get_json("/api/ps").get("models", [])
+
+    # -- actions ----------------------------------------------------------------------------------
+    def unload(self, model: str) -> None:
+        """Ask Ollama to evict *model* from memory now."""
+        client.post_json("/api/generate", {"model": model, "keep_alive": 0})
+
+    def _expected_size(self, model: str) -> int:
+        try:
+            info = get_catalog().get(model)
+        except Exception:
+            info = None
+        return int((info or {}).get("size", 0))
+
+    def make_room(self, model: str) -> List[str]:
+        """Unload least recently used models until *model* fits into the budget."""
+        if not self.ram_budget:
+            return []
+        resident = [m for m in self.loaded() if m.get("name") != model]
+        needed = self._expected_size(model)
+        used = sum(int(m.get("size", 0)) for m in resident)
+        with self._lock:
+            by_age = sorted(resident, key=lambda m: self._last_used.get(m.get("name"), 0.0))
+        evicted = []
+        for victim in by_age:
+            if used + needed <= self.ram_budget:
+                break
+            self.unload(victim["name"])
+            used -= int(victim.get("size", 0))
+            evicted.append(victim["name"])
+        return evicted
+
+    def warm_up(self, model: str) -> None:
+        """Load *model* with an empty prompt, evicting others if the budget requires it."""
+        self.make_room(model)
+        client.post_json(
+            "/api/generate",
+            {"model": model, "prompt": "", "keep_alive": self.keep_alive_for(model)},
+        )
+        self.touch(model)
+
+    def warm_up_async(self, model: str) -> None:
+        """Run ``warm_up`` in a background thread (at most once in flight per model)."""
+        with self._lock:
+            if model in self._warming:
+                return
+            self._warming.add(model)
+
+        def _worker():
+            try:
+                self.warm_up(model)
+            except Exception:
+                pass  # best effort: the first real request will load the model anyway
+            finally:
+                with self._lock:
+                    self._warming.discard(model)
+
+        threading.Thread(target=_worker, name=f"ollama-warmup-{model}", daemon=True).start()
+
+
+_manager: Optional[ResidencyManager] = None
+_manager_lock = threading.Lock()
+
+
+def get_residency_manager() -> ResidencyManager:
+    """Return the process-wide residency manager configured from the environment."""
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            budget_gb = float(os.environ.get("OLLAMA_RAM_BUDGET_GB", "0"))
+            _manager = ResidencyManager(
+                ram_budget=int(budget_gb * 1024**3),
+                default_keep_alive=os.environ.get("OLLAMA_KEEP_ALIVE", "30m"),
+            )
+    return _manager
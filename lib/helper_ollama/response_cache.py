@@ -0,0 +1,151 @@
+"""Content-addressed cache for LLM responses backed by a local SQLite file.
+
+Entries are keyed by a hash of the model digest, the prompt or messages and
+all sampling options, so a change of any of them is a miss. The store is
+bounded by total size and entry age and evicts least recently used entries.
+
+The cache is opt-in: callers pass ``cache=True`` (or set the environment
+variable ``ENRICHMENT_RESPONSE_CACHE=1``); ``cache=False`` always bypasses it,
+e.g. for runs that should sample a fresh answer.
+"""
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Mapping, Optional
+
+from lib.cache_utils import cache_dir, content_hash
+
+__all__ = [
+    "ResponseCache",
+    "get_response_cache",
+    "response_cache_enabled",
+    "make_key",
+]
+
+DEFAULT_MAX_BYTES = int(os.environ.get("ENRICHMENT_RESPONSE_CACHE_MAX_MB", "256")) * 1024 * 1024
+DEFAULT_MAX_AGE = float(os.environ.get("ENRICHMENT_RESPONSE_CACHE_MAX_DAYS", "30")) * 86400
+
+
+def response_cache_enabled(cache: Optional[bool] = None) -> bool:
+    """Resolve a per-call ``cache`` flag against the process default."""
+    if cache is not None:
+        return cache
+    return os.environ.get("ENRICHMENT_RESPONSE_CACHE", "0").lower() in ("1", "true", "yes")
+
+
+def make_key(model_digest: str, endpoint: str, payload: Mapping[str, Any]) -> str:
+    """Return the cache key for a request.
+
+    *payload* holds everything that influences the answer except the model
+    (prompt or messages, system, options, format, ...); ``stream`` and
+    ``keep_alive`` are ignored.
+    """
+    relevant = {k: v for k, v in payload.items() if k not in ("model", "stream", "keep_alive")}
+    canonical = json.dumps(
+        [model_digest, endpoint, relevant], sort_keys=True, ensure_ascii=False, default=str
+    )
+    return content_hash(canonical)
+
+
+class ResponseCache:
+    """SQLite-backed response store with size- and age-based LRU eviction."""
+
+    def __init__(
+        self,
+        path: Optional[Path] = None,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        max_age: float = DEFAULT_MAX_AGE,
+    ):
+        self.path = path or cache_dir("llm") / "responses.sqlite3"
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY,"
+            " model TEXT NOT NULL,"
+            " text TEXT NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " created REAL NOT NULL,"
+            " accessed REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses(accessed)")
+        self._db.commit()
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached text for *key* (and mark it as recently used)."""
+        now = time.time()
+        with self._lock:
+            row = self._db.execute(
+                "SELECT text, created FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or now - row[1] > self.max_age:
+                self.misses += 1
+                return None
+            self._db.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+            self._db.commit()
+            self.hits += 1
+            return row[0]
+
+    def put(self, key: str, model: str, text: str) -> None:
+        """Store *text* under *key* and evict old entries if limits are exceeded."""
+        now = time.time()
+        size = len(text.encode("utf-8"))
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses (key, model, text, size, created, accessed)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (key, model, text, size, now, now),
+            )
+            self._evict(now)
+            self._db.commit()
+
+    def _evict(self, now: float) -> None:
+        self._db.execute("DELETE FROM responses WHERE created < ?", (now - self.max_age,))
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        excess = total - self.max_bytes
+        freed = 0
+        doomed = []
+        for key, size in self._db.execute("SELECT key, size FROM responses ORDER BY accessed"):
+            doomed.append((key,))
+            freed += size
+            if freed >= excess:
+                break
+        self._db.executemany("DELETE FROM responses WHERE key = ?", doomed)
+
+    def stats(self) -> dict:
+        """Return hit/miss counters and the current size of the store."""
+        with self._lock:
+            entries, size = self._db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+            ).fetchone()
+        return {"hits": self.hits, "misses": self.misses, "entries": entries, "bytes": size}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._db.execute("DELETE FROM responses")
+            self._db.commit()
+
+
+_cache: Optional[ResponseCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> ResponseCache:
+    """Return the process-wide response cache, opening the store on first use."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResponseCache()
+    return _cache
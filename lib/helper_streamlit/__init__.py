@@ -2,23 +2,23 @@
 
 from __future__ import annotations
 
-import json
-from typing import Iterable, List, Optional
+from typing import Callable, List, Optional
 
-import requests
 import streamlit as st
 
-from lib.helper_ollama import OLLAMA
+from lib.cache_utils import content_hash
+from lib.helper_ollama import Capability, client, get_catalog, get_response_cache, model_digest
+from lib.helper_ollama.embedding_batch import embed_many, embed_model_id
+from lib.helper_ollama.residency import get_residency_manager
+from lib.helper_ollama.response_cache import make_key, response_cache_enabled
+from lib.document_session import document_prompt, session_for
+from lib.map_reduce import DEFAULT_NUM_CTX, call_options, map_reduce_prompt, split_text
+from lib.vector_store import load_or_build_store
+from lib.helper_streamlit.streaming import StreamStats, render_stream
 
 
-def _extract_model_names(models_payload: Iterable[dict]) -> List[str]:
-    """Return sorted model names from an Ollama tag payload."""
-
-    names = sorted({str(model.get("model", "")).strip() for model in models_payload})
-    return [name for name in names if name]
-
-
-VISION_MODELS = ("vision", "llava", "bakllava")
+FALLBACK_MODELS = ["llama3.2", "mistral:7b"]
+FALLBACK_EMBEDDING_MODEL = "nomic-embed-text"
 
 
 class ModelType:
@@ -26,55 +26,183 @@ class ModelType:
     VISION = "vision"
 
 # -------------------------------------------------------------------------------------------------
-def get_models(type: Optional[ModelType]) -> List[str]:
-    try:
-        response = requests.get(f"{OLLAMA}/api/tags", timeout=3)
-        response.raise_for_status()
-        payload = response.json().get("models", [])
-        names = _extract_model_names(payload)
+def get_models(type: Optional[ModelType] = None) -> List[str]:
+    """Return sorted model names from the shared catalog (no Ollama call per rerun).
 
-        models = names or ["llama3.2", "mistral:7b"]
+    Text model lists leave out vision models, which also report ``completion``.
+    """
+    try:
+        catalog = get_catalog()
+        if type == ModelType.VISION:
+            models = sorted(catalog.names(Capability.VISION))
+        else:
+            vision = set(catalog.names(Capability.VISION))
+            models = sorted(name for name in catalog.names(Capability.CHAT) if name not in vision)
     except Exception:  # noqa: BLE001 - best effort fallback for UI friendliness
-        models = ["llama3.2", "mistral:7b"]
-
-    if type == ModelType.VISION:
-        # Filter models that contain any vision-related keyword in their name
-        models = [
-            name
-            for name in models if any(keyword in name.lower() for keyword in VISION_MODELS)
-        ]
-    elif type is None or type == ModelType.TEXT:
-        models = [
-            name
-            for name in models if all(keyword not in name.lower() for keyword in VISION_MODELS)
-        ]
-        
+        models = []
+
+    if not models and type != ModelType.VISION:
+        models = list(FALLBACK_MODELS)
     return models
 
 def get_vision_models() -> list[str]:
     return get_models(ModelType.VISION)
     
 # -------------------------------------------------------------------------------------------------
-def generate(model: str, prompt: str) -> str:
-    """Stream responses from Ollama into the UI and return the final text."""
+def generate(
+    model: str,
+    prompt: str,
+    show_stats: bool = True,
+    cache: Optional[bool] = None,
+    options: Optional[dict] = None,
+    on_finish: Optional[Callable[[StreamStats], None]] = None,
+) -> str:
+    """Stream responses from Ollama into the UI and return the final text.
+
+    With ``cache=True`` an identical earlier answer is replayed from the local
+    response cache instead of calling the model. *on_finish* is called with the
+    stream statistics of a generated (not replayed) answer.
+    """
+
+    request = {"prompt": prompt, **({"options": options} if options else {})}
+    key = None
+    if response_cache_enabled(cache):
+        key = make_key(model_digest(model), "/api/generate", request)
+        cached = get_response_cache().get(key)
+        if cached is not None:
+            text = render_stream(iter([{"response": cached, "done": True}]), show_stats=False)
+            st.caption("⚡ Antwort aus dem Cache")
+            return text
+
+    residency = get_residency_manager()
+    residency.touch(model)
+    parts = client.stream_ndjson(
+        "/api/generate",
+        {"model": model, **request, "keep_alive": residency.keep_alive_for(model)},
+    )
+    text = render_stream(parts, show_stats=show_stats, on_finish=on_finish)
+    if key is not None:
+        get_response_cache().put(key, model, text)
+    return text
+
+
+def chat(model: str, messages: List[dict], show_stats: bool = True) -> str:
+    """Stream a ``/api/chat`` answer to *messages* into the UI and return its text."""
+
+    residency = get_residency_manager()
+    residency.touch(model)
+    parts = client.stream_ndjson(
+        "/api/chat",
+        {"model": model, "messages": messages, "keep_alive": residency.keep_alive_for(model)},
+    )
+    return render_stream(parts, field="message", show_stats=show_stats)
+
+
+def ask_document(model: str, prefix: str, question: str) -> str:
+    """Answer *question* about the document in *prefix* (see ``lib.document_session``).
+
+    The prompt starts with the unchanged prefix, so Ollama can reuse the
+    evaluated document from its KV cache for follow-up questions.
+    """
+
+    sessions = st.session_state.setdefault("_document_sessions", {})
+    session = session_for(sessions, model, prefix)
+    text = generate(
+        model,
+        document_prompt(prefix, question),
+        options=session.options(),
+        on_finish=lambda stats: session.record(stats.prompt_tokens),
+    )
+    if session.prompt_tokens:
+        st.caption(session.caption())
+    return text
+
+
+def generate_map_reduce(model: str, text: str, question: str) -> str:
+    """Analyse the whole *text* with map-reduce, showing per-chunk progress, and
+    stream the final answer."""
+
+    bar = st.progress(0.0, text="Dokument wird abschnittsweise analysiert …")
+    log = st.expander("Teilergebnisse")
+
+    def on_progress(stage: str, done: int, total: int, partial: str) -> None:
+        label = "Abschnitte" if stage == "map" else "Zusammenführen"
+        bar.progress(done / total, text=f"{label}: {done}/{total}")
+        log.markdown(f"**{label} {done}/{total}**\n\n{partial}")
+
+    prompt = map_reduce_prompt(model, text, question, on_progress=on_progress, num_ctx=DEFAULT_NUM_CTX)
+    bar.empty()
+    return generate(model, prompt, options=call_options(DEFAULT_NUM_CTX))
+
+
+def get_embedding_model() -> str:
+    """Return the first installed embedding model (or the usual default)."""
+    try:
+        models = sorted(get_catalog().names(Capability.EMBEDDING))
+    except Exception:  # noqa: BLE001 - best effort fallback for UI friendliness
+        models = []
+    return models[0] if models else FALLBACK_EMBEDDING_MODEL
 
-    box, acc = st.empty(), ""
 
-    with requests.post(
-        f"{OLLAMA}/api/generate",
-        json={"model": model, "prompt": prompt, "stream": True},
-        stream=True,
-    ) as response:
-        for ln in response.iter_lines():
-            if not ln:
-                continue
-            part = json.loads(ln.decode("utf-8"))
-            acc += part.get("response", "")
-            box.markdown(acc)
-    return acc
+def generate_retrieval(
+    model: str, text: str, question: str, top_k: int = 6, chunk_chars: int = 1500
+) -> str:
+    """Answer *question* from the *top_k* passages of *text* most similar to it.
 
+    The passages are embedded once per document and embedding model; the
+    vector store is kept on disk, so later questions only embed the question.
+    """
 
-def add_select_model(label: str = "Modell", modeltype: Optional[ModelType] = None) -> str:
-    """Render a model selectbox with the available Ollama models."""
+    embed_model = get_embedding_model()
+    key = f"{content_hash(text)[:24]}-{content_hash(embed_model_id(embed_model))[:12]}"
+
+    def embed(texts):
+        return embed_many(embed_model, texts)
 
-    return st.selectbox(label, get_models(modeltype))
+    with st.spinner("Abschnitte werden indexiert …"):
+        store = load_or_build_store(key, lambda: split_text(text, chunk_chars), embed)
+        hits = store.search(embed_many(embed_model, [question], cache=False)[0], top_k)
+
+    hits.sort(key=lambda hit: hit[1])  # keep document order in the prompt
+    with st.expander(f"Relevante Abschnitte ({len(hits)})"):
+        for score, number, meta in hits:
+            st.markdown(f"**Abschnitt {number + 1}** (Ähnlichkeit {score:.2f})\n\n{meta['text'][:300]} …")
+
+    passages = "\n\n".join(f"### Abschnitt {number + 1}\n{meta['text']}" for _, number, meta in hits)
+    prompt = (
+        "Beantworte die Aufgabe ausschließlich auf Basis der folgenden Abschnitte eines Dokuments. "
+        "Antworte strukturiert auf Deutsch.\n\n"
+        f"Aufgabe: {question}\n\n{passages}"
+    )
+    return generate(model, prompt)
+
+
+def add_cache_toggle(label: str = "Antwort-Cache verwenden", value: Optional[bool] = None) -> bool:
+    """Render a sidebar switch for the response cache and show its hit/miss counters.
+
+    The switch starts in the configured state (``ENRICHMENT_RESPONSE_CACHE``,
+    off by default) unless *value* is given.
+    """
+
+    if value is None:
+        value = response_cache_enabled(None)
+    with st.sidebar:
+        enabled = st.toggle(label, value=value, help="Aus: immer neu generieren")
+        stats = get_response_cache().stats()
+        st.caption(f"Cache: {stats['hits']} Treffer • {stats['misses']} Fehlgriffe • {stats['entries']} Einträge")
+    return enabled
+
+
+def add_select_model(label: str = "Modell", modeltype: Optional[ModelType] = None) -> str:
+    """Render a model selectbox with the available Ollama models.
+
+    A newly selected model is loaded in the background right away, so the
+    first request does not pay the model-load latency.
+    """
+
+    model = st.selectbox(label, get_models(modeltype))
+    state_key = f"_warmed_model::{label}"
+    if model and st.session_state.get(state_key) != model:
+        st.session_state[state_key] = model
+        get_residency_manager().warm_up_async(model)
+    return model
@@ -0,0 +1,135 @@
+"""Throttled rendering of streamed Ollama output into a Streamlit placeholder."""
+
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass
+from typing import Callable, Iterable, List, Optional
+
+import streamlit as st
+
+__all__ = ["StreamStats", "StreamRenderer", "render_stream"]
+
+CURSOR = "▌"
+
+
+@dataclass
+class StreamStats:
+    """Timing information of one streamed response."""
+
+    ttft: Optional[float] = None  # seconds until the first non-empty chunk
+    duration: float = 0.0  # seconds until the stream ended
+    tokens: int = 0  # eval_count reported by Ollama, else number of chunks
+    prompt_tokens: int = 0  # prompt_eval_count reported by Ollama
+    tokens_per_s: float = 0.0
+    flushes: int = 0  # number of UI updates
+
+    def caption(self) -> str:
+        ttft = f"{self.ttft:.2f}s" if self.ttft is not None else "–"
+        prompt = f"{self.prompt_tokens} Prompt-Tokens • " if self.prompt_tokens else ""
+        return f"⏱️ TTFT {ttft} • {prompt}{self.tokens} Tokens • {self.tokens_per_s:.1f} Tokens/s • {self.duration:.1f}s"
+
+
+class StreamRenderer:
+    """Collect streamed text chunks and update the UI at a bounded rate.
+
+    Chunks are buffered in a list and only pushed to the placeholder when
+    ``1 / fps`` seconds have passed or ``flush_chars`` characters are pending,
+    so long answers cost a few dozen websocket messages instead of one per
+    token. The final text is rendered exactly once, without the cursor.
+    """
+
+    def __init__(self, placeholder=None, fps: float = 8.0, flush_chars: int = 4096):
+        self.placeholder = placeholder if placeholder is not None else st.empty()
+        self.interval = 1.0 / fps if fps > 0 else 0.0
+        self.flush_chars = flush_chars
+        self.stats = StreamStats()
+        self._text = ""
+        self._pending: List[str] = []
+        self._pending_chars = 0
+        self._chunks = 0
+        self._started = time.perf_counter()
+        self._last_flush = self._started
+
+    @property
+    def text(self) -> str:
+        if self._pending:
+            self._text += "".join(self._pending)
+            self._pending.clear()
+            self._pending_chars = 0
+        return self._text
+
+    def feed(self, chunk: str) -> None:
+        """Add a chunk; flushes to the UI if the frame interval or size limit is reached."""
+        if not chunk:
+            return
+        now = time.perf_counter()
+        if self.stats.ttft is None:
+            self.stats.ttft = now - self._started
+        self._chunks += 1
+        self._pending.append(chunk)
+        self._pending_chars += len(chunk)
+        if now - self._last_flush >= self.interval or self._pending_chars >= self.flush_chars:
+            self.placeholder.markdown(self.text + CURSOR)
+            self.stats.flushes += 1
+            self._last_flush = now
+
+    def finish(self, final_part: Optional[dict] = None) -> str:
+        """Render the complete text once and compute the stream statistics."""
+        text = self.text
+        self.placeholder.markdown(text)
+        self.stats.flushes += 1
+        self.stats.duration = time.perf_counter() - self._started
+
+        final_part = final_part or {}
+        eval_count = final_part.get("eval_count")
+        eval_duration = final_part.get("eval_duration")  # nanoseconds
+        self.stats.prompt_tokens = int(final_part.get("prompt_eval_count") or 0)
+        if eval_count and eval_duration:
+            self.stats.tokens = int(eval_count)
+            self.stats.tokens_per_s = eval_count / (eval_duration / 1e9)
+        else:
+            self.stats.tokens = self._chunks
+            generation_time = self.stats.duration - (self.stats.ttft or 0.0)
+            if generation_time > 0:
+                self.stats.tokens_per_s = self._chunks / generation_time
+        return text
+
+
+def _chunk_text(part: dict, field: str) -> str:
+    if field == "message":
+        return (part.get("message") or {}).get("content", "")
+    return part.get(field, "")
+
+
+def render_stream(
+    parts: Iterable[dict],
+    field: str = "response",
+    placeholder=None,
+    fps: float = 8.0,
+    flush_chars: int = 4096,
+    show_stats: bool = True,
+    on_finish: Optional[Callable[[StreamStats], None]] = None,
+) -> str:
+    """Render NDJSON parts from ``/api/generate`` (``field="response"``) or
+    ``/api/chat`` (``field="message"``) and return the final text.
+
+    *on_finish* receives the stream statistics once the stream has ended.
+    """
+
+    renderer = StreamRenderer(placeholder, fps=fps, flush_chars=flush_chars)
+    final_part = None
+    try:
+        for part in parts:
+            renderer.feed(_chunk_text(part, field))
+            if part.get("done"):
+                final_part = part
+    except Exception:
+        renderer.placeholder.markdown(renderer.text)  # keep the partial answer visible
+        raise
+    text = renderer.finish(final_part)
+    if show_stats:
+        st.caption(renderer.stats.caption())
+    if on_finish is not None:
+        on_finish(renderer.stats)
+    return text
@@ -0,0 +1,186 @@
+"""Batch image analysis on a bounded worker pool with resumable JSONL output.
+
+Every image is prepared with ``lib.image_utils`` and sent to the vision model
+by one of *max_workers* threads (default: Ollama's parallel slots). Results
+are appended to a JSONL file as they complete, one line per image::
+
+    {"path": ..., "sha256": ..., "model": ..., "tags": [...], "response": ...,
+     "latency_s": ..., "error": null, "ts": ...}
+
+A rerun with the same output file skips images whose content hash already
+has a successful line, so an interrupted batch just continues.
+
+Example:
+    >>> for result in run_batch(folder_images("./inbox"), model, PROMPT, "results.jsonl"):
+    ...     print(result["path"], result["tags"])
+"""
+from __future__ import annotations
+
+import json
+import re
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, List, Set, Tuple
+
+from lib.cache_utils import content_hash
+from lib.helper_ollama import client
+from lib.helper_ollama.client import PARALLEL_SLOTS
+from lib.image_utils import DEFAULT_QUALITY, encode_for_model
+
+__all__ = [
+    "IMAGE_EXTENSIONS",
+    "MODERATION_PROMPT",
+    "folder_images",
+    "completed_hashes",
+    "parse_tags",
+    "analyze_image",
+    "run_batch",
+]
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".webp")
+DEFAULT_TIMEOUT = 120.0
+
+MODERATION_PROMPT = (
+    "Analysiere das Bild auf sensible Inhalte (Gewalt, NSFW, persönliche Daten). "
+    "Antworte nur mit einer kommagetrennten Liste kurzer Tags, kein Urteil. "
+    "Wenn nichts auffällt, antworte mit „unauffällig“."
+)
+
+# (display path, loader returning the image bytes)
+ImageItem = Tuple[str, Callable[[], bytes]]
+
+_tag_split = re.compile(r"[,\n;]+")
+
+
+def folder_images(folder: str, extensions: Tuple[str, ...] = IMAGE_EXTENSIONS) -> List[ImageItem]:
+    """List the images below *folder*; the bytes are only read by the workers."""
+    root = Path(folder).expanduser()
+    return [
+        (str(path.relative_to(root)), path.read_bytes)
+        for path in sorted(root.rglob("*"))
+        if path.suffix.lower() in extensions and path.is_file()
+    ]
+
+
+def completed_hashes(output: Path) -> Set[str]:
+    """Content hashes with a successful result in *output* (broken lines are ignored)."""
+    done: Set[str] = set()
+    try:
+        with output.open("r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # e.g. a line cut off by a crash
+                if not record.get("error") and record.get("sha256"):
+                    done.add(record["sha256"])
+    except OSError:
+        pass
+    return done
+
+
+def parse_tags(text: str) -> List[str]:
+    """Split a model answer into short tags (bullets and numbering removed)."""
+    tags = []
+    for part in _tag_split.split(text):
+        tag = part.strip().lstrip("-*•#0123456789.) ").strip(" .\"'„“")
+        if tag and len(tag) <= 60 and tag.lower() not in (t.lower() for t in tags):
+            tags.append(tag)
+    return tags
+
+
+def analyze_image(
+    data: bytes,
+    model: str,
+    prompt: str = MODERATION_PROMPT,
+    timeout: float = DEFAULT_TIMEOUT,
+    quality: int = DEFAULT_QUALITY,
+) -> str:
+    """Run *prompt* on one image and return the answer.
+
+    The answer is streamed so the request can be dropped once *timeout*
+    seconds have passed; closing the stream also stops generation in Ollama.
+    """
+    payload = {"model": model, "prompt": prompt, "images": [encode_for_model(data, model, quality)]}
+    deadline = time.monotonic() + timeout
+    parts = client.stream_ndjson("/api/generate", payload, timeout=(3.05, timeout))
+    text = []
+    try:
+        for part in parts:
+            text.append(part.get("response", ""))
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"Zeitlimit von {timeout:g} s überschritten")
+    finally:
+        parts.close()
+    return "".join(text).strip()
+
+
+def _process(item: ImageItem, model: str, prompt: str, timeout: float, quality: int, done: Set[str]) -> dict:
+    path, load = item
+    started = time.perf_counter()
+    record = {
+        "path": path, "sha256": None, "model": model, "tags": [], "response": "",
+        "latency_s": None, "error": None,
+    }
+    try:
+        data = load()
+        record["sha256"] = content_hash(data)
+        if record["sha256"] in done:
+            return {**record, "skipped": True}
+        record["response"] = analyze_image(data, model, prompt, timeout, quality)
+        record["tags"] = parse_tags(record["response"])
+    except Exception as e:  # noqa: BLE001 - recorded per image, the batch goes on
+        record["error"] = f"{type(e).__name__}: {e}"
+    record["latency_s"] = round(time.perf_counter() - started, 3)
+    record["ts"] = datetime.now(timezone.utc).isoformat(timespec="seconds")
+    return record
+
+
+def run_batch(
+    items: Iterable[ImageItem],
+    model: str,
+    prompt: str = MODERATION_PROMPT,
+    output: str | Path = "image_results.jsonl",
+    max_workers: int = PARALLEL_SLOTS,
+    timeout: float = DEFAULT_TIMEOUT,
+    quality: int = DEFAULT_QUALITY,
+) -> Iterator[dict]:
+    """Analyse *items* concurrently, appending each result to *output* as it completes.
+
+    Yields the result records in completion order; images already in
+    *output* are not analysed again and come back with ``"skipped": True``.
+    At most ``2 * max_workers`` images are in flight, so large folders are
+    never loaded at once.
+    """
+    output = Path(output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    done = completed_hashes(output)
+    pending_items = iter(items)
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool, output.open("a", encoding="utf-8") as out:
+        in_flight = set()
+
+        def submit_next() -> bool:
+            item = next(pending_items, None)
+            if item is None:
+                return False
+            in_flight.add(pool.submit(_process, item, model, prompt, timeout, quality, done))
+            return True
+
+        while len(in_flight) < 2 * max(1, max_workers) and submit_next():
+            pass
+        while in_flight:
+            finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in finished:
+                in_flight.discard(future)
+                submit_next()
+                record = future.result()
+                if record.get("skipped"):
+                    yield record
+                    continue
+                out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                out.flush()
+                if not record["error"]:
+                    done.add(record["sha256"])
+                yield record
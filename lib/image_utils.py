@@ -0,0 +1,107 @@
+"""Image preprocessing for vision model requests.
+
+Uploads are usually far larger than what a vision model looks at: a 12 MP
+photo is ~16 MB as base64, and the model downsamples it to a few hundred
+pixels anyway. ``prepare_image`` applies the EXIF orientation, scales the
+image down to the model's input resolution, drops all metadata (EXIF, GPS,
+ICC, comments) and re-encodes it as JPEG. Results are cached on disk by
+content hash and settings, so checking the same image again costs nothing.
+
+Example:
+    >>> encoded = encode_for_model(upload.getvalue(), "llama3.2-vision")
+    >>> payload = {"model": "llama3.2-vision", "prompt": prompt, "images": [encoded]}
+"""
+from __future__ import annotations
+
+import base64
+import io
+import os
+import threading
+from typing import Dict, Optional
+
+from lib.cache_utils import cache_dir, content_hash
+
+__all__ = [
+    "DEFAULT_MAX_SIDE",
+    "DEFAULT_QUALITY",
+    "model_image_size",
+    "max_side_for_model",
+    "prepare_image",
+    "encode_for_model",
+]
+
+# Used when a model does not report its vision input size.
+DEFAULT_MAX_SIDE = int(os.environ.get("VISION_MAX_SIDE", "1024"))
+DEFAULT_QUALITY = int(os.environ.get("VISION_JPEG_QUALITY", "85"))
+# Models that tile large images (llama3.2-vision, llava-1.6, gemma3) use up to ~2x2 tiles.
+TILES_PER_SIDE = 2
+
+_sizes: Dict[str, Optional[int]] = {}
+_sizes_lock = threading.Lock()
+
+
+def model_image_size(model: str) -> Optional[int]:
+    """Return the native input size (``*.vision.image_size``) reported by ``/api/show``."""
+    with _sizes_lock:
+        if model in _sizes:
+            return _sizes[model]
+    from lib.helper_ollama import get_model_info
+
+    size = None
+    try:
+        for key, value in get_model_info(model)["model_info"].items():
+            if key.endswith(".vision.image_size"):
+                size = int(value[0] if isinstance(value, list) else value)
+                break
+    except Exception:  # noqa: BLE001 - unknown model or Ollama down: use the default size
+        return None
+    with _sizes_lock:
+        _sizes[model] = size
+    return size
+
+
+def max_side_for_model(model: Optional[str]) -> int:
+    """Longest image side worth sending to *model*."""
+    size = model_image_size(model) if model else None
+    return size * TILES_PER_SIDE if size else DEFAULT_MAX_SIDE
+
+
+def prepare_image(data: bytes, max_side: int = DEFAULT_MAX_SIDE, quality: int = DEFAULT_QUALITY) -> bytes:
+    """Return *data* as a metadata-free JPEG whose longest side is at most *max_side*.
+
+    Images are never upscaled. Cached by content hash, size and quality.
+    """
+    path = cache_dir("images") / f"{content_hash(data)}-{max_side}-q{quality}.jpg"
+    try:
+        return path.read_bytes()
+    except OSError:
+        pass
+
+    from PIL import Image, ImageOps
+
+    with Image.open(io.BytesIO(data)) as image:
+        image = ImageOps.exif_transpose(image)
+        if image.mode in ("RGBA", "LA", "P"):
+            # JPEG has no alpha: flatten transparent areas onto white
+            image = image.convert("RGBA")
+            background = Image.new("RGB", image.size, (255, 255, 255))
+            background.paste(image, mask=image.getchannel("A"))
+            image = background
+        elif image.mode != "RGB":
+            image = image.convert("RGB")
+        if max(image.size) > max_side:
+            image.thumbnail((max_side, max_side), Image.LANCZOS)
+        buffer = io.BytesIO()
+        # A fresh save without exif/icc_profile arguments writes no metadata.
+        image.save(buffer, format="JPEG", quality=quality, optimize=True)
+
+    encoded = buffer.getvalue()
+    tmp = path.with_name(f".{path.name}.{threading.get_ident()}.tmp")
+    tmp.write_bytes(encoded)
+    os.replace(tmp, path)
+    return encoded
+
+
+def encode_for_model(data: bytes, model: Optional[str] = None, quality: int = DEFAULT_QUALITY) -> str:
+    """Prepare *data* for *model* and return it base64-encoded for the ``images`` field."""
+    return base64.b64encode(prepare_image(data, max_side_for_model(model), quality)).decode()
@@ -0,0 +1,235 @@
+"""Incremental JSON parsing with early schema checks for streamed model output.
+
+``JSONStreamParser`` is fed the chunks of a streamed answer as they arrive.
+It tracks the nesting of the document character by character and
+
+* returns every value at a watched path (e.g. each element of ``units``) as
+  soon as that value is complete, so the UI can show it right away;
+* checks each value against a JSON schema when it *starts* (type) and when
+  it ends (``required``, ``enum``, integers), and rejects unknown keys if
+  ``additionalProperties`` is false, raising ``JSONStreamError`` at the first
+  violation instead of after the whole generation.
+
+Supported schema keywords: ``type``, ``properties``, ``required``,
+``additionalProperties: false``, ``items``, ``enum``, ``minItems``.
+
+Example:
+    >>> parser = JSONStreamParser(schema, watch=[("units", "*")])
+    >>> for part in parts:
+    ...     for path, unit in parser.feed(part["response"]):
+    ...         rows.append(unit)
+    >>> data = parser.close()
+"""
+from __future__ import annotations
+
+import json
+from typing import Any, Iterable, List, Optional, Sequence, Tuple
+
+__all__ = ["JSONStreamError", "JSONStreamParser"]
+
+Path = Tuple[Any, ...]
+
+_WHITESPACE = " \t\r\n"
+_NUMBER_CHARS = "0123456789+-.eE"
+_LITERAL_CHARS = "truefalsn"
+_START_TYPES = {
+    "{": ("object",),
+    "[": ("array",),
+    '"': ("string",),
+    "t": ("boolean",),
+    "f": ("boolean",),
+    "n": ("null",),
+}
+
+
+class JSONStreamError(ValueError):
+    """The stream is not valid JSON or violates the schema."""
+
+
+def _format_path(path: Path) -> str:
+    return "".join(f"[{p}]" if isinstance(p, int) else f".{p}" for p in path) or "(Wurzel)"
+
+
+def _types(schema: Optional[dict]) -> Optional[Tuple[str, ...]]:
+    kind = (schema or {}).get("type")
+    if kind is None:
+        return None
+    return (kind,) if isinstance(kind, str) else tuple(kind)
+
+
+class _Frame:
+    __slots__ = ("kind", "schema", "path", "start", "state", "key", "keys", "index")
+
+    def __init__(self, kind: str, schema: Optional[dict], path: Path, start: int):
+        self.kind = kind
+        self.schema = schema
+        self.path = path
+        self.start = start
+        self.state = "first"  # first | key | colon | value | next
+        self.key: Optional[str] = None
+        self.keys: set = set()
+        self.index = 0
+
+
+class JSONStreamParser:
+    """Parse one JSON document from chunks; see the module docstring."""
+
+    def __init__(self, schema: Optional[dict] = None, watch: Iterable[Sequence[Any]] = ()):
+        self.schema = schema
+        self.watch = [tuple(pattern) for pattern in watch]
+        self.text = ""
+        self._pos = 0
+        self._stack: List[_Frame] = []
+        self._done = False
+        # scalar being read: (kind, start, is_key, path, schema)
+        self._scalar: Optional[Tuple[str, int, bool, Path, Optional[dict]]] = None
+        self._escape = False
+        self._events: List[Tuple[Path, Any]] = []
+
+    # -- public ----------------------------------------------------------------------------------
+    def feed(self, chunk: str) -> List[Tuple[Path, Any]]:
+        """Consume *chunk*; return ``(path, value)`` for every watched value completed by it."""
+        self.text += chunk
+        self._events = []
+        text = self.text
+        while self._pos < len(text):
+            self._step(text[self._pos], self._pos)
+            self._pos += 1
+        return self._events
+
+    def close(self) -> Any:
+        """Finish the document and return it; raises ``JSONStreamError`` if it is incomplete."""
+        if self._scalar is not None and self._scalar[0] in ("number", "literal") and not self._stack:
+            self._end_scalar(len(self.text))
+        if not self._done:
+            raise JSONStreamError("JSON unvollständig: die Ausgabe endet mitten im Dokument")
+        return json.loads(self.text)
+
+    @property
+    def depth(self) -> int:
+        return len(self._stack)
+
+    # -- state machine ---------------------------------------------------------------------------
+    def _fail(self, message: str, path: Path = ()) -> None:
+        raise JSONStreamError(f"{message} bei {_format_path(path)} (Zeichen {self._pos})")
+
+    def _step(self, char: str, pos: int) -> None:
+        if self._scalar is not None:
+            kind = self._scalar[0]
+            if kind == "string":
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._end_scalar(pos + 1)
+                return
+            if char in (_NUMBER_CHARS if kind == "number" else _LITERAL_CHARS):
+                return
+            self._end_scalar(pos)  # the delimiter is processed below
+
+        if char in _WHITESPACE:
+            return
+        if not self._stack:
+            if self._done:
+                self._fail("Zusätzliche Zeichen nach dem JSON-Dokument")
+            self._begin_value(char, pos, (), self.schema)
+            return
+
+        frame = self._stack[-1]
+        if frame.kind == "object":
+            if frame.state in ("first", "key") and char == '"':
+                self._scalar = ("string", pos, True, frame.path, None)
+            elif frame.state in ("first", "next") and char == "}":
+                self._close(frame, pos)
+            elif frame.state == "colon" and char == ":":
+                frame.state = "value"
+            elif frame.state == "value":
+                properties = (frame.schema or {}).get("properties", {})
+                self._begin_value(char, pos, frame.path + (frame.key,), properties.get(frame.key))
+            elif frame.state == "next" and char == ",":
+                frame.state = "key"
+            else:
+                self._fail(f"Unerwartetes Zeichen {char!r} im Objekt", frame.path)
+        else:
+            if frame.state in ("first", "next") and char == "]":
+                self._close(frame, pos)
+            elif frame.state in ("first", "value"):
+                self._begin_value(char, pos, frame.path + (frame.index,), (frame.schema or {}).get("items"))
+            elif frame.state == "next" and char == ",":
+                frame.index += 1
+                frame.state = "value"
+            else:
+                self._fail(f"Unerwartetes Zeichen {char!r} in der Liste", frame.path)
+
+    def _begin_value(self, char: str, pos: int, path: Path, schema: Optional[dict]) -> None:
+        if char in "-0123456789":
+            kind, found = "number", ("number", "integer")
+        elif char in _START_TYPES:
+            kind, found = char, _START_TYPES[char]
+        else:
+            self._fail(f"Unerwartetes Zeichen {char!r}", path)
+        expected = _types(schema)
+        if expected is not None and not set(found) & set(expected):
+            self._fail(f"Typ {found[0]} statt {'/'.join(expected)}", path)
+
+        if char == "{":
+            self._stack.append(_Frame("object", schema, path, pos))
+        elif char == "[":
+            self._stack.append(_Frame("array", schema, path, pos))
+        else:
+            kind = "string" if char == '"' else ("number" if kind == "number" else "literal")
+            self._scalar = (kind, pos, False, path, schema)
+            if self._stack:
+                self._stack[-1].state = "next"  # the value has started; closed by _end_scalar
+
+    def _end_scalar(self, end: int) -> None:
+        kind, start, is_key, path, schema = self._scalar
+        self._scalar = None
+        try:
+            value = json.loads(self.text[start:end])
+        except ValueError:
+            self._fail(f"Ungültiger Wert {self.text[start:end]!r}", path)
+        if is_key:
+            self._add_key(value)
+            return
+        schema = schema or {}
+        if "enum" in schema and value not in schema["enum"]:
+            self._fail(f"Wert {value!r} nicht erlaubt", path)
+        if _types(schema) == ("integer",) and not isinstance(value, int):
+            self._fail(f"Ganzzahl erwartet, nicht {value!r}", path)
+        self._completed(path, start, end, value)
+
+    def _add_key(self, key: str) -> None:
+        frame = self._stack[-1]
+        schema = frame.schema or {}
+        if schema.get("additionalProperties") is False and key not in schema.get("properties", {}):
+            self._fail(f"Unbekanntes Feld {key!r}", frame.path)
+        frame.key = key
+        frame.keys.add(key)
+        frame.state = "colon"
+
+    def _close(self, frame: _Frame, pos: int) -> None:
+        schema = frame.schema or {}
+        if frame.kind == "object":
+            missing = [key for key in schema.get("required", ()) if key not in frame.keys]
+            if missing:
+                self._fail(f"Pflichtfeld(er) fehlen: {', '.join(missing)}", frame.path)
+        else:
+            count = frame.index + 1 if frame.state == "next" else 0
+            if count < schema.get("minItems", 0):
+                self._fail(f"Mindestens {schema['minItems']} Einträge erwartet", frame.path)
+        self._stack.pop()
+        self._completed(frame.path, frame.start, pos + 1, None)
+
+    def _completed(self, path: Path, start: int, end: int, value: Any) -> None:
+        if self._stack:
+            self._stack[-1].state = "next"
+        else:
+            self._done = True
+        if any(self._matches(pattern, path) for pattern in self.watch):
+            self._events.append((path, json.loads(self.text[start:end]) if value is None else value))
+
+    @staticmethod
+    def _matches(pattern: Path, path: Path) -> bool:
+        return len(pattern) == len(path) and all(p == "*" or p == q for p, q in zip(pattern, path))
@@ -0,0 +1,209 @@
+"""Map-reduce analysis of documents that do not fit into one prompt.
+
+The text is split into context-sized chunks, every chunk is condensed with
+respect to the question by concurrent LLM calls (map), and the partial results
+are merged hierarchically (reduce) until they fit into one final prompt that
+the caller streams to the UI. All calls use the same ``num_ctx``. Chunks
+and groups of partials are sized by estimated tokens to leave
+``RESERVE_TOKENS`` of it free, and every answer is capped at
+``PREDICT_TOKENS``, so no prompt is truncated by Ollama.
+
+Example:
+    >>> prompt = map_reduce_prompt(model, text, question, on_progress=callback)
+    >>> generate(model, prompt, options=call_options(DEFAULT_NUM_CTX))
+"""
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, List, Optional, Sequence
+
+from lib.chunker import chars_per_token, chunk_text, estimate_tokens
+from lib.document_session import MIN_CTX, RESERVE_TOKENS
+from lib.helper_ollama import generate as ollama_generate
+from lib.helper_ollama.client import PARALLEL_SLOTS
+
+__all__ = [
+    "DEFAULT_NUM_CTX",
+    "PREDICT_TOKENS",
+    "call_options",
+    "chunk_chars_for",
+    "split_text",
+    "map_chunks",
+    "reduce_partials",
+    "final_prompt",
+    "map_reduce_prompt",
+]
+
+# Callback(stage, done, total, partial text)
+ProgressCallback = Callable[[str, int, int, str], None]
+
+DEFAULT_NUM_CTX = MIN_CTX
+DEFAULT_FAN_IN = 4
+# Cap per answer; together with the prompt template and question it stays within RESERVE_TOKENS.
+PREDICT_TOKENS = 1024
+
+MAP_PROMPT = (
+    "Du analysierst Teil {index} von {total} eines längeren Dokuments.\n"
+    "Extrahiere alle Fakten, Zahlen und Aussagen, die für die Aufgabe relevant sind, "
+    "als knappe Stichpunkte. Wenn der Abschnitt nichts Relevantes enthält, antworte nur mit „—“.\n\n"
+    "Aufgabe: {question}\n\n"
+    "Abschnitt:\n{chunk}"
+)
+
+REDUCE_PROMPT = (
+    "Führe die folgenden Teilergebnisse einer Dokumentanalyse zusammen. "
+    "Entferne Dopplungen, behalte alle für die Aufgabe relevanten Fakten und Zahlen, "
+    "antworte in knappen Stichpunkten.\n\n"
+    "Aufgabe: {question}\n\n"
+    "{partials}"
+)
+
+FINAL_PROMPT = (
+    "Beantworte die Aufgabe auf Basis der folgenden Teilergebnisse, die aus dem gesamten "
+    "Dokument ({total} Abschnitte) extrahiert wurden. Antworte strukturiert auf Deutsch.\n\n"
+    "Aufgabe: {question}\n\n"
+    "{partials}"
+)
+
+
+def call_options(num_ctx: int = DEFAULT_NUM_CTX) -> dict:
+    """Ollama options for every call of one map-reduce run (and its final answer)."""
+    return {"num_ctx": num_ctx, "num_predict": PREDICT_TOKENS}
+
+
+def _budget(num_ctx: int, reserve: int = RESERVE_TOKENS) -> int:
+    """Tokens of document text or partial results one prompt may carry."""
+    if num_ctx <= reserve:
+        raise ValueError(f"num_ctx must exceed the reserve of {reserve} tokens, got {num_ctx}")
+    return num_ctx - reserve
+
+
+def chunk_chars_for(num_ctx: int = DEFAULT_NUM_CTX, model: Optional[str] = None, reserve: int = RESERVE_TOKENS) -> int:
+    """Characters per chunk so that a map prompt plus its answer fit into *num_ctx* tokens."""
+    return int(_budget(num_ctx, reserve) * chars_per_token(model))
+
+
+def split_text(text: str, chunk_chars: Optional[int] = None) -> List[str]:
+    """Split *text* into chunks of at most *chunk_chars* (default: ``chunk_chars_for()``),
+    preferring paragraph and sentence breaks."""
+    chunk_chars = chunk_chars or chunk_chars_for()
+    return [chunk.text for chunk in chunk_text(text, chunk_chars, chars_per_tok=1.0)]
+
+
+def _complete(model: str, prompt: str, num_ctx: int) -> str:
+    return ollama_generate(model, prompt, options=call_options(num_ctx))["response"].strip()
+
+
+def _run_parallel(
+    model: str,
+    prompts: Sequence[str],
+    stage: str,
+    max_workers: int,
+    on_progress: Optional[ProgressCallback],
+    num_ctx: int,
+) -> List[str]:
+    """Run *prompts* concurrently, reporting each result as soon as it arrives."""
+    results: List[str] = [""] * len(prompts)
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(prompts)))) as pool:
+        futures = {pool.submit(_complete, model, p, num_ctx): i for i, p in enumerate(prompts)}
+        for done, future in enumerate(as_completed(futures), start=1):
+            index = futures[future]
+            results[index] = future.result()
+            if on_progress is not None:
+                on_progress(stage, done, len(prompts), results[index])
+    return results
+
+
+def _format_partials(partials: Sequence[str]) -> str:
+    return "\n\n".join(f"### Teilergebnis {i}\n{p}" for i, p in enumerate(partials, start=1))
+
+
+def map_chunks(
+    model: str,
+    chunks: Sequence[str],
+    question: str,
+    max_workers: int = PARALLEL_SLOTS,
+    on_progress: Optional[ProgressCallback] = None,
+    num_ctx: int = DEFAULT_NUM_CTX,
+) -> List[str]:
+    """Condense each chunk with respect to *question* (map step)."""
+    prompts = [
+        MAP_PROMPT.format(index=i, total=len(chunks), question=question, chunk=chunk)
+        for i, chunk in enumerate(chunks, start=1)
+    ]
+    partials = _run_parallel(model, prompts, "map", max_workers, on_progress, num_ctx)
+    # Drop chunks without relevant content before reducing.
+    return [p for p in partials if p.strip(" \n—-")] or partials[:1]
+
+
+def reduce_partials(
+    model: str,
+    partials: Sequence[str],
+    question: str,
+    fan_in: int = DEFAULT_FAN_IN,
+    max_workers: int = PARALLEL_SLOTS,
+    on_progress: Optional[ProgressCallback] = None,
+    num_ctx: int = DEFAULT_NUM_CTX,
+) -> List[str]:
+    """Merge partial results in groups until at most *fan_in* remain and they fit one prompt.
+
+    A group holds up to *fan_in* partials and at most the token budget of
+    *num_ctx*, but always at least two, so every round shrinks the list.
+    """
+    if fan_in < 2:
+        raise ValueError(f"fan_in must be at least 2, got {fan_in}")
+    budget = _budget(num_ctx)
+    partials = list(partials)
+    while len(partials) > 1 and (
+        len(partials) > fan_in or estimate_tokens(_format_partials(partials), model) > budget
+    ):
+        groups = _group(partials, fan_in, budget, model)
+        prompts = [
+            REDUCE_PROMPT.format(question=question, partials=_format_partials(group))
+            for group in groups
+        ]
+        partials = _run_parallel(model, prompts, "reduce", max_workers, on_progress, num_ctx)
+    return partials
+
+
+def _group(partials: Sequence[str], fan_in: int, budget: int, model: str) -> List[List[str]]:
+    groups: List[List[str]] = []
+    group: List[str] = []
+    tokens = 0
+    for partial in partials:
+        size = estimate_tokens(f"### Teilergebnis {len(group) + 1}\n{partial}\n\n", model)
+        if len(group) >= fan_in or (len(group) >= 2 and tokens + size > budget):
+            groups.append(group)
+            group, tokens = [], 0
+        group.append(partial)
+        tokens += size
+    if group:
+        groups.append(group)
+    return groups
+
+
+def final_prompt(partials: Sequence[str], question: str, total: int) -> str:
+    return FINAL_PROMPT.format(question=question, total=total, partials=_format_partials(partials))
+
+
+def map_reduce_prompt(
+    model: str,
+    text: str,
+    question: str,
+    chunk_chars: Optional[int] = None,
+    fan_in: int = DEFAULT_FAN_IN,
+    max_workers: int = PARALLEL_SLOTS,
+    on_progress: Optional[ProgressCallback] = None,
+    num_ctx: int = DEFAULT_NUM_CTX,
+) -> str:
+    """Run map and reduce over the whole *text* and return the final prompt to stream.
+
+    *chunk_chars* defaults to what fits into *num_ctx*; stream the final prompt
+    with ``call_options(num_ctx)`` so the model is not reloaded.
+    """
+    if fan_in < 2:
+        raise ValueError(f"fan_in must be at least 2, got {fan_in}")
+    chunks = split_text(text, chunk_chars or chunk_chars_for(num_ctx, model))
+    partials = map_chunks(model, chunks, question, max_workers, on_progress, num_ctx)
+    partials = reduce_partials(model, partials, question, fan_in, max_workers, on_progress, num_ctx)
+    return final_prompt(partials, question, len(chunks))
@@ -0,0 +1,427 @@
+"""Prompt builders of the content generators, callable without Streamlit.
+
+Each page (Blog, FAQ, Ideas, Travel, Education Tutor 1/2) builds its prompt
+with one of these functions, and the batch runner (``lib.batch_cli``) calls
+the same functions by name through ``PROMPT_BUILDERS``. Defaults match the
+pages' form defaults.
+
+Example:
+    >>> prompt = build_prompt("blog", {"topic": "Die Zukunft der KI", "length": 600})
+"""
+from __future__ import annotations
+
+import json
+from collections import defaultdict
+from textwrap import dedent
+from typing import Callable, Dict, Mapping, Optional, Sequence
+
+__all__ = [
+    "blog_prompt",
+    "faq_prompt",
+    "ideas_prompt",
+    "travel_prompt",
+    "lesson_plan_prompt",
+    "structured_lesson_plan_prompt",
+    "LESSON_PLAN_SCHEMA",
+    "PROMPT_BUILDERS",
+    "build_prompt",
+]
+
+
+def blog_prompt(topic: str, tone: str = "Professionell", length: int = 800) -> str:
+    return (
+        f"Schreibe einen {tone.lower()}en Blogartikel (~{length} Wörter) über: {topic}. "
+        "Markdown, H1/H2, Bulletpoints, Fazit."
+    )
+
+
+def faq_prompt(source_text: str) -> str:
+    return (
+        "Erzeuge 10 FAQ-Fragen mit kurzen, klaren Antworten basierend auf diesem Inhalt (Deutsch):\n\n"
+        + source_text
+    )
+
+
+def ideas_prompt(topic: str) -> str:
+    return (
+        "Erzeuge 10 Content-Ideen mit Titel + 1-Satz-Hook zum Thema: "
+        f"{topic}. Gib als nummerierte Liste zurück."
+    )
+
+
+def travel_prompt(
+    destination: str,
+    duration: int = 5,
+    travelers: str = "Paar, abenteuerlustig",
+    interests: Sequence[str] = ("Kultur & Museen", "Kulinarik"),
+    budget_level: str = "Mittelklasse",
+    must_do: str = "",
+) -> str:
+    return f"""Du bist Reiseplaner:in. Erstelle einen Tagesplan für eine Reise.
+Reiseziel: {destination}
+Reisedauer: {duration} Tage
+Reisende: {travelers}
+Interessen: {', '.join(interests) if interests else 'offen'}
+Budgetniveau: {budget_level}
+Must-do: {must_do}
+
+Gib für jeden Tag Morgen-, Nachmittag- und Abendprogramm, Restauranttipps, Budgetschätzung und praktische Hinweise.
+"""
+
+
+def lesson_plan_prompt(
+    subject: str,
+    level: str = "Mittelstufe",
+    goals: str = "",
+    activities: str = "",
+    duration: int = 60,
+    tone: str = "Motivierend",
+) -> str:
+    """Free-form lesson plan (Education Tutor 1)."""
+    return f"""Du bist ein professioneller Unterrichtscoach. Erstelle einen detaillierten Unterrichtsplan.
+Fach: {subject}
+Lernniveau: {level}
+Dauer: {duration} Minuten
+Ziele: {goals}
+Vorgesehene Aktivitäten oder Materialien: {activities}
+Ton & Stil: {tone}
+
+Gib eine strukturierte Antwort mit folgenden Abschnitten: 
+- Einstieg
+
+- Hauptteil
+  Beschreibe den Hauptteil. Erstelle ein Inhaltserzeichnis aller Themen und Einheiten.
+  Beschreibe jene Einheit mit einer Zusammenfassung
+  
+- Aktivität/Übung
+- Reflexion
+
+- Hausaufgabe/Weiterarbeit
+  Erstelle mindests 5 Augaben. Füge am Ende die Lösungen für jede Aufgabe hinzu
+
+Ergänze konkrete Zeitvorschläge.
+"""
+
+
+# -----------------------------------------------------------------------------
+# Education Tutor 2: Markdown plan plus JSON (placeholders in the schema escaped)
+# -----------------------------------------------------------------------------
+_LESSON_PLAN_SPEC = """\
+### Vorgaben
+- Fach: {subject}
+- Lernniveau: {level}
+- Gesamtdauer: {duration} Minuten
+- Anzahl der Lerneinheiten: {num_units}
+- Lernziele (Stichpunkte): {goals}
+- Vorkenntnisse/Voraussetzungen: {prerequisites}
+- Bevorzugte Aktivitäten/Materialien: {activities}
+- Einschränkungen/Settings: {constraints}
+- Ton & Stil: {tone}
+- Ausgabesprache: {language}
+- Leistungsniveaus berücksichtigen: {diff_levels}
+- Optionales Mini-Quiz: {include_quiz}
+- Rubric/Bewertungskriterien: {include_rubric}
+- Hausaufgaben/Weiterarbeit: {include_homework}
+- Fehlvorstellungen & Checkpoints: {include_tips}
+
+### Inhaltliche Leitplanken
+- Nutze **realistische Zeitboxen**, die die Gesamtdauer nicht überschreiten.
+- Verwende **präzise Lernziele** (Bloom-Taxonomie).
+- **Differenzierung** für die angegebenen Leistungsniveaus.
+- **Assessment**: Formativ und ggf. summativ.
+- **Übungen/Aufgaben**: Mindestens fünf, mit Lösungen.
+- **Fehlvorstellungen**: Liste mit Gegenstrategien.
+- **Ressourcen**: Offline-tauglich bei "Kein Internet".
+
+"""
+
+LESSON_PLAN_TEMPLATE = (
+    """\
+Du agierst als **professioneller Unterrichtscoach** und Lehrplan-Designer.
+Erzeuge auf Basis der Vorgaben **zwei Ausgaben**:
+
+1) Einen **vollständig formatierten Unterrichts-/Lernplan als Markdown**.
+2) Ein **valides JSON** gemäß untenstehendem Schema, eingeschlossen in einem Codeblock mit ```json Fence.
+
+"""
+    + _LESSON_PLAN_SPEC
+    + """\
+### Markdown-Ausgabe – Struktur
+# Titel des Unterrichts
+## Überblick
+- Fach, Niveau, Gesamtdauer, Datumsvorschlag
+- Lernziele (Liste)
+- Vorkenntnisse
+- Materialien
+- Ablauf in Kurzform
+
+## Inhaltsverzeichnis
+- Liste aller Lerneinheiten (mit Nummer, Titel, Zeit)
+
+## Lerneinheiten
+### Einheit {{i}}: {{Titel}}
+**Zeit:** {{Minuten}}  
+**Ziele:** …  
+**Inhalt & Erklärungen:** …  
+**Vorgehen (Schritt-für-Schritt):** …  
+**Differenzierung:** …  
+**Checkpoints/Formatives Assessment:** …  
+**Materialien:** …
+
+(repliziere für alle Einheiten)
+
+## Aktivitäten & Übungen
+- Mindestens 5 Aufgaben (Leicht/Mittel/Schwer), **jeweils mit Lösung**.
+{optional_quiz}
+
+## Reflexion
+- Lehrer*in-Reflexion und Lernenden-Reflexion (2–3 Leitfragen)
+
+## Hausaufgabe/Weiterarbeit
+- Aufgaben mit Zeitangaben und **Lösungen**
+
+## Bewertungskriterien (Rubric)
+- Kriterienraster (4 Stufen) mit kurzen Deskriptoren
+
+## Typische Fehlvorstellungen & Gegenstrategien
+- Liste (Fehlannahme → Gegenstrategie)
+- Diagnosefragen
+
+### JSON-Ausgabe – Schema (in ```json Fence ausgeben)
+Das JSON MUSS valide sein und **NUR** dieses Schema enthalten:
+
+{{
+  "title": "string",
+  "subject": "string",
+  "level": "string",
+  "total_duration_min": {duration},
+  "units": [
+    {{
+      "index": 1,
+      "title": "string",
+      "duration_min": 0,
+      "objectives": ["..."],
+      "steps": ["..."],
+      "materials": ["..."],
+      "differentiation": {{
+        "Foerderbedarf": ["..."],
+        "Regelniveau": ["..."],
+        "Erweitert": ["..."]
+      }},
+      "checkpoints": ["..."]
+    }}
+  ],
+  "exercises": [
+    {{
+      "difficulty": "Leicht|Mittel|Schwer",
+      "prompt": "string",
+      "solution": "string"
+    }}
+  ],
+  "quiz": [{{
+    "question": "string",
+    "choices": ["A", "B", "C", "D"],
+    "answer": "A"
+  }}],
+  "rubric": [{{
+    "criterion": "string",
+    "levels": [{{
+      "name": "string",
+      "descriptor": "string"
+    }}]
+  }}],
+  "homework": [{{
+    "task": "string",
+    "solution": "string"
+  }}],
+  "misconceptions": [{{
+    "misconception": "string",
+    "fix": "string"
+  }}]
+}}
+
+WICHTIG:
+- Liefere zuerst die **Markdown-Sektion**, danach **genau einen** ```json Codeblock.
+- Keine zusätzlichen Codeblöcke außer diesem.
+"""
+)
+
+
+# Structured-output variant: Ollama constrains the answer to LESSON_PLAN_SCHEMA (``format``).
+LESSON_PLAN_JSON_TEMPLATE = (
+    """\
+Du agierst als **professioneller Unterrichtscoach** und Lehrplan-Designer.
+Erzeuge auf Basis der Vorgaben einen vollständigen Unterrichts-/Lernplan als **JSON**.
+
+"""
+    + _LESSON_PLAN_SPEC
+    + """\
+### Ausgabe
+Antworte ausschließlich mit einem JSON-Objekt nach diesem Schema, ohne Markdown und ohne Codeblock.
+Erzeuge genau {num_units} Einträge in "units"; die Summe von "duration_min" ist höchstens {duration}.
+Felder, die laut Vorgaben nicht gewünscht sind, bleiben leere Listen.
+
+{schema}
+"""
+)
+
+
+def _string_list() -> dict:
+    return {"type": "array", "items": {"type": "string"}}
+
+
+def _object(properties: dict, required: Optional[Sequence[str]] = None) -> dict:
+    """Closed object schema; all properties are required unless *required* is given."""
+    return {
+        "type": "object",
+        "properties": properties,
+        "required": list(properties if required is None else required),
+        "additionalProperties": False,
+    }
+
+
+# Property order matters: models generate the fields in this order, so the units come early.
+LESSON_PLAN_SCHEMA = _object(
+    {
+        "title": {"type": "string"},
+        "subject": {"type": "string"},
+        "level": {"type": "string"},
+        "total_duration_min": {"type": "integer"},
+        "units": {
+            "type": "array",
+            "minItems": 1,
+            "items": _object(
+                {
+                    "index": {"type": "integer"},
+                    "title": {"type": "string"},
+                    "duration_min": {"type": "integer"},
+                    "objectives": _string_list(),
+                    "steps": _string_list(),
+                    "materials": _string_list(),
+                    "differentiation": _object(
+                        {"Foerderbedarf": _string_list(), "Regelniveau": _string_list(), "Erweitert": _string_list()},
+                        required=(),
+                    ),
+                    "checkpoints": _string_list(),
+                },
+                required=("index", "title", "duration_min", "objectives", "steps"),
+            ),
+        },
+        "exercises": {
+            "type": "array",
+            "items": _object(
+                {
+                    "difficulty": {"type": "string", "enum": ["Leicht", "Mittel", "Schwer"]},
+                    "prompt": {"type": "string"},
+                    "solution": {"type": "string"},
+                }
+            ),
+        },
+        "quiz": {
+            "type": "array",
+            "items": _object(
+                {"question": {"type": "string"}, "choices": _string_list(), "answer": {"type": "string"}}
+            ),
+        },
+        "rubric": {
+            "type": "array",
+            "items": _object(
+                {
+                    "criterion": {"type": "string"},
+                    "levels": {
+                        "type": "array",
+                        "items": _object({"name": {"type": "string"}, "descriptor": {"type": "string"}}),
+                    },
+                }
+            ),
+        },
+        "homework": {
+            "type": "array",
+            "items": _object({"task": {"type": "string"}, "solution": {"type": "string"}}),
+        },
+        "misconceptions": {
+            "type": "array",
+            "items": _object({"misconception": {"type": "string"}, "fix": {"type": "string"}}),
+        },
+    },
+    required=("title", "subject", "level", "total_duration_min", "units", "exercises"),
+)
+
+
+def _yes_no(flag: bool) -> str:
+    return "Ja" if flag else "Nein"
+
+
+def structured_lesson_plan_prompt(
+    subject: str,
+    level: str = "Mittelstufe",
+    duration: int = 90,
+    num_units: int = 3,
+    goals: str = "",
+    prerequisites: str = "",
+    activities: str = "",
+    constraints: str = "",
+    tone: str = "Strukturiert",
+    language: str = "Deutsch",
+    diff_levels: Sequence[str] = ("Regelniveau", "Erweitert"),
+    include_quiz: bool = True,
+    include_rubric: bool = True,
+    include_homework: bool = True,
+    include_tips: bool = True,
+    schema: Optional[dict] = None,
+) -> str:
+    """Lesson plan as Markdown followed by one JSON block (Education Tutor 2).
+
+    With a JSON *schema* (normally ``LESSON_PLAN_SCHEMA``, also passed to Ollama
+    as ``format``) the prompt asks for that JSON object only.
+    """
+    safe_vars = defaultdict(
+        str,
+        {
+            "subject": subject,
+            "level": level,
+            "duration": duration,
+            "num_units": num_units,
+            "goals": goals,
+            "prerequisites": prerequisites,
+            "activities": activities,
+            "constraints": constraints,
+            "tone": tone,
+            "language": language,
+            "diff_levels": ", ".join(diff_levels) if diff_levels else "Regelniveau",
+            "include_quiz": _yes_no(include_quiz),
+            "include_rubric": _yes_no(include_rubric),
+            "include_homework": _yes_no(include_homework),
+            "include_tips": _yes_no(include_tips),
+            "optional_quiz": "- Füge ein kurzes, auswertbares Mini-Quiz mit Lösungen hinzu."
+            if include_quiz
+            else "",
+        },
+    )
+    if schema is not None:
+        safe_vars["schema"] = json.dumps(schema, ensure_ascii=False)
+        return LESSON_PLAN_JSON_TEMPLATE.format_map(safe_vars)
+    return dedent(LESSON_PLAN_TEMPLATE).format_map(safe_vars)
+
+
+PROMPT_BUILDERS: Dict[str, Callable[..., str]] = {
+    "blog": blog_prompt,
+    "faq": faq_prompt,
+    "ideas": ideas_prompt,
+    "travel": travel_prompt,
+    "lesson_plan": lesson_plan_prompt,
+    "lesson_plan_structured": structured_lesson_plan_prompt,
+}
+
+
+def build_prompt(kind: str, params: Optional[Mapping[str, object]] = None) -> str:
+    """Build the prompt of generator *kind* from keyword *params*.
+
+    Raises ``ValueError`` for an unknown kind and ``TypeError`` for unknown
+    or missing parameters.
+    """
+    try:
+        builder = PROMPT_BUILDERS[kind]
+    except KeyError:
+        raise ValueError(f"Unknown prompt kind {kind!r}; expected one of {', '.join(PROMPT_BUILDERS)}")
+    return builder(**dict(params or {}))
@@ -0,0 +1,64 @@
+"""Helpers for building and reusing LangChain FAISS indexes on disk."""
+from __future__ import annotations
+
+import pickle
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Callable, List, Optional
+
+from lib.cache_utils import cache_dir
+
+__all__ = ["load_or_build_faiss", "load_faiss"]
+
+
+def load_faiss(folder: Path, embeddings):
+    """Load an index written by ``FAISS.save_local``, memory-mapping the vectors.
+
+    Falls back to a regular read for index types that FAISS cannot map.
+    """
+    import faiss
+    from langchain_community.vectorstores import FAISS
+
+    index_path = str(folder / "index.faiss")
+    try:
+        index = faiss.read_index(index_path, faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+    except RuntimeError:
+        index = faiss.read_index(index_path)
+    # The docstore pickle is written by load_or_build_faiss below, never taken from users.
+    with (folder / "index.pkl").open("rb") as f:
+        docstore, index_to_docstore_id = pickle.load(f)
+    return FAISS(embeddings, index, docstore, index_to_docstore_id)
+
+
+def load_or_build_faiss(
+    key: str,
+    load_documents: Callable[[], List],
+    embeddings,
+    root: Optional[Path] = None,
+):
+    """Return the FAISS store for *key*, building and saving it on first use.
+
+    *key* should identify both the content (e.g. its SHA-256) and the
+    embedding model. ``load_documents`` is only called when no saved index
+    exists; later calls (other reruns, sessions or processes) just load it.
+    """
+    from langchain_community.vectorstores import FAISS
+
+    folder = (root or cache_dir("faiss")) / key
+    if (folder / "index.faiss").exists() and (folder / "index.pkl").exists():
+        return load_faiss(folder, embeddings)
+
+    db = FAISS.from_documents(load_documents(), embeddings)
+    # Save into a temp folder first so concurrent readers never see half an index.
+    tmp = Path(tempfile.mkdtemp(dir=folder.parent, prefix=f".{key}."))
+    try:
+        db.save_local(str(tmp))
+        if folder.exists():
+            shutil.rmtree(folder)
+        tmp.rename(folder)
+    except OSError:
+        shutil.rmtree(tmp, ignore_errors=True)
+        if not (folder / "index.faiss").exists():
+            raise
+    return db
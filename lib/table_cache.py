@@ -0,0 +1,148 @@
+"""Columnar on-disk cache for uploaded tables.
+
+A CSV is parsed once, in record batches, into an uncompressed Arrow IPC
+(Feather v2) file named after its content hash. Later reruns, sessions and
+processes open that file memory-mapped: nothing is parsed again, reading a
+subset of columns only touches those columns' pages, and the OS shares the
+mapped pages between everyone reading the same table.
+
+Example:
+    >>> table = open_table(upload, columns=["Country", "Population"])
+    >>> frame = read_frame(upload, columns=["Country"])
+"""
+from __future__ import annotations
+
+import os
+import re
+import tempfile
+from pathlib import Path
+from typing import IO, Dict, Hashable, Iterator, Optional, Sequence, Union
+
+import pandas as pd
+
+from lib.cache_utils import cache_dir, file_hash
+
+__all__ = ["Source", "source_hash", "table_path", "cache_table", "open_table", "iter_table_batches", "read_frame"]
+
+Source = Union[str, Path, IO[bytes]]
+
+
+def _rewind(source: Source) -> Source:
+    if not isinstance(source, (str, Path)):
+        source.seek(0)
+    return source
+
+
+# Content hashes by upload (Streamlit ``file_id``) or by path, size and mtime,
+# so a rerun does not read a multi-GB upload again just to find its cache.
+_hashes: Dict[Hashable, str] = {}
+_MAX_HASHES = 256
+
+
+def _identity(source: Source) -> Optional[Hashable]:
+    if isinstance(source, (str, Path)):
+        try:
+            stat = os.stat(source)
+        except OSError:
+            return None
+        return os.path.abspath(source), stat.st_size, stat.st_mtime_ns
+    file_id = getattr(source, "file_id", None)
+    return ("upload", file_id) if file_id else None
+
+
+def source_hash(source: Source) -> str:
+    """SHA-256 of the whole *source*, computed once per upload or file version."""
+    identity = _identity(source)
+    digest = _hashes.get(identity) if identity is not None else None
+    if digest is None:
+        digest = file_hash(source)
+        if identity is not None:
+            if len(_hashes) >= _MAX_HASHES:
+                del _hashes[next(iter(_hashes))]
+            _hashes[identity] = digest
+    return digest
+
+
+def table_path(source: Source) -> Path:
+    return cache_dir("tables") / f"{source_hash(source)}.arrow"
+
+
+_bad_column = re.compile(r"In CSV column #(\d+)")
+
+
+def _write_ipc(source: Source, target: Path) -> None:
+    import pyarrow as pa
+    from pyarrow import csv as pa_csv
+
+    fd, tmp = tempfile.mkstemp(dir=target.parent, prefix=f".{target.name}.", suffix=".tmp")
+    os.close(fd)
+    as_text: Dict[str, object] = {}
+    try:
+        while True:
+            convert_options = pa_csv.ConvertOptions(strings_can_be_null=True, column_types=as_text)
+            reader = pa_csv.open_csv(_rewind(source), convert_options=convert_options)
+            try:
+                with pa.ipc.new_file(tmp, reader.schema) as writer:
+                    for batch in reader:
+                        writer.write_batch(batch)
+                break
+            except pa.ArrowInvalid as e:
+                # The type inferred from the first block does not hold further down
+                # (e.g. text in a numeric column): read that column as text and start over.
+                match = _bad_column.search(str(e))
+                if match is None:
+                    raise
+                column = reader.schema.names[int(match.group(1))]
+                if column in as_text:
+                    raise  # already text, e.g. invalid UTF-8: retrying would loop forever
+                as_text[column] = pa.string()
+        os.replace(tmp, target)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+
+def cache_table(source: Source) -> Path:
+    """Convert *source* to the Arrow cache (once) and return the file path."""
+    path = table_path(source)
+    if not path.exists():
+        _write_ipc(source, path)
+    return path
+
+
+def _reader(source: Source):
+    import pyarrow as pa
+
+    return pa.ipc.open_file(pa.memory_map(str(cache_table(source)), "r"))
+
+
+def open_table(source: Source, columns: Optional[Sequence[str]] = None):
+    """Return the table as a memory-mapped ``pyarrow.Table`` (zero-copy)."""
+    table = _reader(source).read_all()
+    return table.select(list(columns)) if columns else table
+
+
+def iter_table_batches(source: Source, columns: Optional[Sequence[str]] = None) -> Iterator[pd.DataFrame]:
+    """Yield the cached table batch by batch as DataFrames."""
+    reader = _reader(source)
+    for index in range(reader.num_record_batches):
+        batch = reader.get_batch(index)
+        yield (batch.select(list(columns)) if columns else batch).to_pandas()
+
+
+def read_frame(
+    source: Source, columns: Optional[Sequence[str]] = None, nrows: Optional[int] = None
+) -> pd.DataFrame:
+    """Return (the selected columns of) the table as a DataFrame.
+
+    Without pyarrow this falls back to ``pandas.read_csv``.
+    """
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return pd.read_csv(_rewind(source), usecols=list(columns) if columns else None, nrows=nrows)
+    table = open_table(source, columns)
+    return (table.slice(0, nrows) if nrows is not None else table).to_pandas()
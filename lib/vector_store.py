@@ -0,0 +1,316 @@
+"""Dependency-light vector store on plain NumPy arrays.
+
+Vectors are L2-normalised and kept as one row-major matrix, either float32 or
+int8 with a float32 scale per row (about 4x smaller). Search is a blocked
+matrix multiply followed by ``argpartition`` for the top-k, so a batch of
+queries costs one pass over the matrix. Deletes only set a tombstone;
+``compact()`` rewrites the matrix without them.
+
+A store with a *path* only ever appends on ``add``/``delete``: vectors and
+scales go to raw files, metadata to JSON lines and tombstones to a raw id
+file. A small ``store.json`` header, written last, records how much of each
+file is valid; the matrices are reopened with ``np.memmap``, so loading an
+index is instant.
+
+Example:
+    >>> store = load_or_build_store(key, lambda: chunks, embed_fn)
+    >>> store.search(embed_fn([question])[0], k=5)
+    [(0.82, 17, {'text': '...'}), ...]
+"""
+from __future__ import annotations
+
+import json
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from lib.cache_utils import cache_dir, read_json, write_json_atomic
+
+__all__ = ["VectorStore", "load_or_build_store", "quantize_int8"]
+
+# Rows per matrix-multiply block; bounds the float32 copy of an int8 block
+# (4096 x 1024 dims = 16 MB) and the temporary score matrix.
+BLOCK_ROWS = 4096
+
+_METADATA = "metadata.jsonl"
+_DELETED = "deleted.i64"
+
+Hit = Tuple[float, int, Dict[str, Any]]
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    np.maximum(norms, 1e-12, out=norms)
+    return vectors / norms
+
+
+def quantize_int8(vectors: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Symmetric per-row int8 quantisation; returns ``(codes, scales)``."""
+    scales = np.abs(vectors).max(axis=1) / 127.0
+    np.maximum(scales, 1e-12, out=scales)
+    codes = np.rint(vectors / scales[:, None]).astype(np.int8)
+    return codes, scales.astype(np.float32)
+
+
+def _jsonl(rows: Sequence[Dict[str, Any]]) -> bytes:
+    return "".join(json.dumps(row, ensure_ascii=False) + "\n" for row in rows).encode("utf-8")
+
+
+def _append(file: Path, data: bytes) -> int:
+    with file.open("ab") as f:
+        f.write(data)
+    return len(data)
+
+
+class VectorStore:
+    """Cosine-similarity store with an id -> metadata table.
+
+    Args:
+        path: folder for persistence; ``None`` keeps everything in memory
+        dtype: ``"int8"`` (quantised, default) or ``"float32"``
+    """
+
+    def __init__(self, path: Optional[Path] = None, dtype: str = "int8"):
+        if dtype not in ("int8", "float32"):
+            raise ValueError(f"Unsupported dtype: {dtype}")
+        self.path = Path(path) if path is not None else None
+        self.dtype = dtype
+        self.dim: Optional[int] = None
+        self.metadata: List[Dict[str, Any]] = []
+        self.deleted: set = set()
+        self._vectors: Optional[np.ndarray] = None
+        self._scales: Optional[np.ndarray] = None
+        self._metadata_bytes = 0  # valid length of the metadata file
+        self._deleted_count = 0  # valid ids in the tombstone file
+        self._lock = threading.Lock()
+        if self.path is not None:
+            self._open()
+
+    # -- persistence ------------------------------------------------------------------------------
+    @property
+    def _header(self) -> Path:
+        return self.path / "store.json"
+
+    def _file(self, name: str) -> Path:
+        return self.path / name
+
+    def _open(self) -> None:
+        header = read_json(self._header)
+        if header is None:
+            return
+        self.dtype = header["dtype"]
+        self.dim = header["dim"]
+        self._metadata_bytes = header["metadata_bytes"]
+        self._deleted_count = header["deleted"]
+        with self._file(_METADATA).open("rb") as f:
+            lines = f.read(self._metadata_bytes).splitlines()
+        self.metadata = [json.loads(line) for line in lines[: header["rows"]]]
+        if self._deleted_count:
+            ids = np.fromfile(self._file(_DELETED), dtype=np.int64, count=self._deleted_count)
+            self.deleted = set(ids.tolist())
+        self._map()
+
+    def _map(self) -> None:
+        """(Re)open the matrix files read-only; rows beyond the header's count are ignored."""
+        rows = len(self.metadata)
+        if not rows or not self.dim:
+            self._vectors = self._scales = None
+            return
+        self._vectors = np.memmap(
+            self._file(f"vectors.{self.dtype}"), dtype=self.dtype, mode="r", shape=(rows, self.dim)
+        )
+        if self.dtype == "int8":
+            self._scales = np.memmap(self._file("scales.f32"), dtype=np.float32, mode="r", shape=(rows,))
+
+    def _write_header(self) -> None:
+        write_json_atomic(
+            self._header,
+            {
+                "dtype": self.dtype,
+                "dim": self.dim,
+                "rows": len(self.metadata),
+                "metadata_bytes": self._metadata_bytes,
+                "deleted": self._deleted_count,
+            },
+        )
+
+    def _write_tables(self) -> None:
+        """Rewrite the metadata and tombstone files from memory, then the header."""
+        metadata = _jsonl(self.metadata)
+        deleted = np.array(sorted(self.deleted), dtype=np.int64)
+        for name, data in ((_METADATA, metadata), (_DELETED, deleted.tobytes())):
+            tmp = self._file(name + ".tmp")
+            tmp.write_bytes(data)
+            tmp.replace(self._file(name))
+        self._metadata_bytes, self._deleted_count = len(metadata), len(deleted)
+        self._write_header()
+
+    # -- updates ----------------------------------------------------------------------------------
+    def __len__(self) -> int:
+        return len(self.metadata) - len(self.deleted)
+
+    def add(self, vectors: np.ndarray, metadata: Optional[Sequence[Dict[str, Any]]] = None) -> List[int]:
+        """Append *vectors* (one row each) and return their ids."""
+        vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+        metadata = list(metadata) if metadata is not None else [{} for _ in range(len(vectors))]
+        if len(metadata) != len(vectors):
+            raise ValueError("Expected one metadata entry per vector")
+        if not len(vectors):
+            return []
+        with self._lock:
+            if self.dim is None:
+                self.dim = int(vectors.shape[1])
+            elif vectors.shape[1] != self.dim:
+                raise ValueError(f"Dimension mismatch: store has {self.dim}, got {vectors.shape[1]}")
+
+            vectors = _normalize(vectors)
+            if self.dtype == "int8":
+                codes, scales = quantize_int8(vectors)
+            else:
+                codes, scales = vectors, None
+
+            first = len(self.metadata)
+            metadata = [dict(m) for m in metadata]
+            self.metadata.extend(metadata)
+            if self.path is None:
+                self._vectors = codes if self._vectors is None else np.concatenate([self._vectors, codes])
+                if scales is not None:
+                    self._scales = scales if self._scales is None else np.concatenate([self._scales, scales])
+            else:
+                self.path.mkdir(parents=True, exist_ok=True)
+                self._truncate(first)
+                with self._file(f"vectors.{self.dtype}").open("ab") as f:
+                    f.write(np.ascontiguousarray(codes).tobytes())
+                if scales is not None:
+                    with self._file("scales.f32").open("ab") as f:
+                        f.write(scales.tobytes())
+                self._metadata_bytes += _append(self._file(_METADATA), _jsonl(metadata))
+                # The header is written last: it defines how many rows are valid.
+                self._write_header()
+                self._map()
+        return list(range(first, first + len(vectors)))
+
+    def _truncate(self, rows: int) -> None:
+        """Drop bytes of an interrupted earlier append beyond the valid lengths."""
+        width = np.dtype(self.dtype).itemsize * self.dim
+        for name, size in (
+            (f"vectors.{self.dtype}", rows * width),
+            ("scales.f32", rows * 4),
+            (_METADATA, self._metadata_bytes),
+            (_DELETED, self._deleted_count * 8),
+        ):
+            file = self._file(name)
+            if file.exists() and file.stat().st_size > size:
+                with file.open("r+b") as f:
+                    f.truncate(size)
+
+    def delete(self, ids: Sequence[int]) -> None:
+        """Tombstone *ids*; they are skipped by ``search`` until ``compact``."""
+        with self._lock:
+            new = sorted({int(i) for i in ids if 0 <= int(i) < len(self.metadata)} - self.deleted)
+            if not new:
+                return
+            self.deleted.update(new)
+            if self.path is not None:
+                self._truncate(len(self.metadata))
+                _append(self._file(_DELETED), np.array(new, dtype=np.int64).tobytes())
+                self._deleted_count += len(new)
+                self._write_header()
+
+    def compact(self) -> None:
+        """Rewrite the matrix without deleted rows (ids are renumbered)."""
+        with self._lock:
+            if not self.deleted:
+                return
+            keep = np.array([i for i in range(len(self.metadata)) if i not in self.deleted], dtype=np.int64)
+            vectors = np.array(self._vectors[keep]) if len(keep) else None
+            scales = np.array(self._scales[keep]) if len(keep) and self._scales is not None else None
+            self.metadata = [self.metadata[i] for i in keep]
+            self.deleted = set()
+            if self.path is None:
+                self._vectors, self._scales = vectors, scales
+                return
+            self._vectors = self._scales = None  # release the maps before rewriting the files
+            files = [(f"vectors.{self.dtype}", vectors)]
+            if self.dtype == "int8":
+                files.append(("scales.f32", scales))
+            for name, array in files:
+                tmp = self._file(name + ".tmp")
+                tmp.write_bytes(array.tobytes() if array is not None else b"")
+                tmp.replace(self._file(name))
+            self._write_tables()
+            self._map()
+
+    # -- search -----------------------------------------------------------------------------------
+    def search(self, query: np.ndarray, k: int = 5) -> List[Hit]:
+        """Return up to *k* ``(score, id, metadata)`` for one query vector, best first."""
+        return self.search_batch(np.atleast_2d(query), k)[0]
+
+    def search_batch(self, queries: np.ndarray, k: int = 5) -> List[List[Hit]]:
+        """Top-*k* cosine matches for each row of *queries*."""
+        queries = _normalize(np.atleast_2d(np.asarray(queries, dtype=np.float32)))
+        with self._lock:
+            vectors, scales, metadata = self._vectors, self._scales, self.metadata
+            deleted = np.fromiter(self.deleted, dtype=np.int64, count=len(self.deleted))
+        if vectors is None or k <= 0:
+            return [[] for _ in range(len(queries))]
+
+        rows = len(metadata)
+        best_scores = np.full((len(queries), 0), -np.inf, dtype=np.float32)
+        best_ids = np.zeros((len(queries), 0), dtype=np.int64)
+        for start in range(0, rows, BLOCK_ROWS):
+            block = np.asarray(vectors[start : start + BLOCK_ROWS], dtype=np.float32)
+            scores = queries @ block.T  # (queries, block rows)
+            if scales is not None:
+                scores *= scales[start : start + BLOCK_ROWS]
+            dead = deleted[(deleted >= start) & (deleted < start + len(block))] - start
+            scores[:, dead] = -np.inf
+            scores = np.concatenate([best_scores, scores], axis=1)
+            ids = np.concatenate(
+                [best_ids, np.broadcast_to(np.arange(start, start + len(block)), (len(queries), len(block)))],
+                axis=1,
+            )
+            if scores.shape[1] > k:
+                top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+                scores = np.take_along_axis(scores, top, axis=1)
+                ids = np.take_along_axis(ids, top, axis=1)
+            best_scores, best_ids = scores, ids
+
+        results: List[List[Hit]] = []
+        for scores, ids in zip(best_scores, best_ids):
+            order = np.argsort(-scores)
+            results.append(
+                [(float(scores[i]), int(ids[i]), metadata[ids[i]]) for i in order if np.isfinite(scores[i])]
+            )
+        return results
+
+
+_stores: Dict[Path, Tuple[VectorStore, threading.Lock]] = {}
+_stores_lock = threading.Lock()
+
+
+def load_or_build_store(
+    key: str,
+    load_texts: Callable[[], Sequence[str]],
+    embed_fn: Callable[[List[str]], np.ndarray],
+    dtype: str = "int8",
+    root: Optional[Path] = None,
+) -> VectorStore:
+    """Return the store for *key*, embedding the texts only on first use.
+
+    *key* should identify both the content (e.g. its SHA-256) and the
+    embedding model. Each text is stored as ``{"text": ...}`` metadata.
+    """
+    folder = (root or cache_dir("vectors")) / key
+    with _stores_lock:
+        if folder not in _stores:
+            _stores[folder] = (VectorStore(folder, dtype=dtype), threading.Lock())
+        store, build_lock = _stores[folder]
+    with build_lock:  # one build per key, concurrent readers wait for it
+        if not store.metadata:
+            texts = list(load_texts())
+            if texts:
+                store.add(embed_fn(texts), [{"text": t} for t in texts])
+    return store
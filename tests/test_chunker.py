@@ -0,0 +1,34 @@
+import pytest
+
+from lib.chunker import chunk_text
+
+TEXTS = [
+    'Er sagte: „Komm her.“ Dann ging er. (Wirklich!) Ende.',
+    "»Schon wieder?« fragte sie. 'Ja.' Sie lachte [leise.] Und dann?\n\nNeuer Absatz.",
+    'Zitat: "Alles gut.") Weiter geht es… und zwar "so!" Fertig.',
+]
+
+
+def rebuild(text, chunks):
+    """Chunks plus the text between them; everything between chunks must be whitespace."""
+    pieces, position = [], 0
+    for chunk in chunks:
+        assert chunk.text == text[chunk.start : chunk.end]
+        gap = text[position : chunk.start]
+        assert not gap.strip(), f"dropped {gap!r}"
+        pieces += [gap, chunk.text]
+        position = chunk.end
+    pieces.append(text[position:])
+    return pieces
+
+
+@pytest.mark.parametrize("text", TEXTS)
+@pytest.mark.parametrize("max_chars", [1, 12, 30, 1000])
+def test_pieces_reproduce_input(text, max_chars):
+    chunks = list(chunk_text(text, max_chars, chars_per_tok=1.0))
+    assert "".join(rebuild(text, chunks)) == text
+
+
+def test_closing_quote_stays_with_sentence():
+    chunks = list(chunk_text(TEXTS[0], 25, chars_per_tok=1.0))
+    assert chunks[0].text == "Er sagte: „Komm her.“"
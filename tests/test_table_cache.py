@@ -0,0 +1,40 @@
+import io
+
+import pytest
+
+import lib.cache_utils
+from lib.csv_profile import profile_csv
+from lib.csv_query import run_query
+
+
+class Upload(io.BytesIO):
+    """Stands in for Streamlit's ``UploadedFile``."""
+
+    def __init__(self, data: bytes, file_id: str):
+        super().__init__(data)
+        self.file_id = file_id
+
+
+@pytest.fixture(autouse=True)
+def cache_root(tmp_path, monkeypatch):
+    monkeypatch.setattr(lib.cache_utils, "CACHE_ROOT", tmp_path)
+
+
+FIRST = b"city,pop\nBerlin,3700000\nHamburg,1900000\n"
+SECOND = b"product,price\nApfel,1.5\nBirne,2.0\nKiwi,0.8\n"
+
+
+@pytest.mark.parametrize(
+    "first, second",
+    [
+        (Upload(FIRST, "a"), Upload(SECOND, "b")),
+        (io.BytesIO(FIRST), io.BytesIO(SECOND)),  # no file_id: hashed on every call
+    ],
+)
+def test_uploads_after_each_other_keep_their_own_table(first, second):
+    for upload, columns, rows in ((first, ["city", "pop"], 2), (second, ["product", "price"], 3)):
+        profile = profile_csv(upload)  # leaves the stream at its end
+        assert profile.column_names == columns
+        result, _ = run_query(upload, "SELECT * FROM data", "sql")
+        assert list(result.columns) == columns and len(result) == rows
+        assert profile_csv(upload).column_names == columns
@@ -1,16 +1,13 @@
-import io
-import json
-
-import requests
 import streamlit as st
 
-from lib.helper_streamlit import get_models
+from lib.csv_profile import profile_csv
+from lib.document_session import document_prefix
+from lib.document_utils import preview_pdf, read_pdf_text
+from lib.helper_streamlit import ask_document, generate_map_reduce, generate_retrieval, get_models
 
 st.set_page_config(page_title="Mini Data Analyzer", page_icon="📄")
 st.title("📄🔍 Mini Data Analyzer (CSV & PDF)")
 
-OLLAMA = "http://localhost:11434"
-
 # --- Model wählen --------------------------------------------------------------------------------
 available_models = get_models()
 
@@ -21,6 +18,12 @@ with st.sidebar:
 question = st.text_input(
     "Deine Analysefrage", "Fasse die wichtigsten Erkenntnisse zusammen."
 )
+scope = st.radio(
+    "Umfang",
+    ["Anfang (12.000 Zeichen)", "Relevante Abschnitte (Retrieval)", "Ganzes Dokument (Map-Reduce)"],
+    horizontal=True,
+    help="Map-Reduce wertet alle Abschnitte parallel aus; Retrieval nur die zur Frage passendsten.",
+)
 
 # Datei-Upload
 up = st.file_uploader("CSV oder PDF hochladen", type=["csv", "pdf"])
@@ -29,82 +32,60 @@ meta = {}
 
 
 def _read_csv(file):
-    import pandas as pd
-
-    df = pd.read_csv(file)
+    # One streaming pass with bounded memory; the profile is cached by file hash
+    profile = profile_csv(file)
     st.subheader("CSV Vorschau")
-    st.dataframe(df.head(20), width='stretch')
-    desc = df.describe(include="all").to_string()
-    info = f"Spalten: {list(df.columns)}\nForm: {df.shape}\n\nDescribe:\n{desc}"
-    return info, df
+    st.dataframe(profile.head_frame(), width='stretch')
+    st.dataframe(profile.to_frame(), width='stretch')
+    return profile.to_text(), profile
 
 
 def _read_pdf(file):
-    text = ""
     try:
-        # 1) pypdf
-
-        from pypdf import PdfReader
-
-        r = PdfReader(io.BytesIO(file.read()))
-        text = "\n".join(page.extract_text() or "" for page in r.pages)
-    except Exception:
-        # 2) pdfminer.six
-        try:
-            from pdfminer.high_level import extract_text
-
-            file.seek(0)
-            text = extract_text(file)
-        except Exception as e:
-            st.error(f"PDF konnte nicht extrahiert werden: {e}")
-
-    return text
+        return read_pdf_text(file.getvalue())
+    except Exception as e:
+        st.error(f"PDF konnte nicht extrahiert werden: {e}")
+        return ""
 
 
-doc_text, df = "", None
+doc_text, profile = "", None
 if up:
     if up.type.endswith("csv"):
-        doc_text, df = _read_csv(up)
+        doc_text, profile = _read_csv(up)
         meta = {"kind": "csv", "name": up.name}
     else:
-        text = _read_pdf(up)
+        # Preview parses only the first pages; the full text is extracted on demand
+        try:
+            doc_text = preview_pdf(up.getvalue())
+        except Exception as e:
+            st.error(f"PDF konnte nicht extrahiert werden: {e}")
         st.subheader("PDF Vorschau (erste 1200 Zeichen)")
-        st.code(text[:1200] or "—")
-        doc_text = text
+        st.code(doc_text or "—")
         meta = {"kind": "pdf", "name": up.name}
 
 # Abfrage an Ollama (Streaming)
 if st.button("🚀 Analysieren", disabled=not (up and doc_text.strip())):
     st.caption(f"Frage: {question}")
+    if meta.get("kind") == "pdf":
+        doc_text = _read_pdf(up)
     # Eingabe begrenzen, um Riesen-Dokumente handhabbar zu machen
     MAX_CHARS = 12000
     context = doc_text[:MAX_CHARS]
-    sys_prompt = (
+    # Everything but the question forms a stable prefix that Ollama reuses for follow-up questions
+    prefix = document_prefix(
         "Du bist Daten-/Dokumentenanalyst/in. Antworte strukturiert, präzise und mit Stichpunkten, "
-        "nenne ggf. Annahmen. Antworte auf Deutsch."
-    )
-    user_prompt = (
-        f"Datei: {meta.get('name')} (Typ: {meta.get('kind')})\n\n"
-        f"Kontext (gekürzt auf {len(context)} Zeichen):\n{context}\n\n"
-        f"Aufgabe/Frage:\n{question}\n\n"
-        "Gib klare, gegliederte Ergebnisse zurück. Wenn Zahlen vorhanden sind, baue kurze Bullet-Insights."
+        "nenne ggf. Annahmen. Antworte auf Deutsch. Beantworte die Aufgabe/Frage am Ende und gib klare, "
+        "gegliederte Ergebnisse zurück. Wenn Zahlen vorhanden sind, baue kurze Bullet-Insights.\n\n"
+        f"Datei: {meta.get('name')} (Typ: {meta.get('kind')}), Kontext gekürzt auf {len(context)} Zeichen",
+        context,
     )
-    payload = {
-        "model": model,
-        "prompt": f"{sys_prompt}\n\n{user_prompt}",
-        "stream": True,
-    }
-    box = st.empty()
-    acc = ""
     try:
-        with requests.post(f"{OLLAMA}/api/generate", json=payload, stream=True) as r:
-            r.raise_for_status()
-            for ln in r.iter_lines():
-                if not ln:
-                    continue
-                chunk = json.loads(ln.decode("utf-8"))
-                acc += chunk.get("response", "")
-                box.markdown(acc)
+        if scope.startswith("Ganzes"):
+            acc = generate_map_reduce(model, doc_text, question)
+        elif scope.startswith("Relevante"):
+            acc = generate_retrieval(model, doc_text, question)
+        else:
+            acc = ask_document(model, prefix, question)
         st.download_button(
             "⬇️ Ergebnis speichern",
             acc.encode("utf-8"),
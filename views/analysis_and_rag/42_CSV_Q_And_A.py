@@ -2,10 +2,12 @@
 
 from __future__ import annotations
 
-import pandas as pd
 import streamlit as st
 
-from lib.helper_streamlit import add_select_model, generate
+from lib.csv_profile import profile_csv
+from lib.csv_query import QueryError, answer_with_query, query_engine, result_prompt
+from lib.document_session import document_prefix
+from lib.helper_streamlit import add_select_model, ask_document, generate
 
 st.set_page_config(page_title="CSV Q&A", page_icon="📊")
 
@@ -15,19 +17,43 @@ upload = st.file_uploader("CSV hochladen", type=["csv"])
 question = st.text_input(
     "Frage an die Tabelle", "Welche 3 wichtigsten Erkenntnisse?"
 )
+engine = query_engine()
+mode = st.radio(
+    "Modus",
+    ["Profil & Kopfzeilen", f"Lokale Abfrage ({'SQL' if engine == 'sql' else 'pandas'})"],
+    horizontal=True,
+    help="Lokale Abfrage: Das Modell schreibt eine Abfrage, die hier über die ganze Tabelle läuft.",
+)
 
-dataframe = None
+profile = None
 if upload:
-    dataframe = pd.read_csv(upload)
-    st.dataframe(dataframe.head(15), width='stretch')
-
-if st.button("Analysieren", disabled=dataframe is None):
-    assert dataframe is not None  # for type checkers
-    prompt = (
-        "Antworte stichpunktartig basierend auf dieser CSV (Kopf, Spalten, Statistik):\n"
-        f"Spalten: {list(dataframe.columns)}\n"
-        f"Shape: {dataframe.shape}\n"
-        f"Kopf:\n{dataframe.head(10).to_csv(index=False)}\n\n"
-        f"Frage: {question}"
+    # Streamed in batches instead of loading the whole frame; cached by file hash
+    profile = profile_csv(upload)
+    st.dataframe(profile.head_frame(15), width='stretch')
+
+if st.button("Analysieren", disabled=profile is None):
+    assert profile is not None  # for type checkers
+    if mode.startswith("Lokale"):
+        with st.spinner("Abfrage wird erstellt und ausgeführt …"):
+            try:
+                query, result, truncated = answer_with_query(model, profile, upload, question)
+            except QueryError as e:
+                st.error(f"Abfrage fehlgeschlagen: {e}")
+                st.stop()
+        st.code(query, language="sql" if engine == "sql" else "python")
+        st.dataframe(result, width='stretch')
+        if truncated:
+            st.caption(f"Ergebnis auf {len(result)} Zeilen begrenzt.")
+        generate(model, result_prompt(profile, question, query, result, truncated))
+        st.stop()
+
+    # Table summary first, question last: follow-up questions reuse the evaluated prefix
+    prefix = document_prefix(
+        "Antworte stichpunktartig auf die Frage am Ende, basierend auf dieser CSV (Kopf, Spalten, Statistik).",
+        f"Spalten: {profile.column_names}\n"
+        f"Shape: ({profile.rows}, {len(profile.columns)})\n"
+        f"Kopf:\n{profile.head_frame(10).to_csv(index=False)}\n"
+        f"Statistik:\n{profile.to_text()}",
+        name=upload.name,
     )
-    generate(model, prompt)
+    ask_document(model, prefix, question)
@@ -2,11 +2,11 @@
 
 from __future__ import annotations
 
-import io
-
 import streamlit as st
 
-from lib.helper_streamlit import add_select_model, generate
+from lib.document_session import document_prefix
+from lib.document_utils import preview_pdf, read_pdf_text
+from lib.helper_streamlit import add_select_model, ask_document, generate_map_reduce, generate_retrieval
 
 st.set_page_config(page_title="PDF Q&A", page_icon="📄")
 
@@ -15,34 +15,31 @@ model = add_select_model()
 
 upload = st.file_uploader("PDF hochladen", type=["pdf"])
 question = st.text_input("Frage", "Fasse die Kernaussagen zusammen.")
+mode = st.radio(
+    "Umfang",
+    ["Anfang (12.000 Zeichen)", "Relevante Abschnitte (Retrieval)", "Ganzes Dokument (Map-Reduce)"],
+    horizontal=True,
+)
 
-def read_pdf(file_handle) -> str:
-    """Return extracted text from a PDF file handle."""
-
-    try:
-        from pypdf import PdfReader
-
-        reader = PdfReader(io.BytesIO(file_handle.read()))
-        return "\n".join(page.extract_text() or "" for page in reader.pages)
-    except Exception:
-        from pdfminer.high_level import extract_text
-
-        file_handle.seek(0)
-        return extract_text(file_handle)
-
-
-extracted_text = ""
+preview_text = ""
 if upload:
-    extracted_text = read_pdf(upload)
-    st.code(extracted_text[:1200] or "—")
-
-if st.button("Analysieren", disabled=not extracted_text.strip()):
-    prompt = (
-        "Analysiere folgenden PDF-Text (gekürzt) und beantworte: "
-        f"{question}."
-        "\n\n"
-        "Antworte strukturiert auf Deutsch."
-        "\n\n"
-        f"{extracted_text[:12000]}"
+    # Only the first pages are parsed for the preview; the full text is extracted on demand
+    preview_text = preview_pdf(upload.getvalue())
+    st.code(preview_text or "—")
+
+if st.button("Analysieren", disabled=not preview_text.strip()):
+    extracted_text = read_pdf_text(upload.getvalue())
+    if mode.startswith("Ganzes"):
+        generate_map_reduce(model, extracted_text, question)
+        st.stop()
+    if mode.startswith("Relevante"):
+        generate_retrieval(model, extracted_text, question)
+        st.stop()
+    # Document first, question last: follow-up questions reuse the evaluated prefix
+    prefix = document_prefix(
+        "Analysiere den folgenden PDF-Text (gekürzt) und beantworte die Frage am Ende. "
+        "Antworte strukturiert auf Deutsch.",
+        extracted_text[:12000],
+        name=upload.name,
     )
-    generate(model, prompt)
+    ask_document(model, prefix, question)
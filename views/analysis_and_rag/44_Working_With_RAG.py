@@ -5,65 +5,89 @@ import streamlit as st
 
 from langchain_community.document_loaders import PyPDFLoader, TextLoader, UnstructuredImageLoader
 from langchain_community.embeddings import HuggingFaceEmbeddings
-from langchain_community.vectorstores import FAISS
 from langchain_community.llms import Ollama
 from langchain.chains import RetrievalQA
 
+from lib.cache_utils import content_hash
+from lib.helper_ollama import OLLAMA
+from lib.helper_ollama.embedding_cache import CachedEmbeddings
 from lib.helper_streamlit import add_select_model
+from lib.rag_utils import load_or_build_faiss
 
 st.set_page_config(page_title="RAG MiniApp", page_icon="🔍")
-st.title("🔍 Minimal RAG App for PDF, TXT, and Images (Ollama Local)")
 
-uploaded_file = st.file_uploader("Upload a PDF, TXT, or Image file", type=["pdf", "txt", "png", "jpg", "jpeg"])
+EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
 
-if not uploaded_file:
-    st.info("Upload a PDF, TXT, or image file to get started.")    
-else:
+
+@st.cache_resource
+def load_embeddings():
+    """Load the embedding model once per process; vectors are cached on disk."""
+    return CachedEmbeddings(HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL), f"hf:{EMBEDDING_MODEL}")
+
+
+def load_documents(file_name, data):
+    """Write the upload to a temp dir and load it with the matching LangChain loader."""
     with tempfile.TemporaryDirectory() as tmpdir:
-        file_path = os.path.join(tmpdir, uploaded_file.name)
+        file_path = os.path.join(tmpdir, file_name)
         with open(file_path, "wb") as f:
-            f.write(uploaded_file.getbuffer())
+            f.write(data)
 
-        # Load document
-        if uploaded_file.name.lower().endswith(".pdf"):
+        if file_name.lower().endswith(".pdf"):
             loader = PyPDFLoader(file_path)
-        elif uploaded_file.name.lower().endswith(".txt"):
+        elif file_name.lower().endswith(".txt"):
             loader = TextLoader(file_path)
-        elif uploaded_file.name.lower().endswith((".png", ".jpg", ".jpeg")):
+        elif file_name.lower().endswith((".png", ".jpg", ".jpeg")):
             loader = UnstructuredImageLoader(file_path)
         else:
-            st.error("Unsupported file type.")
-            st.stop()
-
-        docs = loader.load()
-        st.success(f"Loaded {len(docs)} document chunk(s).")
-
-        # Embeddings and Vectorstore
-        embeddings = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
-        db = FAISS.from_documents(docs, embeddings)
-
-        # LLM (using Ollama locally)
-        model = add_select_model()
-        if not model:
-            st.info("Please enter the Ollama model name to proceed.")
-        else:            
-            llm = Ollama(
-                model=model,
-                temperature=0.1,
-                max_tokens=256,
-            )
-            qa = RetrievalQA.from_chain_type(
-                llm=llm,
-                retriever=db.as_retriever(),
-                return_source_documents=True,
-            )
-
-            query = st.text_input("Ask a question about your document:")
-            if query:
-                with st.spinner("Generating answer..."):
-                    result = qa({"query": query})
-                st.markdown("**Answer:**")
-                st.write(result["result"])
-                st.markdown("**Source Document(s):**")
-                for i, doc in enumerate(result["source_documents"]):
-                    st.write(f"Chunk {i+1}: {doc.page_content[:300]}...")
+            raise ValueError("Unsupported file type.")
+        return loader.load()
+
+
+@st.cache_resource(show_spinner="Building index …")
+def get_vectorstore(file_hash, file_name, _data):
+    """Return the FAISS index for a document, built once per content hash and embedding model."""
+    key = content_hash(f"{EMBEDDING_MODEL}:{file_hash}")
+    return load_or_build_faiss(key, lambda: load_documents(file_name, _data), load_embeddings())
+
+
+st.title("🔍 Minimal RAG App for PDF, TXT, and Images (Ollama Local)")
+
+uploaded_file = st.file_uploader("Upload a PDF, TXT, or Image file", type=["pdf", "txt", "png", "jpg", "jpeg"])
+
+if not uploaded_file:
+    st.info("Upload a PDF, TXT, or image file to get started.")
+else:
+    data = uploaded_file.getvalue()
+    try:
+        db = get_vectorstore(content_hash(data), uploaded_file.name, data)
+    except ValueError as e:
+        st.error(str(e))
+        st.stop()
+    st.success(f"Indexed {db.index.ntotal} document chunk(s).")
+
+    # LLM (using Ollama locally)
+    model = add_select_model()
+    if not model:
+        st.info("Please enter the Ollama model name to proceed.")
+    else:
+        llm = Ollama(
+            model=model,
+            base_url=OLLAMA,
+            temperature=0.1,
+            max_tokens=256,
+        )
+        qa = RetrievalQA.from_chain_type(
+            llm=llm,
+            retriever=db.as_retriever(),
+            return_source_documents=True,
+        )
+
+        query = st.text_input("Ask a question about your document:")
+        if query:
+            with st.spinner("Generating answer..."):
+                result = qa({"query": query})
+            st.markdown("**Answer:**")
+            st.write(result["result"])
+            st.markdown("**Source Document(s):**")
+            for i, doc in enumerate(result["source_documents"]):
+                st.write(f"Chunk {i+1}: {doc.page_content[:300]}...")
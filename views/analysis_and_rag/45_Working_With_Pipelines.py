@@ -1,15 +1,18 @@
-import os
 import streamlit as st
 
-from langchain_ollama import ChatOllama, OllamaEmbeddings
-from langchain_community.document_loaders import TextLoader, PyPDFLoader
+from langchain_ollama import ChatOllama
 from langchain_community.vectorstores import FAISS
-from langchain.text_splitter import RecursiveCharacterTextSplitter
+from langchain_core.documents import Document
 
 from langchain_core.prompts import ChatPromptTemplate
 from langchain.chains.combine_documents import create_stuff_documents_chain
 from langchain.chains.retrieval import create_retrieval_chain
 
+from lib.chunker import chunk_pages
+from lib.document_utils import iter_pdf_pages
+from lib.helper_ollama import OLLAMA
+from lib.helper_ollama.embedding_batch import OllamaBatchEmbeddings
+
 st.set_page_config(page_title="RAG Pipeline MiniApp", layout="wide")
 st.title("🔧 Working With Pipelines: RAG with Python & Ollama")
 
@@ -25,30 +28,27 @@ question = st.text_input("Ask a question about the document:")
 
 if uploaded_file:
     ext = uploaded_file.name.split(".")[-1].lower()
-    temp_file_path = f"temp_doc.{ext}"
-
-    try:
-        with open(temp_file_path, "wb") as f:
-            f.write(uploaded_file.read())
-
-        # Loader
-        if ext == "pdf":
-            loader = PyPDFLoader(temp_file_path)
-        else:
-            loader = TextLoader(temp_file_path, encoding="utf-8")
-        docs = loader.load()
-
-        # Split
-        splitter = RecursiveCharacterTextSplitter(chunk_size=500, chunk_overlap=50)
-        splits = splitter.split_documents(docs)
+    data = uploaded_file.getvalue()
+
+    # Load + split: pages are chunked as they are extracted, each chunk keeps its source position
+    pages = iter_pdf_pages(data) if ext == "pdf" else [data.decode("utf-8", errors="ignore")]
+    splits = [
+        Document(
+            page_content=chunk.text,
+            metadata={"source": uploaded_file.name, "page": chunk.page, "start_index": chunk.start},
+        )
+        for chunk in chunk_pages(pages, max_tokens=128, overlap_tokens=12, model="nomic-embed-text")
+    ]
 
+    if splits:
         # Vector store
-        embeddings = OllamaEmbeddings(model="nomic-embed-text")
+        # Batched /api/embed calls, unchanged chunks come from the embedding cache
+        embeddings = OllamaBatchEmbeddings("nomic-embed-text")
         vectordb = FAISS.from_documents(splits, embeddings)
         retriever = vectordb.as_retriever(search_kwargs={"k": 4})
 
         # LLM
-        llm = ChatOllama(model="llama3")
+        llm = ChatOllama(model="llama3", base_url=OLLAMA)
 
         # Summarization chain (stuff)
         summary_prompt = ChatPromptTemplate.from_template(
@@ -78,9 +78,7 @@ if uploaded_file:
             st.subheader("Answer")
             result = rag_chain.invoke({"input": question})
             st.write(result.get("answer", ""))
-
-    finally:
-        if os.path.exists(temp_file_path):
-            os.remove(temp_file_path)
+    else:
+        st.warning("No text could be extracted from the document.")
 else:
     st.info("Please upload a text or PDF file to get started.")
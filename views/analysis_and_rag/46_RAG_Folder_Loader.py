@@ -1,30 +1,48 @@
-import glob
-import os
-
 import streamlit as st
+
+from lib.folder_index import FolderIndex
 from lib.helper_streamlit import add_select_model, generate
 
 st.set_page_config(page_title="RAG Folder Loader (Lite)", page_icon="🗂️")
 
 
+@st.cache_resource
+def get_folder_index(folder: str, watch: bool) -> FolderIndex:
+    """One persistent index per folder, shared by all sessions of this process."""
+    index = FolderIndex(folder)
+    if watch:
+        index.start_watching()
+    return index
+
+
 st.title("🗂️ RAG: Ordner-Loader (Lite)")
 model = add_select_model()
 
 folder = st.text_input("Ordner mit .txt/.md", "./docs")
+watch = st.checkbox("Ordner überwachen (Änderungen sofort übernehmen)", value=False)
 query = st.text_input("Frage", "Worum geht es insgesamt?")
+top_k = st.slider("Anzahl Textstellen (Top-k)", min_value=2, max_value=30, value=8)
 
 if st.button("Antwort finden"):
-    texts = []
-    for pth in glob.glob(os.path.join(folder, "**", "*.*"), recursive=True):
-        if pth.lower().endswith((".txt", ".md")):
-            try:
-                texts.append(
-                    open(pth, "r", encoding="utf-8", errors="ignore").read()[:4000]
-                )
-            except Exception as e:  # noqa: F841
-                pass
-    context = "\n---\n".join(texts)[:20000] if texts else ""
+    index = get_folder_index(folder, watch)
+    scan = index.refresh()
+    st.caption(
+        f"{len(index)} Dateien im Index • neu {scan.added} • geändert {scan.changed} • gelöscht {scan.deleted}"
+    )
+
+    # BM25 top-k: only passages relevant to the question go into the prompt.
+    texts, sources, total = [], [], 0
+    for score, path, number, text in index.search(query, top_k):
+        if total + len(text) > 20000:
+            break
+        texts.append(f"[{path} #{number + 1}]\n{text}")
+        sources.append(f"{path} #{number + 1} (Score {score:.2f})")
+        total += len(text)
+    context = "\n---\n".join(texts)
     p = f"Beantworte die Frage auf Basis des Kontexts (Auszüge):\n{context}\n\nFrage: {query}"
-    p = p if context else f"Keine Dateien gefunden. Antworte trotzdem kurz auf: {query}"
+    p = p if context else f"Keine passenden Textstellen gefunden. Antworte trotzdem kurz auf: {query}"
 
+    if sources:
+        with st.expander(f"Quellen ({len(sources)})"):
+            st.markdown("\n".join(f"- {s}" for s in sources))
     generate(model, p)
@@ -1,21 +1,46 @@
 import streamlit as st
-from lib.helper_streamlit import add_select_model, generate
+from lib.chat_memory import DEFAULT_BUDGET_TOKENS, ChatMemory
+from lib.helper_streamlit import add_select_model, chat
 
 st.set_page_config(page_title="Chat Sandbox", page_icon="💬")
 
 st.title("💬 Chat")
 model = add_select_model()
 
-st.session_state.setdefault("hist", [])
+memory = st.session_state.setdefault("chat_memory", ChatMemory())
 
-user = st.text_input("Nachricht", "")
-if st.button("Senden") and user.strip():
-    st.session_state["hist"].append({"role": "user", "content": user})
-    prompt = "\n".join(f"{m['role']}: {m['content']}" for m in st.session_state["hist"])
+with st.sidebar:
+    memory.budget_tokens = st.slider(
+        "Verlaufs-Budget (Tokens)",
+        256,
+        4096,
+        DEFAULT_BUDGET_TOKENS,
+        128,
+        help="Neuere Nachrichten bis zu diesem Umfang gehen wörtlich mit, ältere als Zusammenfassung.",
+    )
+    summary_tokens, recent_tokens = memory.tokens(model)
+    st.caption(
+        f"Verlauf: {len(memory.messages) - memory.summarized} Nachrichten wörtlich (~{recent_tokens} Tokens)"
+        f" • Zusammenfassung ~{summary_tokens} Tokens"
+        + (" • wird aktualisiert …" if memory.compacting else "")
+    )
+    if memory.summary:
+        with st.expander("Zusammenfassung"):
+            st.markdown(memory.summary)
+    if st.button("Verlauf löschen"):
+        memory.clear()
 
-    with st.spinner():
-        reply = generate(model, prompt)
-        st.session_state["hist"].append({"role": "assistant", "content": reply})
+for m in memory.messages:
+    with st.chat_message(m["role"]):
+        st.markdown(m["content"])
 
-for m in st.session_state["hist"][-8:]:
-    st.markdown(f"**{m['role'].upper()}**: {m['content']}")
+user = st.chat_input("Nachricht")
+if user and user.strip():
+    memory.add("user", user)
+    with st.chat_message("user"):
+        st.markdown(user)
+    with st.chat_message("assistant"):
+        reply = chat(model, memory.request_messages())
+    memory.add("assistant", reply)
+    # Fold old turns into the summary while the user reads the answer.
+    memory.compact_async(model)
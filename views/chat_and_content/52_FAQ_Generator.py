@@ -4,19 +4,17 @@ from __future__ import annotations
 
 import streamlit as st
 
-from lib.helper_streamlit import add_select_model, generate
+from lib.helper_streamlit import add_cache_toggle, add_select_model, generate
+from lib.prompts import faq_prompt
 
 st.set_page_config(page_title="FAQ Generator", page_icon="❓")
 
 st.title("❓ FAQ Generator")
 model = add_select_model()
+use_cache = add_cache_toggle()
 source_text = st.text_area(
     "Quelltext/Inhalt", "Unsere Plattform analysiert medizinische Bilder ..."
 )
 
 if st.button("FAQ erstellen"):
-    prompt = (
-        "Erzeuge 10 FAQ-Fragen mit kurzen, klaren Antworten basierend auf diesem Inhalt (Deutsch):\n\n"
-        + source_text
-    )
-    generate(model, prompt)
+    generate(model, faq_prompt(source_text), cache=use_cache)
@@ -1,5 +1,6 @@
 import streamlit as st
-from lib.helper_streamlit import add_select_model, generate
+from lib.helper_streamlit import add_cache_toggle, add_select_model, generate
+from lib.prompts import lesson_plan_prompt
 
 st.set_page_config(page_title="Education Tutor", page_icon="📚")
 
@@ -7,6 +8,7 @@ st.title("📚 Unterrichts-Coach mit Ollama")
 
 with st.sidebar:
     model = add_select_model()
+    use_cache = add_cache_toggle()
     st.markdown(
         """
         Verwende Ollama, um Unterrichtseinheiten zu planen. 
@@ -50,28 +52,6 @@ with st.form("lesson_plan"):
     submitted = st.form_submit_button("🧠 Lernplan generieren")
 
 if submitted:
-    prompt = f"""Du bist ein professioneller Unterrichtscoach. Erstelle einen detaillierten Unterrichtsplan.
-Fach: {subject}
-Lernniveau: {level}
-Dauer: {duration} Minuten
-Ziele: {goals}
-Vorgesehene Aktivitäten oder Materialien: {activities}
-Ton & Stil: {tone}
-
-Gib eine strukturierte Antwort mit folgenden Abschnitten: 
-- Einstieg
-
-- Hauptteil
-  Beschreibe den Hauptteil. Erstelle ein Inhaltserzeichnis aller Themen und Einheiten.
-  Beschreibe jene Einheit mit einer Zusammenfassung
-  
-- Aktivität/Übung
-- Reflexion
-
-- Hausaufgabe/Weiterarbeit
-  Erstelle mindests 5 Augaben. Füge am Ende die Lösungen für jede Aufgabe hinzu
-
-Ergänze konkrete Zeitvorschläge.
-"""
+    prompt = lesson_plan_prompt(subject, level, goals, activities, duration, tone)
     with st.spinner():
-        generate(model, prompt)
+        generate(model, prompt, cache=use_cache)
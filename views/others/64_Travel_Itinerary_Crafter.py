@@ -1,5 +1,6 @@
 import streamlit as st
-from lib.helper_streamlit import add_select_model, generate
+from lib.helper_streamlit import add_cache_toggle, add_select_model, generate
+from lib.prompts import travel_prompt
 
 st.set_page_config(page_title="Travel Itinerary Crafter", page_icon="✈️")
 
@@ -7,6 +8,7 @@ st.title("✈️ Reiseplan-Generator")
 
 with st.sidebar:
     model = add_select_model()
+    use_cache = add_cache_toggle()
     st.markdown(
         "Erstelle individuelle Reisepläne inklusive Highlights, Budget und Tipps."
     )
@@ -40,14 +42,7 @@ with st.form("travel_form"):
     submitted = st.form_submit_button("🧭 Reiseplan erstellen")
 
 if submitted:
-    prompt = f"""Du bist Reiseplaner:in. Erstelle einen Tagesplan für eine Reise.
-Reiseziel: {destination}
-Reisedauer: {duration} Tage
-Reisende: {travelers}
-Interessen: {', '.join(interests) if interests else 'offen'}
-Budgetniveau: {budget_level}
-Must-do: {must_do}
-
-Gib für jeden Tag Morgen-, Nachmittag- und Abendprogramm, Restauranttipps, Budgetschätzung und praktische Hinweise.
-"""
-    generate(model, prompt)
+    prompt = travel_prompt(
+        destination, duration, travelers, interests, budget_level, must_do
+    )
+    generate(model, prompt, cache=use_cache)
@@ -2,42 +2,81 @@
 
 from __future__ import annotations
 
-import base64
-import json
-
-import requests
 import streamlit as st
 
+from lib.helper_ollama import client
+from lib.helper_ollama.client import PARALLEL_SLOTS
 from lib.helper_ollama.helpers import get_vision_models
+from lib.helper_streamlit import render_stream
+from lib.image_batch import DEFAULT_TIMEOUT, MODERATION_PROMPT, folder_images, run_batch
+from lib.image_utils import DEFAULT_QUALITY, encode_for_model
 
 st.set_page_config(page_title="Bildanalyse", page_icon="🛡️")
 st.title("🛡️ Bildanalyse")
 
 
 selected_model = st.selectbox("Vision-Modell", get_vision_models())
-image_file = st.file_uploader("Bild", type=["png", "jpg", "jpeg", "webp"])
-
-if st.button("Prüfen", disabled=not image_file):
-    encoded = base64.b64encode(image_file.getvalue()).decode()
-    prompt = (
-        "Analysiere das Bild auf sensible Inhalte (Gewalt, NSFW, persönliche Daten). "
-        "Gib nur Hinweise/Tags, kein Urteil."
-    )
-    payload = {
-        "model": selected_model,
-        "prompt": prompt,
-        "images": [encoded],
-        "stream": True,
-    }
-    placeholder, acc = st.empty(), ""
-    with requests.post(
-        "http://localhost:11434/api/generate", json=payload, stream=True
-    ) as response:
-        for line in response.iter_lines():
-            if not line:
-                continue
-            acc += json.loads(line.decode()).get("response", "")
-            placeholder.markdown(acc)
-
-if image_file:
-    st.image(image_file, caption=image_file.name)
+with st.sidebar:
+    quality = st.slider("JPEG-Qualität für das Modell", 40, 95, DEFAULT_QUALITY, step=5)
+mode = st.radio("Modus", ["Einzelbild", "Stapel (Batch)"], horizontal=True)
+
+if mode == "Einzelbild":
+    image_file = st.file_uploader("Bild", type=["png", "jpg", "jpeg", "webp"])
+
+    if st.button("Prüfen", disabled=not image_file):
+        # Scaled to the model's input resolution, metadata stripped, cached by content hash
+        encoded = encode_for_model(image_file.getvalue(), selected_model, quality)
+        st.caption(
+            f"Bilddaten: {image_file.size / 1024:,.0f} KB → {len(encoded) * 3 / 4 / 1024:,.0f} KB"
+        )
+        prompt = (
+            "Analysiere das Bild auf sensible Inhalte (Gewalt, NSFW, persönliche Daten). "
+            "Gib nur Hinweise/Tags, kein Urteil."
+        )
+        payload = {
+            "model": selected_model,
+            "prompt": prompt,
+            "images": [encoded],
+        }
+        render_stream(client.stream_ndjson("/api/generate", payload))
+
+    if image_file:
+        st.image(image_file, caption=image_file.name)
+    st.stop()
+
+# --- Batch ---------------------------------------------------------------------------------------
+uploads = st.file_uploader(
+    "Bilder", type=["png", "jpg", "jpeg", "webp"], accept_multiple_files=True
+)
+folder = st.text_input("… oder Ordner auf dem Server", "")
+output = st.text_input("Ergebnisdatei (JSONL, wird fortgesetzt)", "image_results.jsonl")
+col1, col2 = st.columns(2)
+workers = col1.slider("Parallele Anfragen", 1, max(8, PARALLEL_SLOTS * 2), PARALLEL_SLOTS)
+timeout = col2.number_input("Zeitlimit pro Bild (s)", 10, 900, int(DEFAULT_TIMEOUT))
+
+items = [(f.name, f.getvalue) for f in uploads or []]
+if folder.strip():
+    items += folder_images(folder.strip())
+
+if st.button(f"{len(items)} Bilder prüfen", disabled=not items):
+    bar = st.progress(0.0)
+    table = st.empty()
+    rows, skipped, failed = [], 0, 0
+    for done, record in enumerate(
+        run_batch(items, selected_model, MODERATION_PROMPT, output, workers, timeout, quality), start=1
+    ):
+        if record.get("skipped"):
+            skipped += 1
+        else:
+            failed += bool(record["error"])
+            rows.append(
+                {
+                    "Bild": record["path"],
+                    "Tags": ", ".join(record["tags"]),
+                    "Sekunden": record["latency_s"],
+                    "Fehler": record["error"] or "",
+                }
+            )
+            table.dataframe(rows, width='stretch')
+        bar.progress(done / len(items), text=f"{done}/{len(items)} • übersprungen {skipped} • Fehler {failed}")
+    st.success(f"Fertig: {len(rows) - failed} neu analysiert, {skipped} übersprungen, {failed} Fehler → {output}")